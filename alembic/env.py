@@ -32,6 +32,12 @@ from app import models  # Import your models module
 target_metadata = Base.metadata
 # target_metadata = None
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the models mapped onto views (info["is_view"]) out of autogenerate."""
+    table = object if type_ == "table" else getattr(object, "table", None)
+    return table is None or not table.info.get("is_view")
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -56,6 +62,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -78,7 +85,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,34 @@
+"""odds history resolution
+
+Revision ID: 0eb4658c00f6
+Revises: ab953faf08f9
+Create Date: 2026-10-19 16:22:47.301992
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0eb4658c00f6'
+down_revision: Union[str, None] = 'ab953faf08f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # "full" -> "minute" -> "extremes", see app/tasks/downsample_odds_history.py
+    op.add_column('odds_history_packed', sa.Column('resolution', sa.Text(), nullable=False, server_default='full'))
+    op.create_index(
+        'ix_odds_history_packed_pending', 'odds_history_packed', ['first_fetched_at'],
+        postgresql_where=sa.text("resolution <> 'extremes'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_odds_history_packed_pending', table_name='odds_history_packed')
+    op.drop_column('odds_history_packed', 'resolution')
@@ -0,0 +1,43 @@
+"""settlement audit
+
+Revision ID: 1306f07fb167
+Revises: 3afb5230035c
+Create Date: 2026-10-20 20:31:12.648203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1306f07fb167'
+down_revision: Union[str, None] = '3afb5230035c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'settlement_audit',
+        sa.Column('audit_id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('correction_id', sa.Text(), nullable=False),
+        sa.Column('match_id', sa.Text(), nullable=True),
+        sa.Column('bet_id', sa.Integer(), nullable=False),
+        sa.Column('bet_event_id', sa.Integer(), nullable=True),
+        sa.Column('old_outcome', sa.Text(), nullable=True),
+        sa.Column('new_outcome', sa.Text(), nullable=True),
+        sa.Column('home_score', sa.Integer(), nullable=True),
+        sa.Column('away_score', sa.Integer(), nullable=True),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index('ix_settlement_audit_correction_id', 'settlement_audit', ['correction_id'])
+    op.create_index('ix_settlement_audit_bet_id', 'settlement_audit', ['bet_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('settlement_audit')
@@ -0,0 +1,42 @@
+"""bet leg counters
+
+Revision ID: 13a908734390
+Revises: 5eb12cb61b7f
+Create Date: 2026-10-20 16:22:51.477036
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '13a908734390'
+down_revision: Union[str, None] = '5eb12cb61b7f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bet', sa.Column('pending_legs', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('bet', sa.Column('lost_legs', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+    UPDATE bet
+    SET pending_legs = c.pending_legs, lost_legs = c.lost_legs
+    FROM (
+        SELECT bet_id,
+               count(*) FILTER (WHERE outcome IS NULL OR outcome = 'pending') AS pending_legs,
+               count(*) FILTER (WHERE outcome = 'lost') AS lost_legs
+        FROM bet_event
+        GROUP BY bet_id
+    ) c
+    WHERE bet.bet_id = c.bet_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('bet', 'lost_legs')
+    op.drop_column('bet', 'pending_legs')
@@ -0,0 +1,40 @@
+"""bet validation indexes
+
+Revision ID: 3afb5230035c
+Revises: 13a908734390
+Create Date: 2026-10-20 18:05:33.260718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3afb5230035c'
+down_revision: Union[str, None] = '13a908734390'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        # Settled legs the validator (app/tasks/validate_bets.py) has not checked yet
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bet_event_unvalidated ON bet_event (match_id)
+        WHERE validated IS NULL AND outcome IN ('won', 'lost')
+        """)
+        # Legs that disagree with the verified result, for GET /bets/discrepancies
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bet_event_flagged ON bet_event (bet_event_id)
+        WHERE NOT validated
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_bet_event_flagged")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_bet_event_unvalidated")
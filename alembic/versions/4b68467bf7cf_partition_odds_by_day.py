@@ -0,0 +1,169 @@
+"""partition odds by day
+
+Revision ID: 4b68467bf7cf
+Revises: 7b3ded6f9fc6
+Create Date: 2026-10-19 11:40:02.518377
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b68467bf7cf'
+down_revision: Union[str, None] = '7b3ded6f9fc6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Daily partitions created up front; the partition task keeps creating them afterwards
+PREMAKE_DAYS = 3
+
+# initial_odd / max_odds_* read their context columns from odds
+ODDS_VIEWS_SQL = [
+    """
+    CREATE OR REPLACE VIEW initial_odd AS
+    SELECT s.match_id, s.initial_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.initial_home_win AS home_win,
+           s.initial_draw AS draw, s.initial_away_win AS away_win,
+           s.initial_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.initial_odds_id AND o.fetched_at = s.initial_fetched_at
+    """,
+    """
+    CREATE OR REPLACE VIEW max_odds_home AS
+    SELECT s.match_id, s.max_home_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.max_home_win AS home_win, o.draw, o.away_win,
+           s.max_home_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_home_odds_id AND o.fetched_at = s.max_home_fetched_at
+    WHERE s.max_home_odds_id IS NOT NULL
+    """,
+    """
+    CREATE OR REPLACE VIEW max_odds_draw AS
+    SELECT s.match_id, s.max_draw_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, s.max_draw AS draw, o.away_win,
+           s.max_draw_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_draw_odds_id AND o.fetched_at = s.max_draw_fetched_at
+    WHERE s.max_draw_odds_id IS NOT NULL
+    """,
+    """
+    CREATE OR REPLACE VIEW max_odds_away AS
+    SELECT s.match_id, s.max_away_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, o.draw, s.max_away_win AS away_win,
+           s.max_away_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_away_odds_id AND o.fetched_at = s.max_away_fetched_at
+    WHERE s.max_away_odds_id IS NOT NULL
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The existing heap becomes the first partition, covering everything up to
+    # tomorrow (UTC, like fetched_at). Daily partitions take over from there.
+    boundary = datetime.utcnow().date() + timedelta(days=1)
+
+    # 1. Prove the partition bound without holding an exclusive lock: NOT VALID
+    #    plus VALIDATE only takes SHARE UPDATE EXCLUSIVE, so ingestion continues.
+    op.execute("UPDATE odds SET fetched_at = now() WHERE fetched_at IS NULL")
+    op.execute(f"""
+    ALTER TABLE odds ADD CONSTRAINT odds_legacy_bound
+    CHECK (fetched_at IS NOT NULL AND fetched_at < '{boundary}') NOT VALID
+    """)
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE odds VALIDATE CONSTRAINT odds_legacy_bound")
+        # Indexes matching the partitioned parent's, so ATTACH reuses them
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS odds_legacy_odds_id_fetched_at ON odds (odds_id, fetched_at)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_odds_legacy_match_id_fetched_at ON odds (match_id, fetched_at)")
+
+    # 2. Short swap: every step below is catalog-only
+    op.execute("ALTER TABLE odds ALTER COLUMN fetched_at SET NOT NULL")
+    op.execute("DROP TRIGGER IF EXISTS odd_summary_trigger ON odds")
+    op.execute("ALTER TABLE odds RENAME TO odds_legacy")
+    # Partition primary keys must include the partition key
+    op.execute("""
+    ALTER TABLE odds_legacy
+        DROP CONSTRAINT odds_pkey,
+        ADD CONSTRAINT odds_legacy_pkey PRIMARY KEY USING INDEX odds_legacy_odds_id_fetched_at
+    """)
+    op.execute("ALTER INDEX IF EXISTS ix_odds_match_id RENAME TO ix_odds_legacy_match_id")
+    op.execute("ALTER INDEX IF EXISTS ix_odds_fetched_at RENAME TO ix_odds_legacy_fetched_at")
+
+    op.execute("""
+    CREATE TABLE odds (
+        odds_id integer NOT NULL DEFAULT nextval('odds_odds_id_seq'::regclass),
+        match_id text,
+        event_status text,
+        match_time text,
+        home_score integer,
+        away_score integer,
+        home_win double precision,
+        draw double precision,
+        away_win double precision,
+        fetched_at timestamp without time zone NOT NULL DEFAULT now(),
+        CONSTRAINT odds_pkey PRIMARY KEY (odds_id, fetched_at)
+    ) PARTITION BY RANGE (fetched_at)
+    """)
+    op.execute("CREATE INDEX ix_odds_match_id_fetched_at ON odds (match_id, fetched_at)")
+    # Dropping old partitions must never take the id sequence with them
+    op.execute("ALTER SEQUENCE odds_odds_id_seq OWNED BY odds.odds_id")
+
+    op.execute(f"ALTER TABLE odds ATTACH PARTITION odds_legacy FOR VALUES FROM (MINVALUE) TO ('{boundary}')")
+    op.execute("ALTER TABLE odds_legacy DROP CONSTRAINT odds_legacy_bound")
+
+    for offset in range(PREMAKE_DAYS):
+        day = boundary + timedelta(days=offset)
+        op.execute(f"""
+        CREATE TABLE odds_p{day:%Y%m%d} PARTITION OF odds
+        FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')
+        """)
+
+    op.execute("""
+    CREATE TRIGGER odd_summary_trigger
+    AFTER INSERT OR UPDATE ON odds
+    FOR EACH ROW
+    EXECUTE FUNCTION update_odd_summary()
+    """)
+
+    for view_sql in ODDS_VIEWS_SQL:
+        op.execute(view_sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE odds RENAME TO odds_partitioned")
+    op.execute("ALTER TABLE odds_partitioned RENAME CONSTRAINT odds_pkey TO odds_partitioned_pkey")
+    op.execute("ALTER INDEX ix_odds_match_id_fetched_at RENAME TO ix_odds_partitioned_match_id_fetched_at")
+    op.execute("""
+    CREATE TABLE odds (
+        odds_id integer NOT NULL DEFAULT nextval('odds_odds_id_seq'::regclass),
+        match_id text,
+        event_status text,
+        match_time text,
+        home_score integer,
+        away_score integer,
+        home_win double precision,
+        draw double precision,
+        away_win double precision,
+        fetched_at timestamp without time zone DEFAULT now(),
+        CONSTRAINT odds_pkey PRIMARY KEY (odds_id)
+    )
+    """)
+    op.execute("INSERT INTO odds SELECT * FROM odds_partitioned")
+    op.execute("CREATE INDEX ix_odds_match_id ON odds (match_id)")
+    op.execute("CREATE INDEX ix_odds_fetched_at ON odds (fetched_at)")
+    op.execute("ALTER SEQUENCE odds_odds_id_seq OWNED BY odds.odds_id")
+    for view_sql in ODDS_VIEWS_SQL:
+        op.execute(view_sql)
+    op.execute("DROP TABLE odds_partitioned")
+    op.execute("""
+    CREATE TRIGGER odd_summary_trigger
+    AFTER INSERT OR UPDATE ON odds
+    FOR EACH ROW
+    EXECUTE FUNCTION update_odd_summary()
+    """)
@@ -0,0 +1,52 @@
+"""hot path indexes
+
+Revision ID: 55297604d949
+Revises: 0eb4658c00f6
+Create Date: 2026-10-19 18:05:12.640213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '55297604d949'
+down_revision: Union[str, None] = '0eb4658c00f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (table, definition). Each one backs a query that runs every few seconds;
+# benchmarks/explain_hot_queries.py checks that the planner keeps using them.
+HOT_PATH_INDEXES = {
+    # Bot dedup check: bet_event by match, joined to bet
+    'ix_bet_event_match_id_bet_id': ('bet_event', '(match_id, bet_id)'),
+    # Settlement: "does this bet have a lost / pending leg"
+    'ix_bet_event_bet_id_outcome': ('bet_event', '(bet_id, outcome)'),
+    # Bot dedup check filtered by task name instead of match
+    'ix_bet_bot_task': ('bet', '(lower(bot_task), bet_id) WHERE bot'),
+    # update_missing_live_matches / handle_missing_live_matches, every 10 s per category
+    # (partial: pregame and ended matches make up most of the table)
+    'ix_match_category_active': ('match', "(category) WHERE lower(event_status) NOT IN ('pregame', 'ended')"),
+    # Cleanup of stale "pending" matches and archiving of "ended" ones
+    'ix_match_status_start_time': ('match', '(lower(event_status), start_time)'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so bet placement and live ingestion keep running
+    with op.get_context().autocommit_block():
+        for name, (table, definition) in HOT_PATH_INDEXES.items():
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON "{table}" {definition}')
+        # Expression indexes need fresh statistics before the planner will cost them
+        for table in sorted({table for table, _ in HOT_PATH_INDEXES.values()}):
+            op.execute(f'ANALYZE "{table}"')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in HOT_PATH_INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
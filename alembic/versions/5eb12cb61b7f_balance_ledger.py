@@ -0,0 +1,54 @@
+"""balance ledger
+
+Revision ID: 5eb12cb61b7f
+Revises: 6a6e0bbbcffd
+Create Date: 2026-10-20 13:40:06.914382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5eb12cb61b7f'
+down_revision: Union[str, None] = '6a6e0bbbcffd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'balance_ledger',
+        sa.Column('entry_id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('bet_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('folded_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_balance_ledger_unfolded_user_id', 'balance_ledger', ['user_id'],
+                    postgresql_where=sa.text('folded_at IS NULL'))
+    op.create_index('ix_balance_ledger_bet_id', 'balance_ledger', ['bet_id'],
+                    postgresql_where=sa.text('bet_id IS NOT NULL'))
+
+    # Current balances become the opening entries, already folded
+    op.execute("""
+    INSERT INTO balance_ledger (user_id, amount, kind, folded_at)
+    SELECT user_id, balance, 'opening', now() FROM "user" WHERE balance <> 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Entries not folded yet go into user.balance before the ledger is dropped
+    op.execute("""
+    UPDATE "user" u
+    SET balance = u.balance + t.amount
+    FROM (SELECT user_id, sum(amount) AS amount FROM balance_ledger WHERE folded_at IS NULL GROUP BY user_id) t
+    WHERE u.user_id = t.user_id
+    """)
+    op.drop_table('balance_ledger')
@@ -0,0 +1,364 @@
+"""compact odds encoding
+
+Revision ID: 63467f833edb
+Revises: ec1bfbdef2f0
+Create Date: 2026-10-19 21:12:09.554170
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '63467f833edb'
+down_revision: Union[str, None] = 'ec1bfbdef2f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_DAYS = 3
+
+# Old-shape odds rows. Both branches are plain single-table selects with
+# identical column types, so the planner flattens the UNION ALL and lookups by
+# (match_id, fetched_at) or (odds_id, fetched_at) still use each side's indexes.
+ODDS_VIEW_SQL = """
+CREATE VIEW odds AS
+SELECT c.odds_id,
+       c.match_id,
+       (SELECT s.event_status FROM odds_status s WHERE s.status_code = c.status_code) AS event_status,
+       CASE WHEN c.elapsed_seconds IS NOT NULL
+            THEN lpad((c.elapsed_seconds / 60)::text, 2, '0') || ':' || lpad((c.elapsed_seconds % 60)::text, 2, '0')
+       END AS match_time,
+       c.home_score::integer AS home_score,
+       c.away_score::integer AS away_score,
+       c.home_win_milli::double precision / 1000 AS home_win,
+       c.draw_milli::double precision / 1000 AS draw,
+       c.away_win_milli::double precision / 1000 AS away_win,
+       c.fetched_at,
+       c.elapsed_seconds::integer AS elapsed_seconds
+FROM odds_compact c
+UNION ALL
+SELECT odds_id, match_id, event_status, match_time, home_score, away_score,
+       home_win, draw, away_win, fetched_at, elapsed_seconds
+FROM odds_wide
+"""
+
+INSERT_ODDS_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION insert_odds() RETURNS trigger AS $$
+DECLARE
+  code SMALLINT;
+BEGIN
+  IF NEW.event_status IS NOT NULL THEN
+    SELECT status_code INTO code FROM odds_status WHERE event_status = NEW.event_status;
+    IF code IS NULL THEN
+      INSERT INTO odds_status (event_status) VALUES (NEW.event_status)
+      ON CONFLICT (event_status) DO NOTHING;
+      SELECT status_code INTO code FROM odds_status WHERE event_status = NEW.event_status;
+    END IF;
+  END IF;
+
+  INSERT INTO odds_compact (
+    fetched_at, odds_id, match_id, home_win_milli, draw_milli, away_win_milli,
+    status_code, elapsed_seconds, home_score, away_score)
+  VALUES (
+    NEW.fetched_at, NEW.odds_id, NEW.match_id,
+    round(NEW.home_win * 1000), round(NEW.draw * 1000), round(NEW.away_win * 1000),
+    code,
+    COALESCE(NEW.elapsed_seconds,
+             CASE WHEN NEW.match_time ~ '^[0-9]+:[0-9]+$'
+                  THEN split_part(NEW.match_time, ':', 1)::integer * 60 + split_part(NEW.match_time, ':', 2)::integer
+             END),
+    NEW.home_score, NEW.away_score);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Shared by both versions of update_odd_summary() below: the latest odd is
+# overwritten, the initial one kept, the max per outcome raised
+SUMMARY_CONFLICT_SQL = """
+ON CONFLICT (match_id) DO UPDATE SET
+  odds_id = EXCLUDED.odds_id,
+  event_status = EXCLUDED.event_status,
+  match_time = EXCLUDED.match_time,
+  elapsed_seconds = EXCLUDED.elapsed_seconds,
+  home_score = EXCLUDED.home_score,
+  away_score = EXCLUDED.away_score,
+  home_win = EXCLUDED.home_win,
+  draw = EXCLUDED.draw,
+  away_win = EXCLUDED.away_win,
+  fetched_at = EXCLUDED.fetched_at,
+  max_home_odds_id = CASE WHEN EXCLUDED.max_home_win > COALESCE(match_odds_summary.max_home_win, '-infinity')
+                          THEN EXCLUDED.max_home_odds_id ELSE match_odds_summary.max_home_odds_id END,
+  max_home_fetched_at = CASE WHEN EXCLUDED.max_home_win > COALESCE(match_odds_summary.max_home_win, '-infinity')
+                             THEN EXCLUDED.max_home_fetched_at ELSE match_odds_summary.max_home_fetched_at END,
+  max_home_win = GREATEST(match_odds_summary.max_home_win, EXCLUDED.max_home_win),
+  max_draw_odds_id = CASE WHEN EXCLUDED.max_draw > COALESCE(match_odds_summary.max_draw, '-infinity')
+                          THEN EXCLUDED.max_draw_odds_id ELSE match_odds_summary.max_draw_odds_id END,
+  max_draw_fetched_at = CASE WHEN EXCLUDED.max_draw > COALESCE(match_odds_summary.max_draw, '-infinity')
+                             THEN EXCLUDED.max_draw_fetched_at ELSE match_odds_summary.max_draw_fetched_at END,
+  max_draw = GREATEST(match_odds_summary.max_draw, EXCLUDED.max_draw),
+  max_away_odds_id = CASE WHEN EXCLUDED.max_away_win > COALESCE(match_odds_summary.max_away_win, '-infinity')
+                          THEN EXCLUDED.max_away_odds_id ELSE match_odds_summary.max_away_odds_id END,
+  max_away_fetched_at = CASE WHEN EXCLUDED.max_away_win > COALESCE(match_odds_summary.max_away_win, '-infinity')
+                             THEN EXCLUDED.max_away_fetched_at ELSE match_odds_summary.max_away_fetched_at END,
+  max_away_win = GREATEST(match_odds_summary.max_away_win, EXCLUDED.max_away_win)
+"""
+
+SUMMARY_COLUMNS_SQL = """
+match_id, odds_id, event_status, match_time, elapsed_seconds, home_score, away_score, home_win, draw, away_win, fetched_at,
+initial_odds_id, initial_home_win, initial_draw, initial_away_win, initial_fetched_at,
+max_home_odds_id, max_home_win, max_home_fetched_at,
+max_draw_odds_id, max_draw, max_draw_fetched_at,
+max_away_odds_id, max_away_win, max_away_fetched_at
+"""
+
+# Summary maintenance for odds_compact: once per INSERT statement, with the new
+# rows decoded into the shape of the odds view. app/triggers.py installs the
+# same function (plus change notifications) at startup.
+COMPACT_SUMMARY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION update_odd_summary() RETURNS trigger AS $$
+BEGIN
+  WITH decoded AS (
+    SELECT n.odds_id, n.match_id, s.event_status,
+           CASE WHEN n.elapsed_seconds IS NOT NULL
+                THEN lpad((n.elapsed_seconds / 60)::text, 2, '0') || ':' || lpad((n.elapsed_seconds % 60)::text, 2, '0')
+           END AS match_time,
+           n.elapsed_seconds::integer AS elapsed_seconds,
+           n.home_score::integer AS home_score, n.away_score::integer AS away_score,
+           n.home_win_milli::double precision / 1000 AS home_win,
+           n.draw_milli::double precision / 1000 AS draw,
+           n.away_win_milli::double precision / 1000 AS away_win,
+           n.fetched_at
+    FROM new_rows n
+    LEFT JOIN odds_status s ON s.status_code = n.status_code
+  ),
+  latest AS (
+    SELECT DISTINCT ON (match_id) * FROM decoded ORDER BY match_id, fetched_at DESC, odds_id DESC
+  ),
+  initial AS (
+    SELECT DISTINCT ON (match_id) * FROM decoded ORDER BY match_id, fetched_at, odds_id
+  ),
+  max_home AS (
+    SELECT DISTINCT ON (match_id) match_id, odds_id, home_win, fetched_at
+    FROM decoded WHERE home_win IS NOT NULL ORDER BY match_id, home_win DESC, fetched_at, odds_id
+  ),
+  max_draw AS (
+    SELECT DISTINCT ON (match_id) match_id, odds_id, draw, fetched_at
+    FROM decoded WHERE draw IS NOT NULL ORDER BY match_id, draw DESC, fetched_at, odds_id
+  ),
+  max_away AS (
+    SELECT DISTINCT ON (match_id) match_id, odds_id, away_win, fetched_at
+    FROM decoded WHERE away_win IS NOT NULL ORDER BY match_id, away_win DESC, fetched_at, odds_id
+  )
+  INSERT INTO match_odds_summary ({SUMMARY_COLUMNS_SQL})
+  SELECT
+    l.match_id, l.odds_id, l.event_status, l.match_time, l.elapsed_seconds, l.home_score, l.away_score, l.home_win, l.draw, l.away_win, l.fetched_at,
+    i.odds_id, i.home_win, i.draw, i.away_win, i.fetched_at,
+    mh.odds_id, mh.home_win, mh.fetched_at,
+    md.odds_id, md.draw, md.fetched_at,
+    ma.odds_id, ma.away_win, ma.fetched_at
+  FROM latest l
+  JOIN initial i USING (match_id)
+  LEFT JOIN max_home mh USING (match_id)
+  LEFT JOIN max_draw md USING (match_id)
+  LEFT JOIN max_away ma USING (match_id)
+  {SUMMARY_CONFLICT_SQL};
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# The row-level version for the wide odds table, restored on downgrade
+WIDE_SUMMARY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION update_odd_summary() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO match_odds_summary ({SUMMARY_COLUMNS_SQL})
+  VALUES (
+    NEW.match_id, NEW.odds_id, NEW.event_status, NEW.match_time, NEW.elapsed_seconds, NEW.home_score, NEW.away_score, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at,
+    NEW.odds_id, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at,
+    CASE WHEN NEW.home_win IS NOT NULL THEN NEW.odds_id END, NEW.home_win, CASE WHEN NEW.home_win IS NOT NULL THEN NEW.fetched_at END,
+    CASE WHEN NEW.draw IS NOT NULL THEN NEW.odds_id END, NEW.draw, CASE WHEN NEW.draw IS NOT NULL THEN NEW.fetched_at END,
+    CASE WHEN NEW.away_win IS NOT NULL THEN NEW.odds_id END, NEW.away_win, CASE WHEN NEW.away_win IS NOT NULL THEN NEW.fetched_at END)
+  {SUMMARY_CONFLICT_SQL};
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Same definitions as in 4b68467bf7cf; recreated so they read from the new odds view
+ODDS_VIEWS_SQL = [
+    """
+    CREATE OR REPLACE VIEW initial_odd AS
+    SELECT s.match_id, s.initial_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.initial_home_win AS home_win,
+           s.initial_draw AS draw, s.initial_away_win AS away_win,
+           s.initial_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.initial_odds_id AND o.fetched_at = s.initial_fetched_at
+    """,
+    """
+    CREATE OR REPLACE VIEW max_odds_home AS
+    SELECT s.match_id, s.max_home_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.max_home_win AS home_win, o.draw, o.away_win,
+           s.max_home_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_home_odds_id AND o.fetched_at = s.max_home_fetched_at
+    WHERE s.max_home_odds_id IS NOT NULL
+    """,
+    """
+    CREATE OR REPLACE VIEW max_odds_draw AS
+    SELECT s.match_id, s.max_draw_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, s.max_draw AS draw, o.away_win,
+           s.max_draw_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_draw_odds_id AND o.fetched_at = s.max_draw_fetched_at
+    WHERE s.max_draw_odds_id IS NOT NULL
+    """,
+    """
+    CREATE OR REPLACE VIEW max_odds_away AS
+    SELECT s.match_id, s.max_away_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, o.draw, s.max_away_win AS away_win,
+           s.max_away_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_away_odds_id AND o.fetched_at = s.max_away_fetched_at
+    WHERE s.max_away_odds_id IS NOT NULL
+    """,
+]
+
+# Summary rows are rewritten on every fetch and match rows on every live update;
+# free space on each page lets those be HOT updates
+FILLFACTORS = {'match_odds_summary': 70, 'match': 80}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'odds_status',
+        sa.Column('status_code', sa.SmallInteger(), sa.Identity(), primary_key=True),
+        sa.Column('event_status', sa.Text(), nullable=False, unique=True),
+    )
+
+    # Fixed-width columns first, widest first, so no alignment padding is needed.
+    # Prices are stored in thousandths.
+    op.execute("""
+    CREATE TABLE odds_compact (
+        fetched_at timestamp without time zone NOT NULL DEFAULT now(),
+        odds_id integer NOT NULL DEFAULT nextval('odds_odds_id_seq'::regclass),
+        home_win_milli integer,
+        draw_milli integer,
+        away_win_milli integer,
+        status_code smallint,
+        elapsed_seconds smallint,
+        home_score smallint,
+        away_score smallint,
+        match_id text,
+        CONSTRAINT odds_compact_pkey PRIMARY KEY (odds_id, fetched_at)
+    ) PARTITION BY RANGE (fetched_at)
+    """)
+    op.execute("CREATE INDEX ix_odds_compact_match_id_fetched_at ON odds_compact (match_id, fetched_at)")
+    # Rows arrive in fetched_at order, so a BRIN index is enough for time-range scans
+    op.execute("CREATE INDEX ix_odds_compact_fetched_at ON odds_compact USING brin (fetched_at)")
+
+    today = datetime.utcnow().date()
+    for offset in range(PREMAKE_DAYS + 1):
+        day = today + timedelta(days=offset)
+        op.execute(f"""
+        CREATE TABLE odds_compact_p{day:%Y%m%d} PARTITION OF odds_compact
+        FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')
+        """)
+
+    # Swap: the wide table stops receiving rows and only ages out through retention
+    op.execute("DROP TRIGGER IF EXISTS odd_summary_trigger ON odds")
+    op.execute("ALTER TABLE odds RENAME TO odds_wide")
+    op.execute("ALTER SEQUENCE odds_odds_id_seq OWNED BY odds_compact.odds_id")
+    op.execute(ODDS_VIEW_SQL)
+    op.execute("ALTER VIEW odds ALTER COLUMN odds_id SET DEFAULT nextval('odds_odds_id_seq'::regclass)")
+    op.execute("ALTER VIEW odds ALTER COLUMN fetched_at SET DEFAULT now()")
+    op.execute(INSERT_ODDS_FUNCTION_SQL)
+    op.execute("""
+    CREATE TRIGGER odds_insert_trigger
+    INSTEAD OF INSERT ON odds
+    FOR EACH ROW
+    EXECUTE FUNCTION insert_odds()
+    """)
+    # The summary is maintained from the compact rows, so odds inserts work as soon
+    # as the upgrade is done rather than after the app has restarted
+    op.execute(COMPACT_SUMMARY_FUNCTION_SQL)
+    op.execute("""
+    CREATE TRIGGER odd_summary_trigger
+    AFTER INSERT ON odds_compact
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_odd_summary()
+    """)
+    for view_sql in ODDS_VIEWS_SQL:
+        op.execute(view_sql)
+
+    for table, fillfactor in FILLFACTORS.items():
+        op.execute(f'ALTER TABLE "{table}" SET (fillfactor = {fillfactor})')
+
+    # The legacy heap is append-only too: trade its fetched_at btree for BRIN
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_odds_legacy_fetched_at_brin ON odds_legacy USING brin (fetched_at)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_odds_legacy_fetched_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_odds_legacy_fetched_at ON odds_legacy (fetched_at)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_odds_legacy_fetched_at_brin")
+
+    for table in FILLFACTORS:
+        op.execute(f'ALTER TABLE "{table}" RESET (fillfactor)')
+
+    for view in ('initial_odd', 'max_odds_home', 'max_odds_draw', 'max_odds_away'):
+        op.execute(f'DROP VIEW {view}')
+    op.execute("DROP VIEW odds")
+    op.execute("DROP FUNCTION insert_odds()")
+    op.execute("ALTER TABLE odds_wide RENAME TO odds")
+    op.execute("ALTER SEQUENCE odds_odds_id_seq OWNED BY odds.odds_id")
+
+    # Move compact rows back, into matching daily partitions of the wide table
+    bind = op.get_bind()
+    partitions = bind.execute(sa.text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'odds_compact'::regclass
+    """)).fetchall()
+    for name, bound in partitions:
+        savepoint = bind.begin_nested()
+        try:
+            bind.execute(sa.text(
+                f"CREATE TABLE IF NOT EXISTS {name.replace('odds_compact_p', 'odds_p')} PARTITION OF odds {bound}"
+            ))
+            savepoint.commit()
+        except sa.exc.ProgrammingError:
+            # The day is already covered by another partition, e.g. odds_legacy
+            savepoint.rollback()
+    op.execute("""
+    INSERT INTO odds (odds_id, match_id, event_status, match_time, home_score, away_score,
+                      home_win, draw, away_win, fetched_at, elapsed_seconds)
+    SELECT c.odds_id, c.match_id, s.event_status,
+           lpad((c.elapsed_seconds / 60)::text, 2, '0') || ':' || lpad((c.elapsed_seconds % 60)::text, 2, '0'),
+           c.home_score, c.away_score,
+           c.home_win_milli::double precision / 1000, c.draw_milli::double precision / 1000,
+           c.away_win_milli::double precision / 1000, c.fetched_at, c.elapsed_seconds
+    FROM odds_compact c
+    LEFT JOIN odds_status s ON s.status_code = c.status_code
+    """)
+    op.execute("DROP TABLE odds_compact")
+    op.drop_table('odds_status')
+
+    op.execute(WIDE_SUMMARY_FUNCTION_SQL)
+    op.execute("""
+    CREATE TRIGGER odd_summary_trigger
+    AFTER INSERT OR UPDATE ON odds
+    FOR EACH ROW
+    EXECUTE FUNCTION update_odd_summary()
+    """)
+    for view_sql in ODDS_VIEWS_SQL:
+        op.execute(view_sql)
@@ -0,0 +1,38 @@
+"""sofascore_ft match index
+
+Revision ID: 6a6e0bbbcffd
+Revises: fc14a26e88ea
+Create Date: 2026-10-20 11:02:48.316274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a6e0bbbcffd'
+down_revision: Union[str, None] = 'fc14a26e88ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # sofascore_ft is created by the app at startup (Base.metadata.create_all),
+    # which also creates the index on a fresh database
+    if not sa.inspect(op.get_bind()).has_table("sofascore_ft"):
+        return
+    # Settlement and finalisation look up verified scores by match_id
+    with op.get_context().autocommit_block():
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sofascore_ft_match_id ON sofascore_ft (match_id)
+        WHERE match_id IS NOT NULL
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_sofascore_ft_match_id")
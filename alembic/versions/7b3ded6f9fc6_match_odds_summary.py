@@ -0,0 +1,133 @@
+"""match odds summary
+
+Revision ID: 7b3ded6f9fc6
+Revises: 9374c2a116a8
+Create Date: 2026-10-19 09:12:44.120531
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3ded6f9fc6'
+down_revision: Union[str, None] = '9374c2a116a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SUMMARY_TABLES = ['latest_odd', 'initial_odd', 'max_odds_home', 'max_odds_draw', 'max_odds_away']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One wide row per match replaces the five per-match summary tables
+    op.create_table(
+        'match_odds_summary',
+        sa.Column('match_id', sa.Text(), primary_key=True),
+        # Latest odds snapshot
+        sa.Column('odds_id', sa.Integer(), nullable=True),
+        sa.Column('event_status', sa.Text(), nullable=True),
+        sa.Column('match_time', sa.Text(), nullable=True),
+        sa.Column('home_score', sa.Integer(), nullable=True),
+        sa.Column('away_score', sa.Integer(), nullable=True),
+        sa.Column('home_win', sa.Float(), nullable=True),
+        sa.Column('draw', sa.Float(), nullable=True),
+        sa.Column('away_win', sa.Float(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        # First odds seen for the match
+        sa.Column('initial_odds_id', sa.Integer(), nullable=True),
+        sa.Column('initial_home_win', sa.Float(), nullable=True),
+        sa.Column('initial_draw', sa.Float(), nullable=True),
+        sa.Column('initial_away_win', sa.Float(), nullable=True),
+        sa.Column('initial_fetched_at', sa.DateTime(), nullable=True),
+        # Highest price seen per outcome
+        sa.Column('max_home_odds_id', sa.Integer(), nullable=True),
+        sa.Column('max_home_win', sa.Float(), nullable=True),
+        sa.Column('max_home_fetched_at', sa.DateTime(), nullable=True),
+        sa.Column('max_draw_odds_id', sa.Integer(), nullable=True),
+        sa.Column('max_draw', sa.Float(), nullable=True),
+        sa.Column('max_draw_fetched_at', sa.DateTime(), nullable=True),
+        sa.Column('max_away_odds_id', sa.Integer(), nullable=True),
+        sa.Column('max_away_win', sa.Float(), nullable=True),
+        sa.Column('max_away_fetched_at', sa.DateTime(), nullable=True),
+    )
+
+    # Backfill from the existing summary tables (latest_odd has a row for every match)
+    op.execute("""
+    INSERT INTO match_odds_summary
+    SELECT l.match_id, l.odds_id, l.event_status, l.match_time, l.home_score, l.away_score,
+           l.home_win, l.draw, l.away_win, l.fetched_at,
+           i.odds_id, i.home_win, i.draw, i.away_win, i.fetched_at,
+           mh.odds_id, mh.home_win, mh.fetched_at,
+           md.odds_id, md.draw, md.fetched_at,
+           ma.odds_id, ma.away_win, ma.fetched_at
+    FROM latest_odd l
+    LEFT JOIN initial_odd i ON i.match_id = l.match_id
+    LEFT JOIN max_odds_home mh ON mh.match_id = l.match_id
+    LEFT JOIN max_odds_draw md ON md.match_id = l.match_id
+    LEFT JOIN max_odds_away ma ON ma.match_id = l.match_id
+    """)
+
+    for table in SUMMARY_TABLES:
+        op.execute(f'DROP TABLE {table}')
+
+    # Compatibility views keep the old tables readable. Only prices and odds_ids are kept
+    # for the initial/max snapshots; the remaining columns come from the odds row itself.
+    op.execute("""
+    CREATE VIEW latest_odd AS
+    SELECT match_id, odds_id, event_status, match_time, home_score, away_score,
+           home_win, draw, away_win, fetched_at
+    FROM match_odds_summary
+    """)
+    op.execute("""
+    CREATE VIEW initial_odd AS
+    SELECT s.match_id, s.initial_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.initial_home_win AS home_win,
+           s.initial_draw AS draw, s.initial_away_win AS away_win,
+           s.initial_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.initial_odds_id
+    """)
+    op.execute("""
+    CREATE VIEW max_odds_home AS
+    SELECT s.match_id, s.max_home_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.max_home_win AS home_win, o.draw, o.away_win,
+           s.max_home_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_home_odds_id
+    WHERE s.max_home_odds_id IS NOT NULL
+    """)
+    op.execute("""
+    CREATE VIEW max_odds_draw AS
+    SELECT s.match_id, s.max_draw_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, s.max_draw AS draw, o.away_win,
+           s.max_draw_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_draw_odds_id
+    WHERE s.max_draw_odds_id IS NOT NULL
+    """)
+    op.execute("""
+    CREATE VIEW max_odds_away AS
+    SELECT s.match_id, s.max_away_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, o.draw, s.max_away_win AS away_win,
+           s.max_away_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_away_odds_id
+    WHERE s.max_away_odds_id IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Materialise the views back into tables before dropping the summary
+    for table in SUMMARY_TABLES:
+        op.execute(f'ALTER VIEW {table} RENAME TO {table}_view')
+        op.execute(f'CREATE TABLE {table} AS SELECT * FROM {table}_view')
+        op.execute(f'DROP VIEW {table}_view')
+        op.create_primary_key(f'{table}_pkey', table, ['match_id'])
+        op.create_index(f'ix_{table}_odds_id', table, ['odds_id'])
+        op.create_index(f'ix_{table}_fetched_at', table, ['fetched_at'])
+    op.drop_table('match_odds_summary')
@@ -0,0 +1,51 @@
+"""odds history packed
+
+Revision ID: ab953faf08f9
+Revises: 4b68467bf7cf
+Create Date: 2026-10-19 14:05:31.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab953faf08f9'
+down_revision: Union[str, None] = '4b68467bf7cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One row per archived match; element i of every array describes the same odds fetch
+    op.create_table(
+        'odds_history_packed',
+        sa.Column('match_id', sa.Text(), primary_key=True),
+        sa.Column('n_points', sa.Integer(), nullable=False),
+        sa.Column('first_fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('odds_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+        # Seconds since first_fetched_at
+        sa.Column('fetched_offsets', postgresql.ARRAY(sa.Integer()), nullable=False),
+        # Match clock in seconds (match_time "mm:ss")
+        sa.Column('clock_seconds', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.Column('home_scores', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.Column('away_scores', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.Column('home_win', postgresql.ARRAY(sa.REAL()), nullable=False),
+        sa.Column('draw', postgresql.ARRAY(sa.REAL()), nullable=False),
+        sa.Column('away_win', postgresql.ARRAY(sa.REAL()), nullable=False),
+        # Distinct event statuses in order of appearance; status_codes are 1-based indexes into it
+        sa.Column('statuses', postgresql.ARRAY(sa.Text()), nullable=False),
+        sa.Column('status_codes', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.Column('compacted_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    # Compress (pglz) and move the arrays out of line as soon as a row exceeds 256 bytes
+    op.execute("ALTER TABLE odds_history_packed SET (toast_tuple_target = 256)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('odds_history_packed')
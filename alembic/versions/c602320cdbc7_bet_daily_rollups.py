@@ -0,0 +1,92 @@
+"""bet daily rollups
+
+Revision ID: c602320cdbc7
+Revises: 1306f07fb167
+Create Date: 2026-10-21 09:12:44.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c602320cdbc7'
+down_revision: Union[str, None] = '1306f07fb167'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_COLUMNS = ('bets', 'stake', 'settled_stake', 'returns', 'won', 'lost', 'pending', 'odds_sum')
+
+ROLLUP_TOTALS_SQL = """
+count(*), coalesce(sum(amount), 0),
+coalesce(sum(amount) FILTER (WHERE outcome IN ('won', 'lost')), 0),
+coalesce(sum(expected_win) FILTER (WHERE outcome = 'won'), 0),
+count(*) FILTER (WHERE outcome = 'won'),
+count(*) FILTER (WHERE outcome = 'lost'),
+count(*) FILTER (WHERE outcome IS NULL OR outcome = 'pending'),
+coalesce(sum(expected_win / amount) FILTER (WHERE amount > 0), 0)
+"""
+
+
+def totals_columns() -> list:
+    counts = ('bets', 'won', 'lost', 'pending')
+    return [
+        sa.Column(name, sa.Integer() if name in counts else sa.Float(), nullable=False, server_default=sa.text('0'))
+        for name in ROLLUP_COLUMNS
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'bet_daily_user',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), primary_key=True),
+        *totals_columns(),
+    )
+    op.create_table(
+        'bet_daily_bot',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('bot_id', sa.Integer(), primary_key=True),
+        *totals_columns(),
+    )
+    op.create_table(
+        'bet_rollup_delta',
+        sa.Column('delta_id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bot_id', sa.Integer(), nullable=True),
+        *totals_columns(),
+    )
+
+    # Existing bets; new ones arrive through the rollup triggers created at startup
+    columns = ", ".join(ROLLUP_COLUMNS)
+    op.execute(f"""
+    INSERT INTO bet_daily_user (day, user_id, {columns})
+    SELECT created_at::date, user_id, {ROLLUP_TOTALS_SQL}
+    FROM bet WHERE created_at IS NOT NULL GROUP BY 1, 2
+    """)
+    op.execute(f"""
+    INSERT INTO bet_daily_bot (day, bot_id, {columns})
+    SELECT created_at::date, bot_id, {ROLLUP_TOTALS_SQL}
+    FROM bet WHERE created_at IS NOT NULL AND bot_id IS NOT NULL GROUP BY 1, 2
+    """)
+
+    # For rebuilding a date range
+    with op.get_context().autocommit_block():
+        op.create_index('ix_bet_created_at', 'bet', ['created_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS bet_rollup_insert_trigger ON "bet"')
+    op.execute('DROP TRIGGER IF EXISTS bet_rollup_update_trigger ON "bet"')
+    op.execute('DROP FUNCTION IF EXISTS record_bet_rollup_deltas()')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_bet_created_at', table_name='bet', postgresql_concurrently=True, if_exists=True)
+    op.drop_table('bet_rollup_delta')
+    op.drop_table('bet_daily_bot')
+    op.drop_table('bet_daily_user')
@@ -0,0 +1,33 @@
+"""live state publication
+
+Revision ID: e0be05d3d6af
+Revises: 63467f833edb
+Create Date: 2026-10-19 23:05:41.302117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0be05d3d6af'
+down_revision: Union[str, None] = '63467f833edb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables streamed to the in-memory caches of app/cdc.py. Replication slots are
+# created by the consumers themselves, and only when CDC is enabled.
+PUBLISHED_TABLES = ('match', 'match_odds_summary', 'bot', 'bet')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = ', '.join(f'"{t}"' for t in PUBLISHED_TABLES)
+    op.execute(f"CREATE PUBLICATION live_state FOR TABLE {tables}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP PUBLICATION IF EXISTS live_state")
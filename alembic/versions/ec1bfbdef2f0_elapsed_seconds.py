@@ -0,0 +1,62 @@
+"""elapsed seconds
+
+Revision ID: ec1bfbdef2f0
+Revises: 55297604d949
+Create Date: 2026-10-19 19:31:40.118524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ec1bfbdef2f0'
+down_revision: Union[str, None] = '55297604d949'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# "mm:ss" -> seconds, NULL when match_time isn't in that format
+ELAPSED_SECONDS_SQL = """
+CASE WHEN match_time ~ '^[0-9]+:[0-9]+$'
+     THEN split_part(match_time, ':', 1)::integer * 60 + split_part(match_time, ':', 2)::integer
+END
+"""
+
+LATEST_ODD_VIEW_SQL = """
+CREATE OR REPLACE VIEW latest_odd AS
+SELECT match_id, odds_id, event_status, match_time, home_score, away_score,
+       home_win, draw, away_win, fetched_at{extra}
+FROM match_odds_summary
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default: catalog-only, also on the odds partitions
+    for table in ('match', 'odds', 'match_odds_summary'):
+        op.add_column(table, sa.Column('elapsed_seconds', sa.Integer(), nullable=True))
+
+    # match and the summary are small; historical odds rows are left NULL (compaction
+    # falls back to parsing match_time for them)
+    op.execute(f'UPDATE "match" SET elapsed_seconds = {ELAPSED_SECONDS_SQL} WHERE match_time IS NOT NULL')
+    op.execute(f'UPDATE match_odds_summary SET elapsed_seconds = {ELAPSED_SECONDS_SQL} WHERE match_time IS NOT NULL')
+
+    # New columns can only be appended to a view
+    op.execute(LATEST_ODD_VIEW_SQL.format(extra=", elapsed_seconds"))
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_match_live_elapsed_seconds '
+            'ON "match" (elapsed_seconds) WHERE live'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP INDEX IF EXISTS ix_match_live_elapsed_seconds')
+    op.execute('DROP VIEW latest_odd')
+    op.execute(LATEST_ODD_VIEW_SQL.format(extra=""))
+    for table in ('match', 'odds', 'match_odds_summary'):
+        op.drop_column(table, 'elapsed_seconds')
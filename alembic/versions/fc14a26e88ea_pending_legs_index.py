@@ -0,0 +1,35 @@
+"""pending legs index
+
+Revision ID: fc14a26e88ea
+Revises: e0be05d3d6af
+Create Date: 2026-10-20 09:14:27.581903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fc14a26e88ea'
+down_revision: Union[str, None] = 'e0be05d3d6af'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The settlement job (app/tasks/settle_bets.py) looks for unsettled legs of
+    # ended matches; settled legs make up most of bet_event
+    with op.get_context().autocommit_block():
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bet_event_pending_match_id ON bet_event (match_id)
+        WHERE outcome IS NULL OR outcome = 'pending'
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_bet_event_pending_match_id")
@@ -0,0 +1,399 @@
+# app/cdc.py
+"""
+Optional change-data-capture consumer that keeps in-memory copies of match,
+match_odds_summary (latest_odd), bot and pending bets.
+
+Changes are read from a logical replication slot with the built-in pgoutput
+plugin, filtered by the live_state publication (created in migration
+e0be05d3d6af). On start the caches are loaded from a snapshot and the stream is
+replayed from the last checkpoint; `ready` is set once the stream has passed the
+snapshot's WAL position, after which the caches are current up to the last
+committed transaction. Changes of one transaction are applied together, under
+the cache lock.
+
+Enable with CDC_ENABLED=true (see CDC in app/config.py). Each process needs its
+own slot name. The server keeps WAL for a slot until it is consumed, so drop the
+slot of a retired process:
+
+    SELECT pg_drop_replication_slot('live_state_cache');
+
+The database user needs the REPLICATION attribute.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+import psycopg2
+import psycopg2.errors
+from psycopg2.extras import LogicalReplicationConnection
+
+from app.config import DB_CREDENTIALS, CDC
+
+logger = logging.getLogger(__name__)
+
+# Text-format values sent by pgoutput, parsed by type OID into the same Python
+# types psycopg2 returns for the snapshot. Other types stay strings.
+PARSERS = {
+    16: lambda v: v == "t",     # bool
+    20: int, 21: int, 23: int,  # int8, int2, int4
+    700: float, 701: float,     # float4, float8
+    1700: Decimal,              # numeric
+    114: json.loads,            # json
+    3802: json.loads,           # jsonb
+    1114: datetime.fromisoformat,  # timestamp
+    1184: datetime.fromisoformat,  # timestamptz
+}
+
+# Tables kept by default, with an optional filter on the rows worth keeping
+LIVE_TABLES = {
+    "match": None,
+    "match_odds_summary": None,
+    "bot": None,
+    # Settled bets are never looked at by the live consumers
+    "bet": lambda row: row["outcome"] in (None, "pending"),
+}
+
+# Columns of the latest_odd view, all taken from match_odds_summary
+LATEST_ODD_COLUMNS = (
+    "match_id", "odds_id", "event_status", "match_time", "elapsed_seconds",
+    "home_score", "away_score", "home_win", "draw", "away_win", "fetched_at",
+)
+
+# Marker for TOASTed values that an UPDATE left unchanged (not sent by pgoutput)
+UNCHANGED = object()
+
+
+def parse_lsn(lsn: str) -> int:
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def format_lsn(lsn: int) -> str:
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
+@dataclass
+class Relation:
+    schema: str
+    name: str
+    columns: list[str]
+    parsers: list
+    key_columns: list[str]
+
+
+class PgOutputMessage:
+    """Cursor over one pgoutput message (protocol version 1)."""
+
+    def __init__(self, payload: bytes):
+        self.payload = payload
+        self.offset = 1
+
+    @property
+    def kind(self) -> str:
+        return chr(self.payload[0])
+
+    def unpack(self, fmt: str):
+        values = struct.unpack_from(fmt, self.payload, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values if len(values) > 1 else values[0]
+
+    def string(self) -> str:
+        end = self.payload.index(b"\0", self.offset)
+        value = self.payload[self.offset:end].decode()
+        self.offset = end + 1
+        return value
+
+    def char(self) -> str:
+        return chr(self.unpack("!B"))
+
+    def tuple_data(self, relation: Relation) -> list:
+        values = []
+        for i in range(self.unpack("!H")):
+            kind = self.char()
+            if kind == "n":
+                values.append(None)
+            elif kind == "u":
+                values.append(UNCHANGED)
+            else:
+                length = self.unpack("!I")
+                raw = self.payload[self.offset:self.offset + length].decode()
+                self.offset += length
+                parser = relation.parsers[i]
+                values.append(parser(raw) if parser else raw)
+        return values
+
+
+class TableCache:
+    """Rows of one table keyed by primary key (a tuple for composite keys)."""
+
+    def __init__(self, name: str, keep=None):
+        self.name = name
+        self.keep = keep
+        self.key_columns: list[str] = []
+        self.rows: dict = {}
+
+    def key(self, row: dict):
+        if len(self.key_columns) == 1:
+            return row[self.key_columns[0]]
+        return tuple(row[c] for c in self.key_columns)
+
+    def put(self, row: dict):
+        if self.keep is None or self.keep(row):
+            self.rows[self.key(row)] = row
+        else:
+            self.rows.pop(self.key(row), None)
+
+
+class LiveState:
+    """
+    In-memory copies of the published tables, kept current by consume().
+    Readers use get()/rows()/latest_odd(), which copy under the lock.
+    """
+
+    def __init__(self, tables: dict = LIVE_TABLES, schema: str = "public",
+                 publication: str = CDC["publication"], slot: str = CDC["slot"],
+                 checkpoint_path: str = CDC["checkpoint_path"]):
+        self.schema = schema
+        self.publication = publication
+        self.slot = slot
+        self.checkpoint_path = checkpoint_path
+        self.tables = {name: TableCache(name, keep) for name, keep in tables.items()}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.lsn = 0  # end of the last applied transaction
+        self.snapshot_lsn = 0
+        self.relations: dict[int, Relation] = {}
+        self.pending: list = []
+
+    # --- Reading -----------------------------------------------------------
+
+    def get(self, table: str, key) -> dict | None:
+        with self.lock:
+            row = self.tables[table].rows.get(key)
+            return dict(row) if row is not None else None
+
+    def rows(self, table: str) -> list[dict]:
+        with self.lock:
+            return [dict(row) for row in self.tables[table].rows.values()]
+
+    def latest_odd(self, match_id: str) -> dict | None:
+        """The latest_odd row of a match."""
+        summary = self.get("match_odds_summary", match_id)
+        if summary is None:
+            return None
+        return {c: summary[c] for c in LATEST_ODD_COLUMNS}
+
+    # --- Checkpoint --------------------------------------------------------
+
+    def read_checkpoint(self) -> int:
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if checkpoint.get("slot") != self.slot:
+            return 0
+        return parse_lsn(checkpoint["lsn"])
+
+    def checkpoint(self, cur, reply: bool = False):
+        """Confirm the applied position to the slot and save it locally."""
+        cur.send_feedback(flush_lsn=self.lsn, reply=reply)
+        if self.lsn:
+            self.write_checkpoint()
+
+    def write_checkpoint(self):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"slot": self.slot, "lsn": format_lsn(self.lsn), "written_at": datetime.utcnow().isoformat()}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- Snapshot ----------------------------------------------------------
+
+    def load_snapshot(self):
+        """Reload every cache in one snapshot and remember its WAL position."""
+        conn = psycopg2.connect(**connection_kwargs())
+        try:
+            conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_current_wal_lsn()::text")
+                snapshot_lsn = parse_lsn(cur.fetchone()[0])
+                loaded = {}
+                for name, cache in self.tables.items():
+                    cur.execute("""
+                        SELECT a.attname
+                        FROM pg_index i
+                        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                        WHERE i.indrelid = %s::regclass AND i.indisprimary
+                        ORDER BY array_position(i.indkey, a.attnum)
+                    """, (f'"{self.schema}"."{name}"',))
+                    key_columns = [r[0] for r in cur.fetchall()]
+                    cur.execute(f'SELECT * FROM "{self.schema}"."{name}"')
+                    columns = [d.name for d in cur.description]
+                    loaded[name] = (key_columns, [dict(zip(columns, r)) for r in cur.fetchall()])
+            conn.rollback()
+        finally:
+            conn.close()
+
+        with self.lock:
+            for name, (key_columns, rows) in loaded.items():
+                cache = self.tables[name]
+                cache.key_columns = key_columns
+                cache.rows = {}
+                for row in rows:
+                    cache.put(row)
+            self.snapshot_lsn = snapshot_lsn
+        logger.info(
+            f"CDC snapshot at {format_lsn(snapshot_lsn)}: "
+            + ", ".join(f"{name} {len(cache.rows)}" for name, cache in self.tables.items())
+        )
+
+    # --- Stream ------------------------------------------------------------
+
+    def handle(self, payload: bytes):
+        msg = PgOutputMessage(payload)
+        kind = msg.kind
+        if kind == "B":
+            self.pending = []
+        elif kind == "C":
+            _flags, _commit_lsn, end_lsn, _commit_ts = msg.unpack("!bqqq")
+            self.apply(self.pending, end_lsn)
+            self.pending = []
+        elif kind == "R":
+            relid = msg.unpack("!I")
+            schema, name = msg.string(), msg.string()
+            msg.unpack("!b")  # replica identity setting
+            columns, parsers, key_columns = [], [], []
+            for _ in range(msg.unpack("!H")):
+                flags = msg.unpack("!b")
+                column = msg.string()
+                type_oid, _typmod = msg.unpack("!Ii")
+                columns.append(column)
+                parsers.append(PARSERS.get(type_oid))
+                if flags & 1:
+                    key_columns.append(column)
+            self.relations[relid] = Relation(schema, name, columns, parsers, key_columns)
+        elif kind in "IUD":
+            relation = self.relations[msg.unpack("!I")]
+            old = new = None
+            marker = msg.char()
+            if marker in "KO":
+                old = dict(zip(relation.columns, msg.tuple_data(relation)))
+                if kind == "U":
+                    marker = msg.char()
+            if marker == "N":
+                new = dict(zip(relation.columns, msg.tuple_data(relation)))
+            self.pending.append((kind, relation, old, new))
+        elif kind == "T":
+            count = msg.unpack("!I")
+            msg.unpack("!b")  # options
+            for _ in range(count):
+                self.pending.append(("T", self.relations[msg.unpack("!I")], None, None))
+        # Type ("Y"), origin ("O") and logical messages ("M") carry nothing cached
+
+    def apply(self, changes: list, end_lsn: int):
+        with self.lock:
+            for kind, relation, old, new in changes:
+                cache = self.tables.get(relation.name)
+                if cache is None or relation.schema != self.schema:
+                    continue
+                cache.key_columns = relation.key_columns or cache.key_columns
+                if kind == "T":
+                    cache.rows = {}
+                    continue
+                if old is not None:
+                    # Key-only tuple of a DELETE, or of an UPDATE that changed the key
+                    previous = cache.rows.pop(cache.key(old), None)
+                else:
+                    previous = cache.rows.get(cache.key(new)) if new is not None else None
+                if kind == "D" or new is None:
+                    continue
+                if any(v is UNCHANGED for v in new.values()):
+                    new = {c: (previous or {}).get(c) if v is UNCHANGED else v for c, v in new.items()}
+                cache.put(new)
+            self.lsn = max(self.lsn, end_lsn)
+            if not self.ready.is_set() and self.lsn >= self.snapshot_lsn:
+                self.ready.set()
+                logger.info(f"CDC caches current at {format_lsn(self.lsn)}")
+
+    def consume(self, stop: threading.Event):
+        """Snapshot, then stream changes until stop is set or the connection fails."""
+        self.ready.clear()
+        conn = psycopg2.connect(**connection_kwargs(), connection_factory=LogicalReplicationConnection)
+        try:
+            cur = conn.cursor()
+            try:
+                cur.create_replication_slot(self.slot, output_plugin="pgoutput")
+                logger.info(f"Created replication slot {self.slot}")
+            except psycopg2.errors.DuplicateObject:
+                pass
+            self.load_snapshot()
+            self.pending = []
+            self.relations = {}
+            start_lsn = self.read_checkpoint()
+            cur.start_replication(
+                slot_name=self.slot,
+                decode=False,
+                start_lsn=start_lsn,
+                options={"proto_version": "1", "publication_names": self.publication},
+            )
+            logger.info(f"Streaming changes from slot {self.slot} at {format_lsn(start_lsn)}")
+
+            last_feedback = 0.0
+            while not stop.is_set():
+                msg = cur.read_message()
+                if msg is not None:
+                    self.handle(msg.payload)
+                    continue
+                if not self.pending and cur.wal_end:
+                    # Between transactions everything up to wal_end has been
+                    # applied (or didn't touch the published tables)
+                    with self.lock:
+                        self.lsn = max(self.lsn, cur.wal_end)
+                        if not self.ready.is_set() and self.lsn >= self.snapshot_lsn:
+                            self.ready.set()
+                            logger.info(f"CDC caches current at {format_lsn(self.lsn)}")
+                now = time.monotonic()
+                if now - last_feedback >= CDC["feedback_seconds"] or not self.ready.is_set():
+                    # Until ready, also ask for a keepalive so wal_end moves on an idle server
+                    self.checkpoint(cur, reply=not self.ready.is_set())
+                    last_feedback = now
+                select.select([cur], [], [], 1.0)
+            self.checkpoint(cur)
+        finally:
+            self.ready.clear()
+            conn.close()
+
+
+def connection_kwargs() -> dict:
+    return {
+        "user": DB_CREDENTIALS["user"],
+        "password": DB_CREDENTIALS["password"],
+        "host": DB_CREDENTIALS["host"],
+        "port": DB_CREDENTIALS["port"],
+        "dbname": DB_CREDENTIALS["dbname"],
+    }
+
+
+live_state = LiveState()
+
+
+async def periodic_consume_changes():
+    stop = threading.Event()
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(live_state.consume, stop)
+            except Exception as e:
+                logger.error(f"Error in periodic_consume_changes: {e}")
+            await asyncio.sleep(5)
+    finally:
+        # The consumer thread notices within a second and closes its connection
+        stop.set()
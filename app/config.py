@@ -22,4 +22,84 @@ API_URLS = {
     "live": os.getenv("LIVE_URL"),
     "football": os.getenv("FOOTBALL_URL"),
     "basketball": os.getenv("BASKETBALL_URL"),
-}
\ No newline at end of file
+}
+# Daily partitions of the odds table (see app/tasks/manage_odds_partitions.py)
+ODDS_PARTITIONS = {
+    "premake_days": int(os.getenv("ODDS_PARTITION_PREMAKE_DAYS", "3")),
+    "retention_days": int(os.getenv("ODDS_RETENTION_DAYS", "30")),
+    # Partitions are retired once every match in them has packed odds history.
+    # "drop" removes them, "archive" moves them into the odds_archive schema (to
+    # be dumped and dropped from there), "detach" keeps them as standalone tables
+    "retention_mode": os.getenv("ODDS_RETENTION_MODE", "drop"),
+}
+ODDS_RETENTION_MODES = ("detach", "archive", "drop")
+if ODDS_PARTITIONS["retention_mode"] not in ODDS_RETENTION_MODES:
+    raise ValueError(f"ODDS_RETENTION_MODE must be one of {', '.join(ODDS_RETENTION_MODES)}, "
+                     f"not {ODDS_PARTITIONS['retention_mode']!r}")
+
+# Packed odds history of archived matches (see app/tasks/compact_odds_history.py)
+ODDS_HISTORY = {
+    "compaction_batch_size": int(os.getenv("ODDS_COMPACTION_BATCH_SIZE", "200")),
+    # Tiered retention (see app/tasks/downsample_odds_history.py): packed history is
+    # reduced to per-minute points plus price moves above change_threshold, and to
+    # opening/closing/extremes once it is older than minute_tier_days
+    "change_threshold": float(os.getenv("ODDS_CHANGE_THRESHOLD", "0.02")),
+    "minute_tier_days": int(os.getenv("ODDS_MINUTE_TIER_DAYS", "90")),
+    "retention_batch_size": int(os.getenv("ODDS_RETENTION_BATCH_SIZE", "50")),
+}
+
+# LISTEN/NOTIFY fan-out of odds and match changes (see app/notifications.py)
+NOTIFICATIONS = {
+    # Per-subscriber backlog; the oldest notifications are dropped beyond it
+    "queue_size": int(os.getenv("NOTIFY_QUEUE_SIZE", "1000")),
+    "keepalive_seconds": int(os.getenv("NOTIFY_KEEPALIVE_SECONDS", "30")),
+}
+
+# Logical-replication change stream into in-memory caches (see app/cdc.py)
+CDC = {
+    "enabled": os.getenv("CDC_ENABLED", "false").lower() == "true",
+    "publication": os.getenv("CDC_PUBLICATION", "live_state"),
+    # One slot per consuming process
+    "slot": os.getenv("CDC_SLOT", "live_state_cache"),
+    "checkpoint_path": os.getenv("CDC_CHECKPOINT_PATH", "cdc_checkpoint.json"),
+    "feedback_seconds": int(os.getenv("CDC_FEEDBACK_SECONDS", "10")),
+}
+
+# Bet settlement (see app/tasks/settle_bets.py): "batch" settles ended matches
+# from a periodic job, "trigger" keeps the row-level match_end_trigger
+SETTLEMENT = {
+    "mode": os.getenv("SETTLEMENT_MODE", "batch"),
+    "batch_size": int(os.getenv("SETTLEMENT_BATCH_SIZE", "500")),
+    "interval_seconds": int(os.getenv("SETTLEMENT_INTERVAL_SECONDS", "30")),
+}
+SETTLEMENT_MODES = ("batch", "trigger")
+if SETTLEMENT["mode"] not in SETTLEMENT_MODES:
+    raise ValueError(f"SETTLEMENT_MODE must be one of {', '.join(SETTLEMENT_MODES)}, "
+                     f"not {SETTLEMENT['mode']!r}")
+
+# Append-only balance ledger folded into user.balance (see app/ledger.py)
+LEDGER = {
+    "fold_batch_size": int(os.getenv("LEDGER_FOLD_BATCH_SIZE", "5000")),
+    "fold_interval_seconds": int(os.getenv("LEDGER_FOLD_INTERVAL_SECONDS", "5")),
+    "reconcile_interval_seconds": int(os.getenv("LEDGER_RECONCILE_INTERVAL_SECONDS", "3600")),
+}
+
+# Settled bets checked against verified SofaScore results (see app/tasks/validate_bets.py)
+VALIDATION = {
+    "batch_size": int(os.getenv("VALIDATION_BATCH_SIZE", "50000")),
+    "interval_seconds": int(os.getenv("VALIDATION_INTERVAL_SECONDS", "300")),
+}
+
+# Daily bet totals per user and bot (see app/rollups.py)
+ROLLUPS = {
+    "fold_batch_size": int(os.getenv("ROLLUPS_FOLD_BATCH_SIZE", "10000")),
+    "fold_interval_seconds": int(os.getenv("ROLLUPS_FOLD_INTERVAL_SECONDS", "10")),
+}
+
+# User bot runs (see app/tasks/run_user_bots.py and app/tasks/trigger_user_bots.py):
+# matches are re-evaluated as their changes are notified, batched over
+# event_debounce_seconds, with a full sweep every sweep_interval_seconds
+BOTS = {
+    "event_debounce_seconds": float(os.getenv("BOTS_EVENT_DEBOUNCE_SECONDS", "0.5")),
+    "sweep_interval_seconds": int(os.getenv("BOTS_SWEEP_INTERVAL_SECONDS", "300")),
+}
@@ -0,0 +1,154 @@
+"""
+Append-only balance ledger.
+
+Bet stakes, win credits and manual adjustments are appended to balance_ledger
+instead of updating user.balance in place, so placing and settling many bets
+for one user no longer queues on that user's row lock. user.balance is a
+materialisation of the folded entries; periodic_fold_ledger adds new entries to
+it in batches, and get_balance adds the ones not folded yet.
+"""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import LEDGER
+from app.database import async_session
+from app.models import BalanceLedger
+
+logger = logging.getLogger(__name__)
+
+# A single statement sees the fold's ledger and user updates together or not at all
+BALANCE_SQL = """
+SELECT u.balance + coalesce((
+    SELECT sum(l.amount) FROM balance_ledger l WHERE l.user_id = u.user_id AND l.folded_at IS NULL
+), 0)
+FROM "user" u
+WHERE u.user_id = :user_id
+"""
+
+FOLD_SQL = """
+WITH batch AS (
+    SELECT entry_id FROM balance_ledger WHERE folded_at IS NULL LIMIT :batch_size
+),
+folded AS (
+    UPDATE balance_ledger l
+    SET folded_at = now()
+    FROM batch b
+    WHERE l.entry_id = b.entry_id AND l.folded_at IS NULL
+    RETURNING l.user_id, l.amount
+),
+totals AS (
+    SELECT user_id, sum(amount) AS amount, count(*) AS entries FROM folded GROUP BY user_id
+),
+applied AS (
+    UPDATE "user" u
+    SET balance = u.balance + t.amount
+    FROM totals t
+    WHERE u.user_id = t.user_id
+    RETURNING u.user_id
+)
+SELECT coalesce(sum(entries), 0) AS entries, (SELECT count(*) FROM applied) AS users FROM totals
+"""
+
+# Users whose materialised balance differs from the sum of their folded entries
+RECONCILE_BALANCES_SQL = """
+SELECT u.user_id, u.balance, coalesce(l.folded, 0) AS ledger
+FROM "user" u
+LEFT JOIN (
+    SELECT user_id, sum(amount) AS folded FROM balance_ledger WHERE folded_at IS NOT NULL GROUP BY user_id
+) l ON l.user_id = u.user_id
+WHERE abs(u.balance - coalesce(l.folded, 0)) > 0.005
+ORDER BY u.user_id
+"""
+
+# Won bets placed through the ledger that were never credited
+RECONCILE_CREDITS_SQL = """
+SELECT b.bet_id, b.user_id
+FROM bet b
+WHERE b.outcome = 'won'
+  AND EXISTS (SELECT 1 FROM balance_ledger d WHERE d.bet_id = b.bet_id AND d.kind = 'bet_debit')
+  AND NOT EXISTS (SELECT 1 FROM balance_ledger c WHERE c.bet_id = b.bet_id AND c.kind = 'win_credit')
+ORDER BY b.bet_id
+"""
+
+
+def entry(user_id: int, amount: float, kind: str, bet_id: int = None) -> dict:
+    return {"user_id": user_id, "amount": amount, "kind": kind, "bet_id": bet_id}
+
+
+async def record(session: AsyncSession, entries: list[dict]):
+    """Append entries in the caller's transaction."""
+    if entries:
+        # With RETURNING, many entries go in as multi-row INSERTs of up to 1000
+        # rows instead of one statement per entry
+        await session.execute(insert(BalanceLedger).returning(BalanceLedger.entry_id), entries)
+
+
+async def debit_bet(session: AsyncSession, user_id: int, bet_id: int, stake: float):
+    await record(session, [entry(user_id, -stake, "bet_debit", bet_id)])
+
+
+async def lock_balance(session: AsyncSession, user_id: int):
+    """
+    Serialise balance checks and debits for user_id until the caller's transaction
+    ends, so two concurrent bets can't both pass a check against the same balance.
+    """
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('balance'), :user_id)"), {"user_id": user_id})
+
+
+async def get_balance(session: AsyncSession, user_id: int):
+    """Current balance including entries not folded yet; None for an unknown user."""
+    return await session.scalar(text(BALANCE_SQL), {"user_id": user_id})
+
+
+async def fold_ledger(session: AsyncSession, batch_size: int) -> int:
+    """Add up to batch_size unfolded entries to user.balance; returns how many."""
+    try:
+        # One folder at a time, so no entry is added twice
+        locked = await session.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext('fold_ledger'))"))
+        if not locked:
+            await session.rollback()
+            return 0
+        folded = (await session.execute(text(FOLD_SQL), {"batch_size": batch_size})).one()
+        await session.commit()
+    except Exception as e:
+        logger.error(f"fold_ledger() failed: {e}")
+        await session.rollback()
+        return 0
+    return folded.entries
+
+
+async def reconcile_balances(session: AsyncSession) -> dict:
+    """Balances that disagree with the ledger, and won bets without a credit."""
+    balances = (await session.execute(text(RECONCILE_BALANCES_SQL))).fetchall()
+    credits = (await session.execute(text(RECONCILE_CREDITS_SQL))).fetchall()
+    return {
+        "balances": [{"user_id": r.user_id, "balance": r.balance, "ledger": r.ledger} for r in balances],
+        "missing_credits": [{"bet_id": r.bet_id, "user_id": r.user_id} for r in credits],
+    }
+
+
+async def periodic_fold_ledger():
+    last_reconcile = 0.0
+    while True:
+        try:
+            while True:
+                async with async_session() as session:
+                    folded = await fold_ledger(session, LEDGER["fold_batch_size"])
+                if folded < LEDGER["fold_batch_size"]:
+                    break
+
+            if time.monotonic() - last_reconcile >= LEDGER["reconcile_interval_seconds"]:
+                last_reconcile = time.monotonic()
+                async with async_session() as session:
+                    problems = await reconcile_balances(session)
+                for row in problems["balances"]:
+                    logger.error(f"Balance of user {row['user_id']} is {row['balance']}, ledger says {row['ledger']}")
+                for row in problems["missing_credits"]:
+                    logger.error(f"Won bet {row['bet_id']} of user {row['user_id']} has no win credit")
+        except Exception as e:
+            logger.error(f"Error in periodic_fold_ledger: {e}")
+        await asyncio.sleep(LEDGER["fold_interval_seconds"])
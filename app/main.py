@@ -7,17 +7,29 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.database import engine, Base
+from app.database import engine, async_session, Base
 from app.triggers import create_trigger_functions
+from app.views import check_views, create_views, stored_tables
 from app.tasks.fetch_pregame_odds import periodic_fetch_pregame
 from app.tasks.fetch_live_odds import periodic_fetch_live
 from app.tasks.cleanup import periodic_cleanup
 from app.tasks.archive_ended_matches import periodic_archive_ended_matches
 from app.tasks.run_user_bots import periodic_run_all_bots
+from app.tasks.trigger_user_bots import periodic_run_bots_on_changes
 from app.tasks.update_sofascore_ft import periodic_fetch_sofascore
+from app.tasks.manage_odds_partitions import ensure_odds_partitions, periodic_manage_odds_partitions
+from app.tasks.compact_odds_history import periodic_compact_odds_history
+from app.tasks.downsample_odds_history import periodic_downsample_odds_history
+from app.notifications import periodic_listen_notifications
+from app.cdc import periodic_consume_changes
+from app.tasks.settle_bets import periodic_settle_bets
+from app.tasks.validate_bets import periodic_validate_bets
+from app.ledger import periodic_fold_ledger
+from app.rollups import periodic_fold_rollups
+from app.config import CDC, ODDS_PARTITIONS
 
 # Import the new router
-from app.routers import sofascore
+from app.routers import sofascore, odds, bets
 
 # Configure logging
 logging.basicConfig(
@@ -31,16 +43,35 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await check_views(conn)
+        # Models mapped onto views are left to create_views
+        await conn.run_sync(Base.metadata.create_all, tables=stored_tables())
+        await create_views(conn)
         await create_trigger_functions(conn)
+    # Odds are written straight into the daily partitions, so today's must exist
+    # before the fetchers start
+    async with async_session() as session:
+        await ensure_odds_partitions(session, ODDS_PARTITIONS["premake_days"])
     tasks = [
         asyncio.create_task(periodic_fetch_live()),
         # asyncio.create_task(periodic_fetch_pregame()),
         asyncio.create_task(periodic_cleanup()),
         asyncio.create_task(periodic_archive_ended_matches()),
         asyncio.create_task(periodic_run_all_bots()),
+        asyncio.create_task(periodic_run_bots_on_changes()),
         asyncio.create_task(periodic_fetch_sofascore()),
+        asyncio.create_task(periodic_manage_odds_partitions()),
+        asyncio.create_task(periodic_compact_odds_history()),
+        asyncio.create_task(periodic_downsample_odds_history()),
+        asyncio.create_task(periodic_listen_notifications()),
+        asyncio.create_task(periodic_fold_ledger()),
+        asyncio.create_task(periodic_fold_rollups()),
+        asyncio.create_task(periodic_validate_bets()),
+        # SofaScore finalisation in both modes, batch settlement in "batch" mode
+        asyncio.create_task(periodic_settle_bets()),
     ]
+    if CDC["enabled"]:
+        tasks.append(asyncio.create_task(periodic_consume_changes()))
     try:
         yield
     finally:
@@ -55,6 +86,8 @@ app = FastAPI(lifespan=lifespan)
 
 # Register the router
 app.include_router(sofascore.router)
+app.include_router(odds.router)
+app.include_router(bets.router)
 
 @app.get("/health")
 async def health_check():
@@ -1,11 +1,13 @@
-from sqlalchemy import Column, Text, DateTime, Integer, Boolean, Float, ForeignKey, JSON, Index
-from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy.sql import func # Import func for server_default
+from sqlalchemy import Column, Text, Date, DateTime, Integer, BigInteger, SmallInteger, Boolean, Float, REAL, ForeignKey, JSON, Index, PrimaryKeyConstraint
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func, text # Import func for server_default
 from datetime import datetime
+from collections import namedtuple
 
-# Base is defined in this file according to your provided code.
-# Ideally, Base should be defined once (e.g., in app/database.py) and imported.
-Base = declarative_base()
+# The Base of app/database.py, so the create_all run at startup (app/main.py)
+# sees these models
+from app.database import Base
 
 class Bot(Base):
     __tablename__ = "bot"
@@ -24,6 +26,12 @@ class Bot(Base):
 
 class Match(Base):
     __tablename__ = 'match'
+    __table_args__ = (
+        Index('ix_match_category_active', 'category',
+              postgresql_where=text("lower(event_status) NOT IN ('pregame', 'ended')")),
+        Index('ix_match_status_start_time', text('lower(event_status)'), 'start_time'),
+        Index('ix_match_live_elapsed_seconds', 'elapsed_seconds', postgresql_where=text('live')),
+    )
     match_id = Column(Text, primary_key=True, index=True)
     competition_name = Column(Text, index=True, nullable=True)
     category = Column(Text, nullable=True)
@@ -34,6 +42,7 @@ class Match(Base):
     live = Column(Boolean, default=False, index=True)
     start_time = Column(DateTime, nullable=True)
     match_time = Column(Text, nullable=True)
+    elapsed_seconds = Column(Integer, nullable=True)  # match_time in seconds
 
 class EndedMatch(Base):
     __tablename__ = 'ended_match'
@@ -48,25 +57,118 @@ class EndedMatch(Base):
     start_time = Column(DateTime, nullable=True)
     match_time = Column(Text, nullable=True)
 
+class OddsStatus(Base):
+    __tablename__ = 'odds_status'
+    status_code = Column(SmallInteger, primary_key=True)
+    event_status = Column(Text, nullable=False, unique=True)
+
+# Range-partitioned by day on fetched_at; partitions are managed by app/tasks/manage_odds_partitions.py
+class OddsCompact(Base):
+    """Storage for odds rows: prices in thousandths, status and clock as small codes."""
+    __tablename__ = 'odds_compact'
+    __table_args__ = (
+        PrimaryKeyConstraint('odds_id', 'fetched_at'),
+        Index('ix_odds_compact_match_id_fetched_at', 'match_id', 'fetched_at'),
+        Index('ix_odds_compact_fetched_at', 'fetched_at', postgresql_using='brin'),
+        {'postgresql_partition_by': 'RANGE (fetched_at)'},
+    )
+    fetched_at = Column(DateTime, server_default=func.now(), primary_key=True)
+    odds_id = Column(Integer, primary_key=True, autoincrement=True)
+    home_win_milli = Column(Integer, nullable=True)
+    draw_milli = Column(Integer, nullable=True)
+    away_win_milli = Column(Integer, nullable=True)
+    status_code = Column(SmallInteger, nullable=True)  # odds_status.status_code
+    elapsed_seconds = Column(SmallInteger, nullable=True)
+    home_score = Column(SmallInteger, nullable=True)
+    away_score = Column(SmallInteger, nullable=True)
+    match_id = Column(Text)
+
+# odds is a view in the original row shape over odds_compact (and the retired
+# odds_wide table); inserts into it are encoded by the odds_insert_trigger.
+# Views are marked with info["is_view"] so alembic autogenerate skips them.
 class Odds(Base):
     __tablename__ = 'odds'
+    __table_args__ = {'info': {'is_view': True}}
     odds_id = Column(Integer, primary_key=True, autoincrement=True)
-    match_id = Column(Text, index=True)
+    match_id = Column(Text)
     event_status = Column(Text, nullable=True)
     match_time = Column(Text, nullable=True)
+    elapsed_seconds = Column(Integer, nullable=True)
     home_score = Column(Integer, nullable=True)
     away_score = Column(Integer, nullable=True)
     home_win = Column(Float, nullable=True)
     draw = Column(Float, nullable=True)
     away_win = Column(Float, nullable=True)
-    fetched_at = Column(DateTime, server_default=func.now(), index=True)
+    fetched_at = Column(DateTime, server_default=func.now(), primary_key=True)
 
+class OddsHistoryPacked(Base):
+    """Odds history of an archived match, one array element per odds fetch (see app/odds_history.py)."""
+    __tablename__ = 'odds_history_packed'
+    match_id = Column(Text, primary_key=True)
+    n_points = Column(Integer, nullable=False)
+    first_fetched_at = Column(DateTime, nullable=False)
+    odds_ids = Column(ARRAY(Integer), nullable=False)
+    fetched_offsets = Column(ARRAY(Integer), nullable=False)  # seconds since first_fetched_at
+    clock_seconds = Column(ARRAY(SmallInteger), nullable=False)  # match_time in seconds
+    home_scores = Column(ARRAY(SmallInteger), nullable=False)
+    away_scores = Column(ARRAY(SmallInteger), nullable=False)
+    home_win = Column(ARRAY(REAL), nullable=False)
+    draw = Column(ARRAY(REAL), nullable=False)
+    away_win = Column(ARRAY(REAL), nullable=False)
+    statuses = Column(ARRAY(Text), nullable=False)
+    status_codes = Column(ARRAY(SmallInteger), nullable=False)  # 1-based indexes into statuses
+    compacted_at = Column(DateTime, server_default=func.now(), nullable=False)
+    resolution = Column(Text, nullable=False, server_default="full")  # "full", "minute" or "extremes"
+
+# Prices of one odds snapshot (see MatchOddsSummary.initial)
+OddsPrices = namedtuple("OddsPrices", ["odds_id", "home_win", "draw", "away_win", "fetched_at"])
+
+class MatchOddsSummary(Base):
+    """One row per match, maintained by the odds summary trigger."""
+    __tablename__ = 'match_odds_summary'
+    match_id = Column(Text, primary_key=True)
+    # Latest odds snapshot
+    odds_id = Column(Integer, nullable=True)
+    event_status = Column(Text, nullable=True)
+    match_time = Column(Text, nullable=True)
+    elapsed_seconds = Column(Integer, nullable=True)
+    home_score = Column(Integer, nullable=True)
+    away_score = Column(Integer, nullable=True)
+    home_win = Column(Float, nullable=True)
+    draw = Column(Float, nullable=True)
+    away_win = Column(Float, nullable=True)
+    fetched_at = Column(DateTime, nullable=True)
+    # First odds seen for the match
+    initial_odds_id = Column(Integer, nullable=True)
+    initial_home_win = Column(Float, nullable=True)
+    initial_draw = Column(Float, nullable=True)
+    initial_away_win = Column(Float, nullable=True)
+    initial_fetched_at = Column(DateTime, nullable=True)
+    # Highest price seen per outcome
+    max_home_odds_id = Column(Integer, nullable=True)
+    max_home_win = Column(Float, nullable=True)
+    max_home_fetched_at = Column(DateTime, nullable=True)
+    max_draw_odds_id = Column(Integer, nullable=True)
+    max_draw = Column(Float, nullable=True)
+    max_draw_fetched_at = Column(DateTime, nullable=True)
+    max_away_odds_id = Column(Integer, nullable=True)
+    max_away_win = Column(Float, nullable=True)
+    max_away_fetched_at = Column(DateTime, nullable=True)
+
+    @property
+    def initial(self) -> OddsPrices:
+        return OddsPrices(self.initial_odds_id, self.initial_home_win, self.initial_draw,
+                          self.initial_away_win, self.initial_fetched_at)
+
+# latest_odd, initial_odd and max_odds_* are read-only views over match_odds_summary
 class LatestOdd(Base):
     __tablename__ = 'latest_odd'
+    __table_args__ = {'info': {'is_view': True}}
     match_id = Column(Text, primary_key=True)
     odds_id = Column(Integer, index=True)
     event_status = Column(Text, nullable=True)
     match_time = Column(Text, nullable=True)
+    elapsed_seconds = Column(Integer, nullable=True)
     home_score = Column(Integer, nullable=True)
     away_score = Column(Integer, nullable=True)
     home_win = Column(Float, nullable=True)
@@ -76,6 +178,7 @@ class LatestOdd(Base):
 
 class InitialOdd(Base):
     __tablename__ = 'initial_odd'
+    __table_args__ = {'info': {'is_view': True}}
     match_id = Column(Text, primary_key=True)
     odds_id = Column(Integer, index=True)
     event_status = Column(Text, nullable=True)
@@ -89,6 +192,7 @@ class InitialOdd(Base):
 
 class MaxOddsHome(Base):
     __tablename__ = 'max_odds_home'
+    __table_args__ = {'info': {'is_view': True}}
     match_id = Column(Text, primary_key=True)
     odds_id = Column(Integer, index=True)
     event_status = Column(Text, nullable=True)
@@ -102,6 +206,7 @@ class MaxOddsHome(Base):
 
 class MaxOddsDraw(Base):
     __tablename__ = 'max_odds_draw'
+    __table_args__ = {'info': {'is_view': True}}
     match_id = Column(Text, primary_key=True)
     odds_id = Column(Integer, index=True)
     event_status = Column(Text, nullable=True)
@@ -115,6 +220,7 @@ class MaxOddsDraw(Base):
 
 class MaxOddsAway(Base):
     __tablename__ = 'max_odds_away'
+    __table_args__ = {'info': {'is_view': True}}
     match_id = Column(Text, primary_key=True)
     odds_id = Column(Integer, index=True)
     event_status = Column(Text, nullable=True)
@@ -138,9 +244,91 @@ class User(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+# Every change to a user's balance, append-only. user.balance is the sum of the
+# folded entries; unfolded ones are added on read (see app/ledger.py)
+class BalanceLedger(Base):
+    __tablename__ = 'balance_ledger'
+    __table_args__ = (
+        Index('ix_balance_ledger_unfolded_user_id', 'user_id', postgresql_where=text('folded_at IS NULL')),
+        Index('ix_balance_ledger_bet_id', 'bet_id', postgresql_where=text('bet_id IS NOT NULL')),
+    )
+    entry_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    amount = Column(Float, nullable=False)  # signed
+    kind = Column(Text, nullable=False)  # "opening", "bet_debit", "win_credit", "win_reversal", "adjustment"
+    bet_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    folded_at = Column(DateTime, nullable=True)
+
+# Every leg and bet outcome changed by a re-settlement, grouped by correction
+class SettlementAudit(Base):
+    __tablename__ = 'settlement_audit'
+    __table_args__ = (
+        Index('ix_settlement_audit_correction_id', 'correction_id'),
+        Index('ix_settlement_audit_bet_id', 'bet_id'),
+    )
+    audit_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    correction_id = Column(Text, nullable=False)
+    match_id = Column(Text, nullable=True)  # NULL on bet rows
+    bet_id = Column(Integer, nullable=False)
+    bet_event_id = Column(Integer, nullable=True)  # NULL on bet rows
+    old_outcome = Column(Text, nullable=True)
+    new_outcome = Column(Text, nullable=True)
+    home_score = Column(Integer, nullable=True)
+    away_score = Column(Integer, nullable=True)
+    reason = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+# Daily bet totals by placement day, folded from bet_rollup_delta (see app/rollups.py)
+class BetDailyUser(Base):
+    __tablename__ = 'bet_daily_user'
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    bets = Column(Integer, nullable=False, server_default=text('0'))
+    stake = Column(Float, nullable=False, server_default=text('0'))
+    settled_stake = Column(Float, nullable=False, server_default=text('0'))  # stake of won and lost bets
+    returns = Column(Float, nullable=False, server_default=text('0'))  # expected_win of won bets
+    won = Column(Integer, nullable=False, server_default=text('0'))
+    lost = Column(Integer, nullable=False, server_default=text('0'))
+    pending = Column(Integer, nullable=False, server_default=text('0'))
+    odds_sum = Column(Float, nullable=False, server_default=text('0'))  # average odds = odds_sum / bets
+
+class BetDailyBot(Base):
+    __tablename__ = 'bet_daily_bot'
+    day = Column(Date, primary_key=True)
+    bot_id = Column(Integer, primary_key=True)
+    bets = Column(Integer, nullable=False, server_default=text('0'))
+    stake = Column(Float, nullable=False, server_default=text('0'))
+    settled_stake = Column(Float, nullable=False, server_default=text('0'))  # stake of won and lost bets
+    returns = Column(Float, nullable=False, server_default=text('0'))  # expected_win of won bets
+    won = Column(Integer, nullable=False, server_default=text('0'))
+    lost = Column(Integer, nullable=False, server_default=text('0'))
+    pending = Column(Integer, nullable=False, server_default=text('0'))
+    odds_sum = Column(Float, nullable=False, server_default=text('0'))  # average odds = odds_sum / bets
+
+# Signed changes to the daily totals, appended by the bet rollup triggers
+class BetRollupDelta(Base):
+    __tablename__ = 'bet_rollup_delta'
+    delta_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    bot_id = Column(Integer, nullable=True)
+    bets = Column(Integer, nullable=False, server_default=text('0'))
+    stake = Column(Float, nullable=False, server_default=text('0'))
+    settled_stake = Column(Float, nullable=False, server_default=text('0'))  # stake of won and lost bets
+    returns = Column(Float, nullable=False, server_default=text('0'))  # expected_win of won bets
+    won = Column(Integer, nullable=False, server_default=text('0'))
+    lost = Column(Integer, nullable=False, server_default=text('0'))
+    pending = Column(Integer, nullable=False, server_default=text('0'))
+    odds_sum = Column(Float, nullable=False, server_default=text('0'))  # average odds = odds_sum / bets
+
 # Bets table (primary key: bet_id)
 class Bet(Base):
     __tablename__ = 'bet'
+    __table_args__ = (
+        Index('ix_bet_bot_task', text('lower(bot_task)'), 'bet_id', postgresql_where=text('bot')),
+        Index('ix_bet_created_at', 'created_at'),
+    )
     bet_id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, nullable=False)
     type = Column(Text, nullable=False)  # "single" or "parlay"
@@ -154,10 +342,23 @@ class Bet(Base):
     bot_id = Column(Integer, nullable=True)
     validated = Column(Boolean)
     validated_at = Column(DateTime)
+    # Legs still to settle and legs lost, kept up to date by the leg insert
+    # trigger and settlement; a bet resolves when either reaches its end state
+    pending_legs = Column(Integer, nullable=False, server_default=text('0'))
+    lost_legs = Column(Integer, nullable=False, server_default=text('0'))
 
 # BetEvents table (primary key: bet_event_id)
 class BetEvent(Base):
     __tablename__ = 'bet_event'
+    __table_args__ = (
+        Index('ix_bet_event_match_id_bet_id', 'match_id', 'bet_id'),
+        Index('ix_bet_event_bet_id_outcome', 'bet_id', 'outcome'),
+        Index('ix_bet_event_pending_match_id', 'match_id',
+              postgresql_where=text("outcome IS NULL OR outcome = 'pending'")),
+        Index('ix_bet_event_unvalidated', 'match_id',
+              postgresql_where=text("validated IS NULL AND outcome IN ('won', 'lost')")),
+        Index('ix_bet_event_flagged', 'bet_event_id', postgresql_where=text('NOT validated')),
+    )
     bet_event_id = Column(Integer, primary_key=True, autoincrement=True)
     bet_id = Column(Integer, nullable=False)  # FK to bet.bet_id
     match_id = Column(Text, nullable=False)
@@ -200,6 +401,9 @@ class LeagueAlias(Base):
 
 class SofascoreFt(Base):
     __tablename__ = 'sofascore_ft'
+    __table_args__ = (
+        Index('ix_sofascore_ft_match_id', 'match_id', postgresql_where=text("match_id IS NOT NULL")),
+    )
     sofascore_id = Column(Integer, nullable=False, primary_key=True)
     competition_name = Column(Text, nullable=False)
     category = Column(Text, nullable=True)
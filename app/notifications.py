@@ -0,0 +1,111 @@
+# app/notifications.py
+"""
+In-process fan-out of the live_changes NOTIFY channel.
+
+The statement-level triggers in app/triggers.py publish one notification per
+chunk of changes (payloads are capped at 8000 bytes by Postgres):
+
+    {"type": "odds",  "changes": [{"m": match_id, "id": odds_id, "c": [changed...],
+                                   "s": event_status, "t": elapsed_seconds,
+                                   "hs": home_score, "as": away_score,
+                                   "h": home_win, "d": draw, "a": away_win}, ...]}
+    {"type": "match", "changes": [{"m": match_id, "c": [changed...],
+                                   "s": event_status, "l": live, "t": elapsed_seconds}, ...]}
+
+"c" lists the keys that changed ("new" for a match seen for the first time).
+Notifications are delivered when the writing transaction commits.
+
+One asyncpg connection per process LISTENs (periodic_listen_notifications runs it
+from app/main.py) and puts every decoded payload on each subscriber's queue:
+
+    queue = subscribe()
+    try:
+        while True:
+            notification = await queue.get()
+            ...
+    finally:
+        unsubscribe(queue)
+
+A subscriber that falls behind loses its oldest notifications, never blocks the
+listener. Notifications sent while the listener is reconnecting are lost, so
+consumers should keep a slow polling fallback.
+"""
+import asyncio
+import json
+import logging
+
+import asyncpg
+
+from app.config import DB_CREDENTIALS, NOTIFICATIONS
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "live_changes"
+
+_subscribers: set[asyncio.Queue] = set()
+
+
+def subscribe(maxsize: int | None = None) -> asyncio.Queue:
+    """Register a queue that receives every notification from now on."""
+    queue = asyncio.Queue(maxsize=maxsize or NOTIFICATIONS["queue_size"])
+    _subscribers.add(queue)
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue):
+    _subscribers.discard(queue)
+
+
+def publish(notification: dict):
+    """Hand a notification to every subscriber, dropping the oldest entry of full queues."""
+    for queue in _subscribers:
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(notification)
+
+
+def _on_notification(connection, pid, channel, payload):
+    try:
+        notification = json.loads(payload)
+    except ValueError:
+        logger.error(f"Undecodable notification on {channel}: {payload[:200]}")
+        return
+    publish(notification)
+
+
+async def listen_notifications():
+    """LISTEN until the connection is lost."""
+    closed = asyncio.Event()
+    connection = await asyncpg.connect(
+        user=DB_CREDENTIALS["user"],
+        password=DB_CREDENTIALS["password"],
+        host=DB_CREDENTIALS["host"],
+        port=DB_CREDENTIALS["port"],
+        database=DB_CREDENTIALS["dbname"],
+    )
+    try:
+        connection.add_termination_listener(lambda conn: closed.set())
+        await connection.add_listener(CHANNEL, _on_notification)
+        logger.info(f"Listening for notifications on {CHANNEL}")
+        while not closed.is_set():
+            try:
+                await asyncio.wait_for(closed.wait(), timeout=NOTIFICATIONS["keepalive_seconds"])
+            except asyncio.TimeoutError:
+                # A dead TCP connection is only noticed when something is sent on it
+                await connection.execute("SELECT 1")
+    finally:
+        if not connection.is_closed():
+            await connection.close()
+
+
+async def periodic_listen_notifications():
+    while True:
+        try:
+            await listen_notifications()
+            logger.warning("Notification listener connection closed")
+        except Exception as e:
+            logger.error(f"Error in periodic_listen_notifications: {e}")
+        await asyncio.sleep(5)
@@ -0,0 +1,61 @@
+# app/odds_history.py
+"""
+Helpers for reading a match's odds history.
+
+Live matches keep one row per fetch in the partitioned odds table. Once a match is
+archived, app/tasks/compact_odds_history.py packs its history into one
+odds_history_packed row of parallel arrays; the functions below expand it again.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Match clock ("mm:ss") in seconds, NULL when it isn't in that format
+CLOCK_SECONDS_SQL = """
+CASE WHEN {col} ~ '^[0-9]+:[0-9]+$'
+     THEN (split_part({col}, ':', 1)::integer * 60 + split_part({col}, ':', 2)::integer)
+END
+"""
+
+# One row per packed element, in the same shape as the odds table
+EXPANDED_HISTORY_SQL = """
+SELECT p.match_id,
+       u.odds_id,
+       p.statuses[u.status_code] AS event_status,
+       lpad((u.clock_seconds / 60)::text, 2, '0') || ':' || lpad((u.clock_seconds % 60)::text, 2, '0') AS match_time,
+       u.home_score::integer AS home_score,
+       u.away_score::integer AS away_score,
+       u.home_win::numeric::float8 AS home_win,
+       u.draw::numeric::float8 AS draw,
+       u.away_win::numeric::float8 AS away_win,
+       p.first_fetched_at + make_interval(secs => u.fetched_offset) AS fetched_at
+FROM odds_history_packed p
+CROSS JOIN LATERAL unnest(p.odds_ids, p.fetched_offsets, p.clock_seconds, p.status_codes,
+                          p.home_scores, p.away_scores, p.home_win, p.draw, p.away_win)
+     AS u(odds_id, fetched_offset, clock_seconds, status_code, home_score, away_score, home_win, draw, away_win)
+"""
+
+
+async def load_odds_history(session: AsyncSession, match_id: str) -> list[dict]:
+    """
+    Return the odds history of a match ordered by fetched_at, as dicts shaped like
+    odds rows. Packed history is expanded on demand; matches that haven't been
+    compacted yet are read from the odds table.
+    """
+    result = await session.execute(
+        text(EXPANDED_HISTORY_SQL + " WHERE p.match_id = :match_id ORDER BY fetched_at, odds_id"),
+        {"match_id": match_id},
+    )
+    rows = result.mappings().all()
+    if not rows:
+        result = await session.execute(
+            text("""
+                SELECT match_id, odds_id, event_status, match_time, home_score, away_score,
+                       home_win, draw, away_win, fetched_at
+                FROM odds
+                WHERE match_id = :match_id
+                ORDER BY fetched_at, odds_id
+            """),
+            {"match_id": match_id},
+        )
+        rows = result.mappings().all()
+    return [dict(row) for row in rows]
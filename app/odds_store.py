@@ -0,0 +1,62 @@
+# app/odds_store.py
+"""
+Helpers for writing odds rows.
+
+Rows from prepare_odds_data() are in the shape of the odds view. The view's
+INSTEAD OF trigger can encode them one at a time, but the ingesters write a whole
+fetch as one INSERT into odds_compact instead, so the statement-level triggers on
+that table (summary and change notifications, see app/triggers.py) run once per
+fetch rather than once per match.
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine
+from app.models import OddsCompact, OddsStatus
+
+# event_status -> odds_status.status_code; codes never change once assigned
+_status_codes: dict[str, int] = {}
+
+
+def to_milli(price: float | None) -> int | None:
+    return None if price is None else round(price * 1000)
+
+
+async def status_codes(statuses: set[str]) -> dict[str, int]:
+    """
+    Codes of the given statuses, adding missing ones to odds_status. New statuses
+    are committed on their own connection so a cached code can't be rolled back
+    with the caller's transaction.
+    """
+    missing = {s for s in statuses if s not in _status_codes}
+    if missing:
+        async with engine.begin() as conn:
+            await conn.execute(
+                insert(OddsStatus).values([{"event_status": s} for s in missing]).on_conflict_do_nothing()
+            )
+            result = await conn.execute(
+                select(OddsStatus.event_status, OddsStatus.status_code).where(OddsStatus.event_status.in_(missing))
+            )
+            _status_codes.update(result.fetchall())
+    return {s: _status_codes[s] for s in statuses}
+
+
+async def insert_odds(session: AsyncSession, odds: list[dict]):
+    """Encode odds rows and insert them into odds_compact in a single statement."""
+    codes = await status_codes({o["event_status"] for o in odds if o.get("event_status") is not None})
+    rows = [
+        {
+            "fetched_at": o["fetched_at"],
+            "match_id": o["match_id"],
+            "home_win_milli": to_milli(o.get("home_win")),
+            "draw_milli": to_milli(o.get("draw")),
+            "away_win_milli": to_milli(o.get("away_win")),
+            "status_code": codes.get(o.get("event_status")),
+            "elapsed_seconds": o.get("elapsed_seconds"),
+            "home_score": o.get("home_score"),
+            "away_score": o.get("away_score"),
+        }
+        for o in odds
+    ]
+    await session.execute(insert(OddsCompact).values(rows))
@@ -0,0 +1,193 @@
+"""
+Daily bet totals per user and per bot.
+
+bet_daily_user and bet_daily_bot hold, for each placement day, the number of
+bets, stake, returns, counts by outcome and the sum of odds, so dashboards and
+leaderboards read a few rows per day instead of scanning bet. Statement-level
+triggers on bet append the signed change of each placement or settlement to
+bet_rollup_delta (an insert, so busy users and bots don't queue on a totals
+row); periodic_fold_rollups adds the deltas to the daily tables, and reads add
+the ones not folded yet. rebuild_rollups recomputes a date range from bet.
+"""
+import asyncio
+import logging
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ROLLUPS
+from app.database import async_session
+from app.triggers import ROLLUP_COLUMNS, ROLLUP_TOTALS_SQL
+
+logger = logging.getLogger(__name__)
+
+_columns = ", ".join(ROLLUP_COLUMNS)
+_sums = ", ".join(f"sum({c}) AS {c}" for c in ROLLUP_COLUMNS)
+_added = ", ".join(f"{c} = {{table}}.{c} + excluded.{c}" for c in ROLLUP_COLUMNS)
+
+# Rollup tables and the key each is grouped by
+ROLLUP_TABLES = {"user": ("bet_daily_user", "user_id"), "bot": ("bet_daily_bot", "bot_id")}
+
+FOLD_SQL = f"""
+WITH batch AS (
+    DELETE FROM bet_rollup_delta
+    WHERE delta_id IN (SELECT delta_id FROM bet_rollup_delta ORDER BY delta_id LIMIT :batch_size)
+    RETURNING *
+),
+users AS (
+    INSERT INTO bet_daily_user (day, user_id, {_columns})
+    SELECT day, user_id, {_sums} FROM batch GROUP BY day, user_id
+    ON CONFLICT (day, user_id) DO UPDATE SET {_added.format(table="bet_daily_user")}
+    RETURNING 1
+),
+bots AS (
+    INSERT INTO bet_daily_bot (day, bot_id, {_columns})
+    SELECT day, bot_id, {_sums} FROM batch WHERE bot_id IS NOT NULL GROUP BY day, bot_id
+    ON CONFLICT (day, bot_id) DO UPDATE SET {_added.format(table="bet_daily_bot")}
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM batch) AS deltas, (SELECT count(*) FROM users) AS users, (SELECT count(*) FROM bots) AS bots
+"""
+
+# Folded totals plus deltas not folded yet, in one snapshot
+_TOTALS_SQL = """
+SELECT {key}, {group_day}{sums}
+FROM (
+    SELECT day, {key}, {columns} FROM {table}
+    WHERE day BETWEEN :start AND :end AND (CAST(:key_id AS integer) IS NULL OR {key} = :key_id)
+    UNION ALL
+    SELECT day, {key}, {columns} FROM bet_rollup_delta
+    WHERE day BETWEEN :start AND :end AND {key} IS NOT NULL AND (CAST(:key_id AS integer) IS NULL OR {key} = :key_id)
+) t
+GROUP BY {group_by}
+"""
+
+DAILY_SQL = {
+    by: _TOTALS_SQL.format(key=key, table=table, columns=_columns, sums=_sums,
+                           group_day="day, ", group_by=f"day, {key}") + f"ORDER BY day, {key}"
+    for by, (table, key) in ROLLUP_TABLES.items()
+}
+
+LEADERBOARD_SQL = {
+    by: _TOTALS_SQL.format(key=key, table=table, columns=_columns, sums=_sums,
+                           group_day="", group_by=key)
+        + f"ORDER BY sum(returns) - sum(settled_stake) DESC, {key} LIMIT :limit"
+    for by, (table, key) in ROLLUP_TABLES.items()
+}
+
+_replaced = ", ".join(f"{c} = excluded.{c}" for c in ROLLUP_COLUMNS)
+
+# Recomputes a date range in one statement, so the deltas dropped and the bets
+# counted come from the same snapshot. Rows are replaced or removed rather than
+# deleted and reinserted, as one statement can't touch a row twice.
+REBUILD_SQL = f"""
+WITH dropped AS (
+    DELETE FROM bet_rollup_delta WHERE day BETWEEN :start AND :end RETURNING 1
+),
+placed AS (
+    SELECT * FROM bet WHERE created_at >= CAST(:start AS date) AND created_at < CAST(:end AS date) + 1
+),
+user_days AS (
+    SELECT created_at::date AS day, user_id, {ROLLUP_TOTALS_SQL} FROM placed GROUP BY 1, 2
+),
+bot_days AS (
+    SELECT created_at::date AS day, bot_id, {ROLLUP_TOTALS_SQL} FROM placed WHERE bot_id IS NOT NULL GROUP BY 1, 2
+),
+stale_users AS (
+    DELETE FROM bet_daily_user d
+    WHERE d.day BETWEEN :start AND :end
+      AND NOT EXISTS (SELECT 1 FROM user_days u WHERE u.day = d.day AND u.user_id = d.user_id)
+),
+users AS (
+    INSERT INTO bet_daily_user (day, user_id, {_columns})
+    SELECT day, user_id, {_columns} FROM user_days
+    ON CONFLICT (day, user_id) DO UPDATE SET {_replaced}
+    RETURNING 1
+),
+stale_bots AS (
+    DELETE FROM bet_daily_bot d
+    WHERE d.day BETWEEN :start AND :end
+      AND NOT EXISTS (SELECT 1 FROM bot_days b WHERE b.day = d.day AND b.bot_id = d.bot_id)
+),
+bots AS (
+    INSERT INTO bet_daily_bot (day, bot_id, {_columns})
+    SELECT day, bot_id, {_columns} FROM bot_days
+    ON CONFLICT (day, bot_id) DO UPDATE SET {_replaced}
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM dropped) AS deltas_dropped,
+       (SELECT count(*) FROM users) AS user_days,
+       (SELECT count(*) FROM bots) AS bot_days
+"""
+
+
+def totals(row) -> dict:
+    """API shape of a totals row, with average odds and settled profit."""
+    return {
+        "bets": row["bets"],
+        "stake": round(row["stake"], 2),
+        "returns": round(row["returns"], 2),
+        "profit": round(row["returns"] - row["settled_stake"], 2),
+        "won": row["won"],
+        "lost": row["lost"],
+        "pending": row["pending"],
+        "avg_odds": round(row["odds_sum"] / row["bets"], 2) if row["bets"] else None,
+    }
+
+
+async def daily_totals(session: AsyncSession, by: str, start: date, end: date, key_id: int = None) -> list[dict]:
+    """Totals per day and user (by="user") or bot (by="bot") between start and end inclusive."""
+    key = ROLLUP_TABLES[by][1]
+    result = await session.execute(text(DAILY_SQL[by]), {"start": start, "end": end, "key_id": key_id})
+    return [{"day": row["day"], key: row[key], **totals(row)} for row in result.mappings()]
+
+
+async def leaderboard(session: AsyncSession, by: str, start: date, end: date, limit: int) -> list[dict]:
+    """Users or bots with the highest settled profit between start and end inclusive."""
+    key = ROLLUP_TABLES[by][1]
+    result = await session.execute(text(LEADERBOARD_SQL[by]), {"start": start, "end": end, "key_id": None, "limit": limit})
+    return [{key: row[key], **totals(row)} for row in result.mappings()]
+
+
+async def fold_rollups(session: AsyncSession, batch_size: int) -> int:
+    """Add up to batch_size deltas to the daily tables; returns how many."""
+    try:
+        # One folder at a time; rebuild_rollups takes the same lock
+        locked = await session.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext('fold_rollups'))"))
+        if not locked:
+            await session.rollback()
+            return 0
+        folded = (await session.execute(text(FOLD_SQL), {"batch_size": batch_size})).one()
+        await session.commit()
+    except Exception as e:
+        logger.error(f"fold_rollups() failed: {e}")
+        await session.rollback()
+        return 0
+    return folded.deltas
+
+
+async def rebuild_rollups(session: AsyncSession, start: date, end: date) -> dict:
+    """
+    Recompute the daily totals of start..end (inclusive) from bet, e.g. after
+    bets were edited or deleted by hand. Deltas committed while it runs are not
+    in its snapshot, so they are kept and folded afterwards.
+    """
+    # Waits for a running fold, and keeps the next one out until this commits
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('fold_rollups'))"))
+    rebuilt = (await session.execute(text(REBUILD_SQL), {"start": start, "end": end})).one()
+    await session.commit()
+    return dict(rebuilt._mapping)
+
+
+async def periodic_fold_rollups():
+    while True:
+        try:
+            while True:
+                async with async_session() as session:
+                    folded = await fold_rollups(session, ROLLUPS["fold_batch_size"])
+                if folded < ROLLUPS["fold_batch_size"]:
+                    break
+        except Exception as e:
+            logger.error(f"Error in periodic_fold_rollups: {e}")
+        await asyncio.sleep(ROLLUPS["fold_interval_seconds"])
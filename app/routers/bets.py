@@ -0,0 +1,277 @@
+import logging
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import insert, select, func, text
+
+from app.database import async_session
+from app.ledger import debit_bet, get_balance, lock_balance
+from app.rollups import daily_totals, leaderboard, rebuild_rollups
+from app.models import Bet, BetEvent, Match, MatchOddsSummary
+from app.tasks.settle_bets import FINISHED, FINISHED_STATUSES, resettle_matches
+
+logger = logging.getLogger("app.routers.bets")
+
+router = APIRouter(prefix="/bets", tags=["bets"])
+
+MAX_PARLAY_LEGS = 20
+MAX_RESETTLE_MATCHES = 500
+
+DEFAULT_DISCREPANCY_LIMIT = 100
+MAX_DISCREPANCY_LIMIT = 1000
+
+MAX_ROLLUP_DAYS = 366
+DEFAULT_LEADERBOARD_LIMIT = 20
+MAX_LEADERBOARD_LIMIT = 500
+
+PRICE_COLUMNS = {"home": "home_win", "draw": "draw", "away": "away_win"}
+
+
+# Legs the validator flagged, with the result they were checked against
+DISCREPANCIES_SQL = """
+SELECT be.bet_event_id, be.bet_id, b.user_id, b.bot_task, be.match_id, be.bet_type, be.outcome,
+       CASE WHEN v.home_score > v.away_score THEN 'home'
+            WHEN v.home_score < v.away_score THEN 'away'
+            ELSE 'draw' END = be.bet_type AS should_have_won,
+       v.home_score, v.away_score, be.validated_at
+FROM bet_event be
+JOIN bet b ON b.bet_id = be.bet_id
+LEFT JOIN LATERAL (
+    SELECT home_score, away_score
+    FROM sofascore_ft
+    WHERE match_id = be.match_id AND event_status IN :finished
+      AND home_score IS NOT NULL AND away_score IS NOT NULL
+    ORDER BY sofascore_id DESC
+    LIMIT 1
+) v ON true
+WHERE NOT be.validated AND be.bet_event_id > :after
+ORDER BY be.bet_event_id
+LIMIT :limit
+"""
+
+
+def rollup_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    """Defaults to the last 30 days up to today (UTC)."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_ROLLUP_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ROLLUP_DAYS} days at a time")
+    return start, end
+
+
+class ParlayLeg(BaseModel):
+    match_id: str
+    bet_type: Literal["home", "draw", "away"]
+
+
+class ParlayRequest(BaseModel):
+    user_id: int
+    stake: float = Field(..., gt=0)
+    legs: list[ParlayLeg] = Field(..., min_length=2, max_length=MAX_PARLAY_LEGS)
+
+
+class ScoreCorrection(BaseModel):
+    match_id: str
+    # Without a score the verified SofaScore result (else the feed's) is used
+    home_score: Optional[int] = Field(None, ge=0)
+    away_score: Optional[int] = Field(None, ge=0)
+
+
+class ResettleRequest(BaseModel):
+    matches: list[ScoreCorrection] = Field(..., min_length=1, max_length=MAX_RESETTLE_MATCHES)
+    reason: Optional[str] = None
+
+
+class RebuildRollupsRequest(BaseModel):
+    start: date
+    end: date
+
+
+@router.post("/parlay")
+async def place_parlay(request: ParlayRequest):
+    """
+    Place a multi-leg bet at the latest odds of each match. Every leg must be on a
+    different match that has not ended. The stake is debited through the balance
+    ledger; the bet's leg counters are set by the leg insert trigger.
+    """
+    match_ids = [leg.match_id for leg in request.legs]
+    if len(set(match_ids)) != len(match_ids):
+        raise HTTPException(status_code=400, detail="Each leg must be on a different match")
+
+    async with async_session() as session:
+        try:
+            # Held until commit, so concurrent parlays of the user see each other's debit
+            await lock_balance(session, request.user_id)
+            balance = await get_balance(session, request.user_id)
+            if balance is None:
+                raise HTTPException(status_code=404, detail="Unknown user")
+            if balance < request.stake:
+                raise HTTPException(status_code=400, detail="Insufficient balance")
+
+            result = await session.execute(
+                select(MatchOddsSummary)
+                .join(Match, Match.match_id == MatchOddsSummary.match_id)
+                .where(MatchOddsSummary.match_id.in_(match_ids), func.lower(Match.event_status) != "ended")
+            )
+            summaries = {row.match_id: row for row in result.scalars().all()}
+
+            legs, prices = [], []
+            for leg in request.legs:
+                summary = summaries.get(leg.match_id)
+                price = getattr(summary, PRICE_COLUMNS[leg.bet_type]) if summary else None
+                if not price or summary.odds_id is None:
+                    raise HTTPException(status_code=400, detail=f"No open odds for {leg.bet_type} on match {leg.match_id}")
+                prices.append(price)
+                legs.append({"match_id": leg.match_id, "bet_type": leg.bet_type, "odd_id": summary.odds_id, "outcome": "pending"})
+
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            total_odds = math.prod(prices)
+            bet_id = (await session.execute(
+                insert(Bet).values(
+                    user_id=request.user_id,
+                    type="parlay",
+                    amount=request.stake,
+                    expected_win=request.stake * total_odds,
+                    outcome="pending",
+                    created_at=now,
+                    updated_at=now,
+                    bot=False,
+                ).returning(Bet.bet_id)
+            )).scalar_one()
+            await session.execute(insert(BetEvent).values([{**leg, "bet_id": bet_id} for leg in legs]))
+            await debit_bet(session, request.user_id, bet_id, request.stake)
+            await session.commit()
+        except HTTPException:
+            await session.rollback()
+            raise
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Failed to place parlay for user {request.user_id}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to place bet")
+
+    return {
+        "bet_id": bet_id,
+        "type": "parlay",
+        "stake": request.stake,
+        "odds": round(total_odds, 2),
+        "expected_win": round(request.stake * total_odds, 2),
+        "legs": [{**leg, "odds": price} for leg, price in zip(legs, prices)],
+    }
+
+
+@router.get("/discrepancies")
+async def get_discrepancies(
+    after: int = Query(0, ge=0, description="Cursor: next_cursor of the previous page, 0 to start"),
+    limit: int = Query(DEFAULT_DISCREPANCY_LIMIT, ge=1, le=MAX_DISCREPANCY_LIMIT),
+):
+    """
+    Settled legs whose outcome disagrees with the verified SofaScore normal-time
+    score, oldest first, as flagged by the validation job.
+    """
+    try:
+        async with async_session() as session:
+            result = await session.execute(
+                text(DISCREPANCIES_SQL).bindparams(FINISHED),
+                {"after": after, "limit": limit, "finished": FINISHED_STATUSES},
+            )
+            rows = result.mappings().all()
+    except Exception as e:
+        logger.error(f"Failed to load bet discrepancies after {after}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load discrepancies")
+    discrepancies = [
+        {
+            "bet_event_id": row["bet_event_id"],
+            "bet_id": row["bet_id"],
+            "user_id": row["user_id"],
+            "bot_task": row["bot_task"],
+            "match_id": row["match_id"],
+            "bet_type": row["bet_type"],
+            "outcome": row["outcome"],
+            "expected_outcome": None if row["should_have_won"] is None else ("won" if row["should_have_won"] else "lost"),
+            "home_score": row["home_score"],
+            "away_score": row["away_score"],
+            "validated_at": row["validated_at"],
+        }
+        for row in rows
+    ]
+    return {
+        "discrepancies": discrepancies,
+        "next_cursor": rows[-1]["bet_event_id"] if rows else after,
+        "has_more": len(rows) == limit,
+    }
+
+
+@router.post("/resettle")
+async def resettle(request: ResettleRequest):
+    """
+    Re-settle matches whose final score was corrected. Only legs and bets whose
+    outcome changes are updated, balances follow through the ledger, and every
+    change is recorded in settlement_audit under the returned correction_id.
+    """
+    for correction in request.matches:
+        if (correction.home_score is None) != (correction.away_score is None):
+            raise HTTPException(status_code=400, detail=f"Give both scores or neither for match {correction.match_id}")
+    async with async_session() as session:
+        try:
+            return await resettle_matches(session, [c.model_dump() for c in request.matches], request.reason)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Failed to re-settle {len(request.matches)} matches: {e}")
+            raise HTTPException(status_code=500, detail="Failed to re-settle matches")
+
+
+@router.get("/daily")
+async def get_daily_totals(
+    by: Literal["user", "bot"] = "user",
+    start: Optional[date] = Query(None, description="First placement day, default 29 days before end"),
+    end: Optional[date] = Query(None, description="Last placement day, default today"),
+    id: Optional[int] = Query(None, description="Only this user or bot"),
+):
+    """
+    Bets, stake, returns, settled profit, counts by outcome and average odds per
+    placement day and user or bot, read from the daily rollups.
+    """
+    start, end = rollup_range(start, end)
+    try:
+        async with async_session() as session:
+            days = await daily_totals(session, by, start, end, id)
+    except Exception as e:
+        logger.error(f"Failed to load daily totals by {by} for {start}..{end}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load daily totals")
+    return {"by": by, "start": start, "end": end, "days": days}
+
+
+@router.get("/leaderboard")
+async def get_leaderboard(
+    by: Literal["user", "bot"] = "bot",
+    start: Optional[date] = Query(None, description="First placement day, default 29 days before end"),
+    end: Optional[date] = Query(None, description="Last placement day, default today"),
+    limit: int = Query(DEFAULT_LEADERBOARD_LIMIT, ge=1, le=MAX_LEADERBOARD_LIMIT),
+):
+    """Users or bots ranked by settled profit on bets placed between start and end."""
+    start, end = rollup_range(start, end)
+    try:
+        async with async_session() as session:
+            ranking = await leaderboard(session, by, start, end, limit)
+    except Exception as e:
+        logger.error(f"Failed to load {by} leaderboard for {start}..{end}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load leaderboard")
+    return {"by": by, "start": start, "end": end, "leaderboard": ranking}
+
+
+@router.post("/rollups/rebuild")
+async def rebuild_daily_totals(request: RebuildRollupsRequest):
+    """Recompute the daily rollups of a date range from the bets themselves."""
+    start, end = rollup_range(request.start, request.end)
+    async with async_session() as session:
+        try:
+            return await rebuild_rollups(session, start, end)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Failed to rebuild daily rollups for {start}..{end}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to rebuild daily rollups")
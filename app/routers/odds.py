@@ -0,0 +1,242 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import text
+
+from app.database import async_session
+from app.notifications import subscribe, unsubscribe
+from app.odds_history import EXPANDED_HISTORY_SQL
+
+logger = logging.getLogger("app.routers.odds")
+
+router = APIRouter(tags=["odds"])
+
+MAX_BATCH_MATCHES = 100
+
+# Change feed page sizes and long-poll limit
+DEFAULT_FEED_LIMIT = 500
+MAX_FEED_LIMIT = 5000
+MAX_FEED_WAIT_SECONDS = 30
+
+PRICE_COLUMNS = ("home_win", "draw", "away_win")
+
+# SQL expression that maps fetched_at to the start of its bucket
+BUCKET_SQL = {
+    "raw": "fetched_at",
+    "minute": "date_trunc('minute', fetched_at)",
+    "5min": "date_bin('5 minutes', fetched_at, TIMESTAMP '2000-01-01')",
+}
+
+# Per-bucket price columns for each aggregation. Scores and clock are always the
+# last values seen in the bucket.
+AGG_SQL = {
+    "last": [f"(array_agg({c} ORDER BY fetched_at DESC, odds_id DESC))[1] AS {c}" for c in PRICE_COLUMNS],
+    "min": [f"min({c}) AS {c}" for c in PRICE_COLUMNS],
+    "max": [f"max({c}) AS {c}" for c in PRICE_COLUMNS],
+    "open-close": [
+        sql
+        for c in PRICE_COLUMNS
+        for sql in (
+            f"(array_agg({c} ORDER BY fetched_at, odds_id))[1] AS {c}_open",
+            f"(array_agg({c} ORDER BY fetched_at DESC, odds_id DESC))[1] AS {c}_close",
+        )
+    ],
+}
+
+# Raw odds rows of the requested matches. Matches whose rows have already left the
+# odds table are read from their packed history instead. {time_filter} restricts
+# fetched_at so the planner can prune odds partitions.
+SOURCE_SQL = """
+SELECT match_id, odds_id, event_status, match_time, home_score, away_score,
+       home_win, draw, away_win, fetched_at
+FROM odds
+WHERE match_id = ANY(:match_ids){time_filter}
+UNION ALL
+SELECT * FROM (""" + EXPANDED_HISTORY_SQL + """
+    WHERE p.match_id = ANY(:match_ids)
+      AND NOT EXISTS (SELECT 1 FROM odds o WHERE o.match_id = p.match_id)
+) packed
+WHERE TRUE{time_filter}
+"""
+
+# Keyset page of the change feed: a range scan of the odds_id primary keys.
+# odds_id order is commit order (see lock_odds_ids in app/triggers.py).
+CHANGES_SQL = """
+SELECT odds_id, match_id, event_status, match_time, elapsed_seconds, home_score, away_score,
+       home_win, draw, away_win, fetched_at
+FROM odds
+WHERE odds_id > :since
+ORDER BY odds_id
+LIMIT :limit
+"""
+
+
+def build_series_sql(resolution: str, agg: str, has_from: bool, has_to: bool) -> str:
+    time_filter = ""
+    if has_from:
+        time_filter += " AND fetched_at >= :from_ts"
+    if has_to:
+        time_filter += " AND fetched_at < :to_ts"
+    source = SOURCE_SQL.replace("{time_filter}", time_filter)
+    if resolution == "raw":
+        columns = ["fetched_at AS t", "match_time", "home_score", "away_score"]
+        columns += list(PRICE_COLUMNS)
+        return f"""
+            SELECT match_id, {', '.join(columns)}
+            FROM ({source}) src
+            ORDER BY match_id, fetched_at, odds_id
+        """
+    columns = [
+        f"{BUCKET_SQL[resolution]} AS t",
+        "(array_agg(match_time ORDER BY fetched_at DESC, odds_id DESC))[1] AS match_time",
+        "(array_agg(home_score ORDER BY fetched_at DESC, odds_id DESC))[1] AS home_score",
+        "(array_agg(away_score ORDER BY fetched_at DESC, odds_id DESC))[1] AS away_score",
+    ]
+    columns += AGG_SQL[agg]
+    return f"""
+        SELECT match_id, {', '.join(columns)}
+        FROM ({source}) src
+        GROUP BY match_id, t
+        ORDER BY match_id, t
+    """
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def fetch_series(match_ids: list[str], resolution: str, agg: str,
+                       from_ts: Optional[datetime], to_ts: Optional[datetime]) -> dict[str, dict]:
+    """
+    Bucketed odds series for each match, keyed by match_id. Each series is columnar:
+    one list per column, all of the same length, with bucket start times in "t".
+    """
+    params = {"match_ids": match_ids}
+    # odds.fetched_at has no time zone; aware bounds are compared in UTC
+    if from_ts is not None:
+        params["from_ts"] = to_naive_utc(from_ts)
+    if to_ts is not None:
+        params["to_ts"] = to_naive_utc(to_ts)
+    sql = build_series_sql(resolution, agg, from_ts is not None, to_ts is not None)
+    async with async_session() as session:
+        result = await session.execute(text(sql), params)
+        rows = result.mappings().all()
+
+    series = {}
+    for row in rows:
+        s = series.get(row["match_id"])
+        if s is None:
+            s = series[row["match_id"]] = {key: [] for key in row.keys() if key != "match_id"}
+        for key, value in row.items():
+            if key == "match_id":
+                continue
+            if key == "t":
+                value = value.isoformat()
+            s[key].append(value)
+    return series
+
+
+def series_response(match_id: str, series: Optional[dict], resolution: str, agg: str) -> dict:
+    return {
+        "match_id": match_id,
+        "resolution": resolution,
+        "agg": agg if resolution != "raw" else None,
+        "points": len(series["t"]) if series else 0,
+        "series": series or {},
+    }
+
+
+@router.get("/matches/odds")
+async def get_matches_odds(
+    match_id: list[str] = Query(..., description="Repeat for each match"),
+    resolution: Literal["raw", "minute", "5min"] = "minute",
+    agg: Literal["last", "min", "max", "open-close"] = "last",
+    from_ts: Optional[datetime] = Query(None, alias="from"),
+    to_ts: Optional[datetime] = Query(None, alias="to"),
+):
+    """Odds series of several matches in one round trip."""
+    match_ids = list(dict.fromkeys(match_id))
+    if len(match_ids) > MAX_BATCH_MATCHES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_MATCHES} matches per request")
+    try:
+        series = await fetch_series(match_ids, resolution, agg, from_ts, to_ts)
+    except Exception as e:
+        logger.error(f"Failed to load odds series for {len(match_ids)} matches: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load odds")
+    return {"matches": [series_response(mid, series.get(mid), resolution, agg) for mid in match_ids]}
+
+
+@router.get("/matches/{match_id}/odds")
+async def get_match_odds(
+    match_id: str,
+    resolution: Literal["raw", "minute", "5min"] = "minute",
+    agg: Literal["last", "min", "max", "open-close"] = "last",
+    from_ts: Optional[datetime] = Query(None, alias="from"),
+    to_ts: Optional[datetime] = Query(None, alias="to"),
+):
+    """
+    Odds series of one match, bucketed in Postgres. Prices in each bucket are
+    aggregated with agg; "open-close" returns the first and last price of each
+    bucket. resolution=raw returns every stored point and ignores agg.
+    """
+    try:
+        series = await fetch_series([match_id], resolution, agg, from_ts, to_ts)
+    except Exception as e:
+        logger.error(f"Failed to load odds series for match {match_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load odds")
+    if match_id not in series and from_ts is None and to_ts is None:
+        raise HTTPException(status_code=404, detail="No odds for this match")
+    return series_response(match_id, series.get(match_id), resolution, agg)
+
+
+async def fetch_changes(since: int, limit: int) -> list[dict]:
+    async with async_session() as session:
+        result = await session.execute(text(CHANGES_SQL), {"since": since, "limit": limit})
+        return [dict(row) for row in result.mappings().all()]
+
+
+async def wait_for_odds(queue: asyncio.Queue):
+    while (await queue.get()).get("type") != "odds":
+        pass
+
+
+@router.get("/odds/changes")
+async def get_odds_changes(
+    since: int = Query(0, ge=0, description="Cursor: next_cursor of the previous page, 0 to start"),
+    limit: int = Query(DEFAULT_FEED_LIMIT, ge=1, le=MAX_FEED_LIMIT),
+    wait: float = Query(0, ge=0, le=MAX_FEED_WAIT_SECONDS, description="Seconds to wait for new rows"),
+):
+    """
+    Odds rows added after the cursor, oldest first. Pages are full (limit rows)
+    while has_more is true. With wait, an empty page is held until new odds are
+    stored or wait seconds pass. Rows older than the odds retention are gone, so a
+    cursor that old resumes at the oldest row kept.
+    """
+    # Subscribe before the first read so an insert in between still wakes us up
+    queue = subscribe() if wait else None
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        rows = await fetch_changes(since, limit)
+        while not rows and loop.time() < deadline:
+            try:
+                await asyncio.wait_for(wait_for_odds(queue), deadline - loop.time())
+            except asyncio.TimeoutError:
+                pass
+            rows = await fetch_changes(since, limit)
+    except Exception as e:
+        logger.error(f"Failed to load odds changes since {since}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load odds changes")
+    finally:
+        if queue is not None:
+            unsubscribe(queue)
+    return {
+        "changes": rows,
+        "next_cursor": rows[-1]["odds_id"] if rows else since,
+        "has_more": len(rows) == limit,
+    }
@@ -1,5 +1,5 @@
 # app/tasks_archive.py
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from app.models import Match, EndedMatch
 from app.database import async_session  # or your session factory
 import logging
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 async def archive_ended_matches():
     async with async_session() as session:
         result = await session.execute(
-            select(Match).where(Match.event_status.ilike("ended"))
+            select(Match).where(func.lower(Match.event_status) == "ended")
         )
         ended = result.scalars().all()
 
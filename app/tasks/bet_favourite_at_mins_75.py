@@ -1,43 +1,29 @@
 import asyncio
 import logging
 from datetime import datetime
-from sqlalchemy import select, insert, update, and_, exists
+from sqlalchemy import select, insert, update, and_, exists, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import async_session
-from app.models import Match, LatestOdd, Bet, BetEvent, User
+from app.ledger import debit_bet
+from app.models import Match, LatestOdd, Bet, BetEvent
 
 logger = logging.getLogger(__name__)
 
-def parse_match_time(match_time_str: str) -> int:
-    """
-    Convert a match_time formatted as "mm:ss" into total seconds.
-    """
-    try:
-        minutes, seconds = map(int, match_time_str.split(":"))
-        return minutes * 60 + seconds
-    except Exception:
-        return 0  # Default if parsing fails
-
 async def auto_place_bets_favourite_at_mins_75(session: AsyncSession):
-    # Query for live matches
-    stmt = select(Match).where(Match.live == True)
+    # Query for live matches past 75 minutes (4500 sec)
+    stmt = select(Match).where(Match.live == True, Match.elapsed_seconds > 4500)
     result = await session.execute(stmt)
     live_matches = result.scalars().all()
     # logger.info(f"Found {len(live_matches)} live matches for late-game betting.")
 
     for match in live_matches:
-        # Convert match_time (mm:ss) into seconds and ensure >80 minutes (4800 sec)
-        match_seconds = parse_match_time(match.match_time or "00:00")
-        if match_seconds <= 4500:
-            continue
-
         # Check if a bot bet already exists for this match (for user_id 2)
         subq = select(BetEvent.match_id).join(Bet, BetEvent.bet_id == Bet.bet_id).where(
             and_(
                 Bet.bot == True,
                 Bet.user_id == 2,
-                Bet.bot_task.ilike("bet_favourite_at_mins_75"),
+                func.lower(Bet.bot_task) == "bet_favourite_at_mins_75",
                 BetEvent.match_id == match.match_id
             )
         )
@@ -98,13 +84,8 @@ async def auto_place_bets_favourite_at_mins_75(session: AsyncSession):
         }
         await session.execute(insert(BetEvent).values(**bet_event_payload))
 
-        # Update user's balance (subtract stake_amount)
-        stmt_update_user = (
-            update(User)
-            .where(User.user_id == 2)
-            .values(balance = User.balance - stake_amount)
-        )
-        await session.execute(stmt_update_user)
+        # Debit the stake through the balance ledger
+        await debit_bet(session, 2, inserted_bet_id, stake_amount)
 
         logger.info(f"\n ----- [75+] Placed bot bet on {bet_type.upper()} for match {match.match_id} with odd {odd_value} -----")
 
@@ -1,24 +1,15 @@
 import asyncio
 import logging
 from datetime import datetime
-from sqlalchemy import select, insert, update, and_, exists
+from sqlalchemy import select, insert, update, and_, exists, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import async_session
-from app.models import Match, InitialOdd, LatestOdd, Bet, BetEvent, User
+from app.ledger import debit_bet
+from app.models import Match, InitialOdd, LatestOdd, Bet, BetEvent
 
 logger = logging.getLogger(__name__)
 
-def parse_match_time(match_time_str: str) -> int:
-    """
-    Convert a match_time formatted as "mm:ss" into total seconds.
-    """
-    try:
-        minutes, seconds = map(int, match_time_str.split(":"))
-        return minutes * 60 + seconds
-    except Exception:
-        return 0  # Default if parsing fails
-
 async def auto_place_bets_for_live_matches(session: AsyncSession):
     """
     Check live matches for those with match_time > 45 minutes and that have at least one initial odd
@@ -26,22 +17,18 @@ async def auto_place_bets_for_live_matches(session: AsyncSession):
     For qualifying matches, if there is no prior bot bet for the match, place a bot bet of type 'single'
     for user_id 2 with a fixed stake amount, and update the user's balance accordingly.
     """
-    stmt = select(Match).where(Match.live == True)
+    # Only live matches with match time of at least 45 minutes (i.e., >= 2700 seconds)
+    stmt = select(Match).where(Match.live == True, Match.elapsed_seconds >= 2700)
     result = await session.execute(stmt)
     live_matches = result.scalars().all()
     logger.info(f"Found {len(live_matches)} live matches.")
 
     for match in live_matches:
-        # Only process matches with match time > 45 minutes (i.e., > 2700 seconds)
-        match_seconds = parse_match_time(match.match_time or "00:00")
-        if match_seconds < 2700:
-            continue
-
         # Check if a bot bet already exists for this match
         subq = select(BetEvent.match_id).join(Bet, BetEvent.bet_id == Bet.bet_id).where(
             and_(
                 Bet.bot == True,
-                Bet.bot_task.ilike("bet_favourite_second_half"),
+                func.lower(Bet.bot_task) == "bet_favourite_second_half",
                 BetEvent.match_id == match.match_id
             )
         )
@@ -109,13 +96,8 @@ async def auto_place_bets_for_live_matches(session: AsyncSession):
         }
         await session.execute(insert(BetEvent).values(**bet_event_payload))
 
-        # Now update the user's balance: subtract the stake amount
-        stmt_update_user = (
-            update(User)
-            .where(User.user_id == 2)
-            .values(balance = User.balance - stake_amount)
-        )
-        await session.execute(stmt_update_user)
+        # Debit the stake through the balance ledger
+        await debit_bet(session, 2, inserted_bet_id, stake_amount)
 
         logger.info(f"\n ----- [45+] Placed bot bet on {selected_type.upper()} for match {match.match_id} at odd {odd_value} -----,")
 
@@ -2,7 +2,7 @@ import asyncio
 import logging
 from datetime import datetime, timedelta
 
-from sqlalchemy import update, and_
+from sqlalchemy import update, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import async_session
@@ -23,7 +23,7 @@ async def cleanup_pending_matches(session: AsyncSession):
             update(Match)
             .where(
                 and_(
-                    Match.event_status == 'pending',
+                    func.lower(Match.event_status) == 'pending',
                     Match.start_time != None,
                     Match.start_time < threshold_time
                 )
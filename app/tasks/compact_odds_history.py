@@ -0,0 +1,99 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ODDS_HISTORY
+from app.database import async_session
+from app.odds_history import CLOCK_SECONDS_SQL
+
+logger = logging.getLogger(__name__)
+
+# Archived matches whose odds are still only stored row by row
+CANDIDATES_SQL = """
+SELECT e.match_id
+FROM ended_match e
+WHERE NOT EXISTS (SELECT 1 FROM odds_history_packed p WHERE p.match_id = e.match_id)
+  AND EXISTS (SELECT 1 FROM odds o WHERE o.match_id = e.match_id)
+LIMIT :batch_size
+"""
+
+# Collapses every odds row of the given matches into one packed row per match
+PACK_SQL = f"""
+WITH pts AS (
+    SELECT o.*, min(o.fetched_at) OVER (PARTITION BY o.match_id) AS first_fetched_at
+    FROM odds o
+    WHERE o.match_id = ANY(:match_ids)
+),
+dict AS (
+    SELECT match_id, array_agg(event_status ORDER BY first_seen) AS statuses
+    FROM (
+        SELECT match_id, event_status, min(fetched_at) AS first_seen
+        FROM pts
+        GROUP BY match_id, event_status
+    ) s
+    GROUP BY match_id
+)
+INSERT INTO odds_history_packed (
+    match_id, n_points, first_fetched_at, odds_ids, fetched_offsets, clock_seconds,
+    home_scores, away_scores, home_win, draw, away_win, statuses, status_codes)
+SELECT p.match_id,
+       count(*),
+       min(p.first_fetched_at),
+       array_agg(p.odds_id ORDER BY p.fetched_at, p.odds_id),
+       array_agg(floor(extract(epoch FROM p.fetched_at - p.first_fetched_at))::integer ORDER BY p.fetched_at, p.odds_id),
+       array_agg(COALESCE(p.elapsed_seconds, {CLOCK_SECONDS_SQL.format(col="p.match_time")})::smallint
+                 ORDER BY p.fetched_at, p.odds_id),
+       array_agg(p.home_score::smallint ORDER BY p.fetched_at, p.odds_id),
+       array_agg(p.away_score::smallint ORDER BY p.fetched_at, p.odds_id),
+       array_agg(p.home_win::real ORDER BY p.fetched_at, p.odds_id),
+       array_agg(p.draw::real ORDER BY p.fetched_at, p.odds_id),
+       array_agg(p.away_win::real ORDER BY p.fetched_at, p.odds_id),
+       d.statuses,
+       array_agg(array_position(d.statuses, p.event_status)::smallint ORDER BY p.fetched_at, p.odds_id)
+FROM pts p
+JOIN dict d ON d.match_id = p.match_id
+GROUP BY p.match_id, d.statuses
+ON CONFLICT (match_id) DO NOTHING
+"""
+
+
+async def compact_odds_history(session: AsyncSession, batch_size: int) -> int:
+    """
+    Pack the odds history of up to batch_size archived matches. The source rows are
+    left in place: they go away with their daily partition (see
+    app/tasks/manage_odds_partitions.py, which only retires a partition once all
+    its matches are packed), which is far cheaper than deleting them here.
+    Returns the number of matches packed.
+    """
+    result = await session.execute(text(CANDIDATES_SQL), {"batch_size": batch_size})
+    match_ids = [row[0] for row in result.fetchall()]
+    if not match_ids:
+        return 0
+
+    try:
+        result = await session.execute(text(PACK_SQL), {"match_ids": match_ids})
+        await session.commit()
+        return result.rowcount
+    except Exception as e:
+        logger.error(f"compact_odds_history() failed: {e}")
+        await session.rollback()
+        return 0
+
+
+async def periodic_compact_odds_history():
+    while True:
+        try:
+            async with async_session() as session:
+                total = 0
+                while True:
+                    packed = await compact_odds_history(session, ODDS_HISTORY["compaction_batch_size"])
+                    total += packed
+                    if packed < ODDS_HISTORY["compaction_batch_size"]:
+                        break
+                if total:
+                    logger.info(f"Packed odds history of {total} archived matches.")
+        except Exception as e:
+            logger.error(f"Error in periodic_compact_odds_history: {e}")
+        await asyncio.sleep(3600)  # Every hour
@@ -0,0 +1,250 @@
+# app/tasks/compile_user_bots_conditions.py
+"""
+Bot conditions compiled into predicates.
+
+compile_bot_conditions turns a bot's conditions JSON into one function of
+(match, initial_odd, latest_odd) with the semantics of process_bot_conditions,
+which stays as the reference interpreter (benchmarks/check_bot_conditions.py
+compares the two). The operator dispatch, team lookup and value checks happen
+once per bot instead of once per (bot, match); get_bot_predicate caches the
+result by (bot_id, updated_at).
+
+Where the interpreter raises (e.g. min() over missing odds, or conditions that
+are not a dict) the compiled predicate doesn't match, so one bot can no longer
+abort the whole cycle.
+"""
+import logging
+from typing import Any, Callable, Optional
+
+from app.models import Bot, InitialOdd, LatestOdd, Match
+from app.utils import match_time_to_seconds
+
+logger = logging.getLogger(__name__)
+
+Predicate = Callable[[Match, Optional[InitialOdd], Optional[LatestOdd]], bool]
+
+ODDS_SIDES = ("home", "draw", "away")
+
+# Keys compared with the condition's operator; unknown keys are ignored
+COMPARED_KEYS = ("match_time", "home_goals", "away_goals", "home_red_cards", "away_red_cards", "score_difference")
+ODDS_PREFIXES = ("initial_odds_", "live_odds_")
+
+
+class InvalidBotConditions(ValueError):
+    """Conditions that can never match (or would make the interpreter raise)."""
+
+
+def compile_comparison(operator: str, value) -> Callable[[Any], bool]:
+    """compare_value with the operator and condition value bound."""
+    if operator == "equals":
+        def test(target): return target == value
+    elif operator == "not_equals":
+        def test(target): return target != value
+    elif operator == "greater_than":
+        def test(target): return target > value
+    elif operator == "less_than":
+        def test(target): return target < value
+    elif operator == "between":
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise InvalidBotConditions(f"'between' needs [lower, upper], got {value!r}")
+        lower, upper = value
+        def test(target): return lower <= target <= upper
+    else:
+        raise InvalidBotConditions(f"Unknown operator {operator!r}")
+
+    def compare(target) -> bool:
+        if target is None:
+            return False
+        try:
+            return bool(test(target))
+        except Exception:
+            return False
+
+    return compare
+
+
+def favourite_and_outsider(home, draw, away) -> tuple[Optional[str], Optional[str]]:
+    """
+    get_favourite_and_outsider without building and sorting a dict: the lowest
+    odds (first of home, draw, away on ties) and the highest (last on ties).
+    """
+    favourite = outsider = None
+    low = high = None
+    for side, odds in zip(ODDS_SIDES, (home, draw, away)):
+        if odds is None:
+            continue
+        if low is None or odds < low:
+            favourite, low = side, odds
+        if high is None or odds >= high:
+            outsider, high = side, odds
+    return favourite, outsider
+
+
+def compile_odds_value(key: str, prefix: str, selected_team: Optional[str]) -> Callable[[Any, Match], Any]:
+    """The odds an initial_odds_*/live_odds_* condition compares, read from one odds row."""
+    kind = key[len(prefix):]
+    if kind == "any":
+        def value(odd, match):
+            return min(getattr(odd, "home_win", None), getattr(odd, "draw", None), getattr(odd, "away_win", None))
+    elif kind in ("home", "away"):
+        column = f"{kind}_win"
+        def value(odd, match):
+            return getattr(odd, column, None)
+    elif kind == "draw":
+        def value(odd, match):
+            return getattr(odd, "draw", None)
+    elif kind == "selected_team":
+        def value(odd, match):
+            if selected_team is None:
+                return None
+            if selected_team == (match.home_team or "").lower():
+                return getattr(odd, "home_win", None)
+            if selected_team == (match.away_team or "").lower():
+                return getattr(odd, "away_win", None)
+            return None
+    elif kind == "favourite":
+        def value(odd, match):
+            favourite, _ = favourite_and_outsider(
+                getattr(odd, "home_win", None), getattr(odd, "draw", None), getattr(odd, "away_win", None))
+            if favourite is None:
+                return None
+            return getattr(odd, "draw" if favourite == "draw" else f"{favourite}_win", None)
+    elif kind == "outsider":
+        def value(odd, match):
+            favourite, outsider = favourite_and_outsider(
+                getattr(odd, "home_win", None), getattr(odd, "draw", None), getattr(odd, "away_win", None))
+            if outsider is None:
+                return None
+            # As interpreted: a draw favourite reads the draw odds, and a draw
+            # outsider (with another favourite) has no "draw_win" odds
+            if favourite == "draw":
+                return getattr(odd, "draw", None)
+            return getattr(odd, f"{outsider}_win", None)
+    else:
+        def value(odd, match):
+            return None
+    return value
+
+
+def compile_condition(key: str, operator: str, value, selected_team: Optional[str]) -> Optional[Predicate]:
+    """One condition as a check of (match, initial_odd, latest_odd); None for keys that are ignored."""
+    # 🏟️ Match-level checks compare for equality whatever the operator
+    if key == "country":
+        return lambda match, initial_odd, latest_odd: match.country == value
+    if key == "competition":
+        return lambda match, initial_odd, latest_odd: match.competition_name == value
+    if key == "team":
+        return lambda match, initial_odd, latest_odd: value in (match.home_team, match.away_team)
+
+    if key not in COMPARED_KEYS and not key.startswith(ODDS_PREFIXES):
+        return None
+    compare = compile_comparison(operator, value)
+
+    if key == "match_time":
+        def check(match, initial_odd, latest_odd):
+            elapsed_seconds = match.elapsed_seconds
+            if elapsed_seconds is None:
+                elapsed_seconds = match_time_to_seconds(match.match_time) or 0
+            return compare(elapsed_seconds / 60)
+    elif key in ("home_goals", "away_goals"):
+        column = key.replace("goals", "score")
+        def check(match, initial_odd, latest_odd):
+            return latest_odd is not None and compare(getattr(latest_odd, column))
+    elif key in ("home_red_cards", "away_red_cards"):
+        def check(match, initial_odd, latest_odd):
+            return compare(getattr(match, key, None))
+    elif key == "score_difference":
+        def check(match, initial_odd, latest_odd):
+            if latest_odd is None:
+                return compare(0)
+            home_score, away_score = latest_odd.home_score, latest_odd.away_score
+            if home_score is None or away_score is None:
+                return False
+            return compare(abs(home_score - away_score))
+    elif key.startswith("initial_odds_"):
+        odds_value = compile_odds_value(key, "initial_odds_", selected_team)
+        def check(match, initial_odd, latest_odd):
+            if not initial_odd:
+                return False
+            try:
+                return compare(odds_value(initial_odd, match))
+            except TypeError:
+                return False
+    else:
+        odds_value = compile_odds_value(key, "live_odds_", selected_team)
+        def check(match, initial_odd, latest_odd):
+            if not latest_odd:
+                return False
+            try:
+                return compare(odds_value(latest_odd, match))
+            except TypeError:
+                return False
+    return check
+
+
+def compile_bot_conditions(conditions) -> Predicate:
+    """
+    Compile a bot's conditions into a predicate of (match, initial_odd,
+    latest_odd). Raises InvalidBotConditions for conditions that could never
+    match.
+    """
+    if not conditions or not isinstance(conditions, dict):
+        raise InvalidBotConditions(f"Conditions must be a non-empty object, got {conditions!r}")
+
+    selected_team = None
+    if any(key.endswith("_odds_selected_team") for key, condition in conditions.items() if condition):
+        team_condition = conditions.get("team")
+        if team_condition:
+            if not isinstance(team_condition, dict):
+                raise InvalidBotConditions(f"Condition 'team' must be an object, got {team_condition!r}")
+            _, team_name = next(iter(team_condition.items()))
+            if team_name:
+                if not isinstance(team_name, str):
+                    raise InvalidBotConditions(f"Team must be a name, got {team_name!r}")
+                selected_team = team_name.lower()
+
+    checks = []
+    for key, condition in conditions.items():
+        if not condition:
+            continue
+        if not isinstance(condition, dict):
+            raise InvalidBotConditions(f"Condition {key!r} must be an object, got {condition!r}")
+        operator, value = next(iter(condition.items()))
+        check = compile_condition(key, operator, value, selected_team)
+        if check is not None:
+            checks.append(check)
+    checks = tuple(checks)
+
+    def predicate(match, initial_odd, latest_odd) -> bool:
+        for check in checks:
+            if not check(match, initial_odd, latest_odd):
+                return False
+        return True
+
+    return predicate
+
+
+def never(match, initial_odd, latest_odd) -> bool:
+    return False
+
+
+# bot_id -> (updated_at, conditions, predicate)
+_predicates: dict[int, tuple[Any, Any, Predicate]] = {}
+
+
+def get_bot_predicate(bot: Bot) -> Predicate:
+    """
+    The compiled conditions of a bot, recompiled when its updated_at changes (or
+    its conditions do, for edits made without bumping updated_at). Invalid
+    conditions are logged once and never match.
+    """
+    cached = _predicates.get(bot.bot_id)
+    if cached and cached[0] == bot.updated_at and cached[1] == bot.conditions:
+        return cached[2]
+    try:
+        predicate = compile_bot_conditions(bot.conditions)
+    except InvalidBotConditions as e:
+        logger.warning(f"Bot {bot.bot_id} ({bot.name}) has invalid conditions and will not bet: {e}")
+        predicate = never
+    _predicates[bot.bot_id] = (bot.updated_at, bot.conditions, predicate)
+    return predicate
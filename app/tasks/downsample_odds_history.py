@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, bindparam, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ODDS_HISTORY
+from app.database import async_session
+from app.models import OddsHistoryPacked
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ("home_win", "draw", "away_win")
+ARRAY_COLUMNS = (
+    "odds_ids", "fetched_offsets", "clock_seconds", "home_scores", "away_scores",
+    "home_win", "draw", "away_win", "status_codes",
+)
+
+
+def price_moved(previous, current, threshold: float) -> bool:
+    """True if a price appeared, disappeared or moved by more than threshold (relative)."""
+    if previous is None or current is None:
+        return previous is not current
+    if previous == 0:
+        return current != 0
+    return abs(current - previous) / previous > threshold
+
+
+def minute_indices(row: OddsHistoryPacked, threshold: float) -> list[int]:
+    """
+    Indexes kept at minute resolution: the last point of every minute, plus every
+    point where a price moved by more than threshold since the last kept point, or
+    where the score or status changed.
+    """
+    n = len(row.fetched_offsets)
+    if n == 0:
+        return []
+    keep = [0]
+    for i in range(1, n):
+        last = keep[-1]
+        minute_ends = i == n - 1 or row.fetched_offsets[i + 1] // 60 != row.fetched_offsets[i] // 60
+        changed = (
+            row.home_scores[i] != row.home_scores[last]
+            or row.away_scores[i] != row.away_scores[last]
+            or row.status_codes[i] != row.status_codes[last]
+            or any(price_moved(getattr(row, col)[last], getattr(row, col)[i], threshold) for col in PRICE_COLUMNS)
+        )
+        if minute_ends or changed:
+            keep.append(i)
+    return keep
+
+
+def extremes_indices(row: OddsHistoryPacked) -> list[int]:
+    """Indexes of the opening and closing points and of the lowest/highest value of each price."""
+    n = len(row.fetched_offsets)
+    if n == 0:
+        return []
+    keep = {0, n - 1}
+    for col in PRICE_COLUMNS:
+        values = [(v, i) for i, v in enumerate(getattr(row, col)) if v is not None]
+        if values:
+            keep.add(min(values)[1])
+            keep.add(max(values, key=lambda x: (x[0], -x[1]))[1])
+    return sorted(keep)
+
+
+async def downsample_odds_history(session: AsyncSession, threshold: float, minute_tier_days: int, batch_size: int) -> int:
+    """
+    Move up to batch_size packed histories one tier down: freshly packed ("full")
+    rows to minute resolution, and rows older than minute_tier_days to
+    opening/closing/extremes only. Returns the number of rows rewritten.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=minute_tier_days)
+    result = await session.execute(
+        select(OddsHistoryPacked)
+        .where(
+            or_(
+                OddsHistoryPacked.resolution == "full",
+                and_(OddsHistoryPacked.resolution != "extremes", OddsHistoryPacked.first_fetched_at < cutoff),
+            )
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = result.scalars().all()
+    if not rows:
+        return 0
+
+    updates = []
+    for row in rows:
+        if row.first_fetched_at < cutoff:
+            resolution, keep = "extremes", extremes_indices(row)
+        else:
+            resolution, keep = "minute", minute_indices(row, threshold)
+
+        values = {f"b_{col}": [getattr(row, col)[i] for i in keep] for col in ARRAY_COLUMNS}
+        values.update({"b_match_id": row.match_id, "b_n_points": len(keep), "b_resolution": resolution})
+        updates.append(values)
+
+    table = OddsHistoryPacked.__table__
+    stmt = (
+        update(table)
+        .where(table.c.match_id == bindparam("b_match_id"))
+        .values(
+            n_points=bindparam("b_n_points"),
+            resolution=bindparam("b_resolution"),
+            **{col: bindparam(f"b_{col}") for col in ARRAY_COLUMNS},
+        )
+    )
+    try:
+        await session.execute(stmt, updates)
+        await session.commit()
+        return len(updates)
+    except Exception as e:
+        logger.error(f"downsample_odds_history() failed: {e}")
+        await session.rollback()
+        return 0
+
+
+async def periodic_downsample_odds_history():
+    while True:
+        try:
+            total = 0
+            while True:
+                # A fresh session per batch keeps the identity map small
+                async with async_session() as session:
+                    rewritten = await downsample_odds_history(
+                        session,
+                        ODDS_HISTORY["change_threshold"],
+                        ODDS_HISTORY["minute_tier_days"],
+                        ODDS_HISTORY["retention_batch_size"],
+                    )
+                total += rewritten
+                if rewritten < ODDS_HISTORY["retention_batch_size"]:
+                    break
+                await asyncio.sleep(1)  # Let ingestion breathe between batches
+            if total:
+                logger.info(f"Downsampled odds history of {total} matches.")
+        except Exception as e:
+            logger.error(f"Error in periodic_downsample_odds_history: {e}")
+        await asyncio.sleep(3600)  # Every hour
@@ -2,16 +2,21 @@ import asyncio
 import logging
 from app.config import API_URLS
 from app.database import async_session
-from app.utils import fetch_data, prepare_odds_data, get_match_time
-from app.models import Match, Odds
+from app.utils import fetch_data, prepare_odds_data, get_match_time, match_time_to_seconds
+from app.models import Match
+from app.odds_store import insert_odds
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import select, update, not_, or_
+from sqlalchemy import select, update, func, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Rendered inline (not as bind parameters) so the planner can match the predicate
+# of the partial index ix_match_category_active
+INACTIVE_STATUSES = bindparam("inactive_statuses", ["pregame", "ended"], expanding=True, literal_execute=True)
+
 async def upsert_matches(session: AsyncSession, matches: list, category: str):
     match_data_list = []
     for match in matches:
@@ -50,6 +55,7 @@ async def upsert_matches(session: AsyncSession, matches: list, category: str):
             "away_team": match.get("away_team").strip(),
             "start_time": datetime.fromisoformat(match["start_time"]) if match.get("start_time") else None,
             "match_time": match_time,
+            "elapsed_seconds": match_time_to_seconds(match_time),
         }
         match_data_list.append(match_data)
 
@@ -58,7 +64,9 @@ async def upsert_matches(session: AsyncSession, matches: list, category: str):
         stmt = insert(Match).values(match_data_list)
         stmt = stmt.on_conflict_do_update(
             index_elements=["match_id"],
-            set_={col.name: getattr(stmt.excluded, col.name) for col in Match.__table__.columns if col.name != "match_id"}
+            set_={col.name: getattr(stmt.excluded, col.name) for col in Match.__table__.columns if col.name != "match_id"},
+            # A match ended from its SofaScore result may still be listed live for a while
+            where=func.lower(Match.event_status).is_distinct_from("ended"),
         )
         await session.execute(stmt)
 
@@ -69,10 +77,7 @@ async def update_missing_live_matches(session: AsyncSession, matches: list, cate
     result = await session.execute(
         select(Match.match_id, Match.live, Match.event_status, Match.match_time).where(
             Match.category == category,
-            not_(or_(
-                Match.event_status.ilike("pregame"),
-                Match.event_status.ilike("ended")
-            ))
+            func.lower(Match.event_status).notin_(INACTIVE_STATUSES)
         )
     )
     db_matches = result.fetchall()
@@ -179,10 +184,7 @@ async def handle_missing_live_matches(session: AsyncSession, category: str):
     result = await session.execute(
         select(Match.match_id, Match.live, Match.event_status, Match.match_time).where(
             Match.category == category,
-            not_(or_(
-                Match.event_status.ilike("pregame"),
-                Match.event_status.ilike("ended")
-            ))
+            func.lower(Match.event_status).notin_(INACTIVE_STATUSES)
         )
     )
     to_false, to_check_ended = [], []
@@ -210,7 +212,7 @@ async def fetch_and_store_live_data(url: str, category: str):
             await update_missing_live_matches(session, matches, category)
             odds = await prepare_odds_data(matches, "live")
             if odds:
-                await session.execute(insert(Odds).values(odds))
+                await insert_odds(session, odds)
             await session.commit()
         else:
             # logger.info(f"**** No live data was fetched for category: {category} ****")
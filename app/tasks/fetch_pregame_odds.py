@@ -4,7 +4,8 @@ from datetime import datetime
 from app.config import API_URLS
 from app.database import async_session
 from app.utils import fetch_data, prepare_odds_data
-from app.models import Match, Odds
+from app.models import Match
+from app.odds_store import insert_odds
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -28,6 +29,7 @@ async def upsert_pregame_matches(session: AsyncSession, matches: list, category:
             "away_team": match.get("away_team"),
             "start_time": datetime.fromisoformat(match["start_time"]) if match.get("start_time") else None,
             "match_time": "00:00",
+            "elapsed_seconds": 0,
         }
         match_data_list.append(match_data)
 
@@ -49,7 +51,7 @@ async def fetch_and_store_pregame_data(url: str, category: str):
             await upsert_pregame_matches(session, matches, category)
             odds = await prepare_odds_data(matches, "pregame")
             if odds:
-                await session.execute(insert(Odds).values(odds))
+                await insert_odds(session, odds)
             await session.commit()
         else:
             logger.info(f"No pregame matches fetched for {category}")
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import ODDS_HISTORY, ODDS_PARTITIONS, ODDS_RETENTION_MODES
+from app.database import async_session, engine
+from app.tasks.compact_odds_history import PACK_SQL
+
+logger = logging.getLogger(__name__)
+
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+# New odds rows go to ODDS_PARENT (behind the odds view). Retired parents get no
+# new partitions; their existing ones age out through retention.
+ODDS_PARENT = "odds_compact"
+RETIRED_PARENTS = ("odds_wide",)
+
+# Matches with rows in a partition whose odds history has not been packed yet
+UNPACKED_SQL = """
+SELECT DISTINCT o.match_id
+FROM {partition} o
+WHERE NOT EXISTS (SELECT 1 FROM odds_history_packed p WHERE p.match_id = o.match_id)
+"""
+
+# Of those, the matches still tracked (live or pending), which may get more rows
+TRACKED_SQL = "SELECT match_id FROM match WHERE match_id = ANY(:match_ids)"
+
+
+def partition_name(day: date, parent: str = ODDS_PARENT) -> str:
+    return f"{parent}_p{day:%Y%m%d}"
+
+
+def _parse_bound(value: str) -> date | None:
+    """Turn a bound such as "'2025-04-06 00:00:00'" into a date (None for MINVALUE/MAXVALUE)."""
+    value = value.strip("'")
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value).date()
+
+
+async def list_odds_partitions(session: AsyncSession, parent: str = ODDS_PARENT) -> list[tuple[str, date | None, date | None]]:
+    """Return (name, lower bound, upper bound) for every partition of parent, oldest first."""
+    result = await session.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:parent)
+    """), {"parent": parent})
+    partitions = []
+    for name, bound in result.fetchall():
+        found = _BOUND_RE.search(bound or "")
+        if not found:
+            continue
+        partitions.append((name, _parse_bound(found.group(1)), _parse_bound(found.group(2))))
+    return sorted(partitions, key=lambda p: p[2] or date.max)
+
+
+async def ensure_odds_partitions(session: AsyncSession, premake_days: int):
+    """Create daily partitions so that inserts are covered until today + premake_days."""
+    today = datetime.utcnow().date()
+    partitions = await list_odds_partitions(session)
+    uppers = [upper for _, _, upper in partitions if upper]
+    # Continue right after the newest partition so the covered range never has gaps
+    day = max(uppers) if uppers else today
+    created = 0
+    while day <= today + timedelta(days=premake_days):
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {ODDS_PARENT} "
+            f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+        ))
+        created += 1
+        day += timedelta(days=1)
+    await session.commit()
+    if created:
+        logger.info(f"Created {created} odds partitions up to {day - timedelta(days=1)}")
+
+
+async def pack_partition(session: AsyncSession, name: str) -> list[str]:
+    """
+    Pack the odds history of every match with rows in partition name, so the
+    partition can be retired without losing any. compact_odds_history only packs
+    matches in ended_match; matches it fell behind on or never saw (including
+    those in the catch-all odds_legacy partition) are packed here. Matches still
+    in the match table can get more rows and are left alone. Returns the match
+    ids that remain unpacked.
+    """
+    result = await session.execute(text(UNPACKED_SQL.format(partition=name)))
+    unpacked = [row[0] for row in result.fetchall()]
+    if not unpacked:
+        return []
+    result = await session.execute(text(TRACKED_SQL), {"match_ids": unpacked})
+    tracked = {row[0] for row in result.fetchall()}
+    packable = [match_id for match_id in unpacked if match_id not in tracked]
+    batch_size = ODDS_HISTORY["compaction_batch_size"]
+    for i in range(0, len(packable), batch_size):
+        await session.execute(text(PACK_SQL), {"match_ids": packable[i:i + batch_size]})
+        await session.commit()
+    if packable:
+        logger.info(f"Packed odds history of {len(packable)} matches before retiring {name}")
+    return sorted(tracked)
+
+
+async def apply_odds_retention(retention_days: int, mode: str, parent: str = ODDS_PARENT):
+    """
+    Retire partitions of parent whose whole range is older than retention_days.
+
+    A partition is only retired once every match with rows in it has its odds
+    history packed (see pack_partition); one holding matches that are still
+    tracked is kept and retried on the next run.
+
+    DETACH ... CONCURRENTLY only waits for running queries instead of blocking
+    inserts, and cannot run inside a transaction block, hence the autocommit
+    connection.
+    """
+    if mode not in ODDS_RETENTION_MODES:
+        # Checked before anything is detached, which every mode starts with
+        raise ValueError(f"Unknown odds retention mode {mode!r}, expected one of {', '.join(ODDS_RETENTION_MODES)}")
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    async with async_session() as session:
+        partitions = await list_odds_partitions(session, parent)
+        pending = await session.execute(text("""
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:parent) AND i.inhdetachpending
+        """), {"parent": parent})
+        pending_names = {row[0] for row in pending.fetchall()}
+
+        expired = []
+        for name, _, upper in partitions:
+            if not upper or upper > cutoff:
+                continue
+            if name in pending_names:
+                # Checked before its detach started
+                expired.append(name)
+                continue
+            try:
+                unpacked = await pack_partition(session, name)
+            except Exception as e:
+                logger.error(f"Error packing odds partition {name}: {e}")
+                await session.rollback()
+                continue
+            if unpacked:
+                logger.warning(f"Odds partition {name} kept: {len(unpacked)} matches with rows in it are "
+                               f"still tracked and unpacked (e.g. {unpacked[0]})")
+                continue
+            expired.append(name)
+    if not expired:
+        return
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for name in expired:
+            try:
+                if name in pending_names:
+                    # A previous concurrent detach was interrupted
+                    await conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name} FINALIZE"))
+                else:
+                    await conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name} CONCURRENTLY"))
+
+                if mode == "drop":
+                    await conn.execute(text(f"DROP TABLE {name}"))
+                elif mode == "archive":
+                    await conn.execute(text("CREATE SCHEMA IF NOT EXISTS odds_archive"))
+                    await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA odds_archive"))
+                logger.info(f"Odds partition {name} expired ({mode})")
+            except Exception as e:
+                logger.error(f"Error expiring odds partition {name}: {e}")
+
+
+async def periodic_manage_odds_partitions():
+    while True:
+        try:
+            async with async_session() as session:
+                await ensure_odds_partitions(session, ODDS_PARTITIONS["premake_days"])
+            if ODDS_PARTITIONS["retention_days"] > 0:
+                for parent in (ODDS_PARENT, *RETIRED_PARENTS):
+                    await apply_odds_retention(ODDS_PARTITIONS["retention_days"], ODDS_PARTITIONS["retention_mode"], parent)
+        except Exception as e:
+            logger.error(f"Error in periodic_manage_odds_partitions: {e}")
+        await asyncio.sleep(3600)  # Every hour
@@ -0,0 +1,304 @@
+# app/tasks/mask_user_bots_conditions.py
+"""
+Bot conditions evaluated over all live matches at once.
+
+LiveColumns holds a bot cycle's snapshot as NumPy columns (elapsed minutes,
+scores, initial and live prices, favourite and outsider, and the text fields
+as integer codes). compile_bot_mask turns a bot's conditions into a function
+returning a boolean mask over those columns, so a cycle costs a few array
+operations per condition rather than a Python call per (bot, match). Masks of
+conditions shared by several bots are computed once per cycle.
+
+The semantics are those of compile_bot_conditions. Conditions whose operands
+don't map onto the columns (unhashable names, values JSON can't key) fall back
+to the scalar predicate over the snapshot rows.
+"""
+import json
+import logging
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from app.models import Bot
+from app.tasks.compile_user_bots_conditions import (
+    COMPARED_KEYS,
+    ODDS_PREFIXES,
+    InvalidBotConditions,
+    compile_bot_conditions,
+)
+from app.utils import match_time_to_seconds
+
+logger = logging.getLogger(__name__)
+
+Mask = Callable[["LiveColumns"], np.ndarray]
+
+HOME, DRAW, AWAY = 0, 1, 2
+NO_SIDE = -1
+
+
+class Unvectorisable(Exception):
+    """A condition the columns can't express; the bot uses its scalar predicate."""
+
+
+def numeric(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def codes(values, index: dict) -> np.ndarray:
+    """Integer code of each value, assigned in index (shared between columns)."""
+    return np.array([index.setdefault(v, len(index)) for v in values], dtype=np.int64)
+
+
+def favourite_and_outsider(prices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise favourite_and_outsider over (n, 3) prices with NaN for missing:
+    the first lowest and the last highest, NO_SIDE when all are missing.
+    """
+    missing = np.isnan(prices)
+    none = missing.all(axis=1)
+    favourite = np.where(missing, np.inf, prices).argmin(axis=1)
+    outsider = 2 - np.where(missing, -np.inf, prices)[:, ::-1].argmax(axis=1)
+    return np.where(none, NO_SIDE, favourite), np.where(none, NO_SIDE, outsider)
+
+
+class LiveColumns:
+    """One bot cycle's live matches, as (match, initial_odd, latest_odd) rows and as columns."""
+
+    def __init__(self, live_matches: list):
+        self.rows = live_matches
+        self.size = len(live_matches)
+        matches = [match for match, _, _ in live_matches]
+
+        self.elapsed_minutes = np.array([
+            (m.elapsed_seconds if m.elapsed_seconds is not None else match_time_to_seconds(m.match_time) or 0) / 60
+            for m in matches
+        ], dtype=float)
+        self.has_initial = np.array([bool(initial) for _, initial, _ in live_matches], dtype=bool)
+        self.has_latest = np.array([bool(latest) for _, _, latest in live_matches], dtype=bool)
+        latest = [latest for _, _, latest in live_matches]
+        self.home_score = numeric(getattr(odd, "home_score", None) if odd is not None else None for odd in latest)
+        self.away_score = numeric(getattr(odd, "away_score", None) if odd is not None else None for odd in latest)
+        self.red_cards = {
+            key: numeric(getattr(m, key, None) for m in matches) for key in ("home_red_cards", "away_red_cards")
+        }
+
+        # (n, 3) home/draw/away prices per odds row
+        self.prices = {
+            "initial_odds_": self._prices(initial for _, initial, _ in live_matches),
+            "live_odds_": self._prices(latest),
+        }
+        self.sides = {prefix: favourite_and_outsider(prices) for prefix, prices in self.prices.items()}
+
+        self.text_codes = {}
+        self.country = codes((m.country for m in matches), self.text_codes.setdefault("country", {}))
+        self.competition = codes((m.competition_name for m in matches), self.text_codes.setdefault("competition", {}))
+        teams = self.text_codes.setdefault("team", {})
+        self.home_team = codes((m.home_team for m in matches), teams)
+        self.away_team = codes((m.away_team for m in matches), teams)
+        lower_teams = self.text_codes.setdefault("lower_team", {})
+        self.home_team_lower = codes(((m.home_team or "").lower() for m in matches), lower_teams)
+        self.away_team_lower = codes(((m.away_team or "").lower() for m in matches), lower_teams)
+
+        self._masks: dict[tuple, np.ndarray] = {}
+
+    @staticmethod
+    def _prices(odds) -> np.ndarray:
+        rows = [
+            (getattr(odd, "home_win", None), getattr(odd, "draw", None), getattr(odd, "away_win", None))
+            if odd is not None else (None, None, None)
+            for odd in odds
+        ]
+        return numeric(v for row in rows for v in row).reshape(-1, 3)
+
+    def code(self, column: str, value) -> int:
+        """Code of a value in a text column, or one no row has."""
+        return self.text_codes[column].get(value, -1)
+
+    def cached(self, key: tuple, build: Callable[[], np.ndarray]) -> np.ndarray:
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._masks[key] = build()
+        return mask
+
+
+def compile_comparison(operator: str, value) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Vector compare_value: False where the target is missing (NaN). Every target
+    is a number, so a text (or other non-numeric) operand is never equal or
+    ordered, as in the interpreter, where the comparison raises or is False.
+    """
+    def number(v):
+        if isinstance(v, bool):
+            return float(v)
+        return v if isinstance(v, (int, float)) else None
+
+    def nothing(target):
+        return np.zeros(target.shape, dtype=bool)
+
+    def present(target):
+        return ~np.isnan(target)
+
+    if operator == "between":
+        lower, upper = (number(v) for v in value)
+        if lower is None or upper is None:
+            return nothing
+        return lambda target: (lower <= target) & (target <= upper)
+    if operator not in ("equals", "not_equals", "greater_than", "less_than"):
+        raise InvalidBotConditions(f"Unknown operator {operator!r}")
+    operand = number(value)
+    if operand is None:
+        return present if operator == "not_equals" else nothing
+    if operator == "equals":
+        return lambda target: target == operand
+    if operator == "not_equals":
+        return lambda target: present(target) & (target != operand)
+    if operator == "greater_than":
+        return lambda target: target > operand
+    return lambda target: target < operand
+
+
+def odds_values(columns: LiveColumns, prefix: str, kind: str, selected_team: Optional[str]) -> np.ndarray:
+    """The odds an initial_odds_*/live_odds_* condition compares, NaN where there are none."""
+    prices = columns.prices[prefix]
+    rows = np.arange(columns.size)
+    if kind == "any":
+        # min() over a missing price raises in the interpreter: no match
+        return np.where(np.isnan(prices).any(axis=1), np.nan, prices.min(axis=1, initial=np.inf))
+    if kind == "home":
+        return prices[:, HOME]
+    if kind == "draw":
+        return prices[:, DRAW]
+    if kind == "away":
+        return prices[:, AWAY]
+    if kind == "selected_team":
+        if selected_team is None:
+            return np.full(columns.size, np.nan)
+        code = columns.code("lower_team", selected_team)
+        return np.where(columns.home_team_lower == code, prices[:, HOME],
+                        np.where(columns.away_team_lower == code, prices[:, AWAY], np.nan))
+    favourite, outsider = columns.sides[prefix]
+    if kind == "favourite":
+        return np.where(favourite == NO_SIDE, np.nan, prices[rows, np.maximum(favourite, 0)])
+    if kind == "outsider":
+        # As interpreted: a draw favourite reads the draw odds, a draw outsider has none
+        values = np.where(favourite == DRAW, prices[:, DRAW], prices[rows, np.maximum(outsider, 0)])
+        return np.where((outsider == NO_SIDE) | ((outsider == DRAW) & (favourite != DRAW)), np.nan, values)
+    return np.full(columns.size, np.nan)
+
+
+def compile_condition(key: str, operator: str, value, selected_team: Optional[str]) -> Optional[Mask]:
+    """One condition as a cached mask over the columns; None for keys that are ignored."""
+    try:
+        cache_key = (key, operator, json.dumps(value, sort_keys=True), selected_team if "selected_team" in key else None)
+    except (TypeError, ValueError):
+        raise Unvectorisable
+
+    # 🏟️ Match-level checks compare for equality whatever the operator
+    if key in ("country", "competition", "team"):
+        try:
+            hash(value)
+        except TypeError:
+            raise Unvectorisable
+        cache_key = (key, cache_key[2])
+        if key == "team":
+            def build(columns):
+                code = columns.code("team", value)
+                return (columns.home_team == code) | (columns.away_team == code)
+        else:
+            def build(columns):
+                return getattr(columns, key) == columns.code(key, value)
+        return lambda columns: columns.cached(cache_key, lambda: build(columns))
+
+    if key not in COMPARED_KEYS and not key.startswith(ODDS_PREFIXES):
+        return None
+    compare = compile_comparison(operator, value)
+
+    if key == "match_time":
+        def build(columns):
+            return compare(columns.elapsed_minutes)
+    elif key in ("home_goals", "away_goals"):
+        column = key.replace("goals", "score")
+        def build(columns):
+            return columns.has_latest & compare(getattr(columns, column))
+    elif key in ("home_red_cards", "away_red_cards"):
+        def build(columns):
+            return compare(columns.red_cards[key])
+    elif key == "score_difference":
+        def build(columns):
+            difference = np.where(columns.has_latest, np.abs(columns.home_score - columns.away_score), 0.0)
+            return compare(difference)
+    else:
+        prefix = next(p for p in ODDS_PREFIXES if key.startswith(p))
+        present = "has_initial" if prefix == "initial_odds_" else "has_latest"
+        kind = key[len(prefix):]
+        def build(columns):
+            return getattr(columns, present) & compare(odds_values(columns, prefix, kind, selected_team))
+
+    return lambda columns: columns.cached(cache_key, lambda: build(columns))
+
+
+def compile_bot_mask(conditions) -> Mask:
+    """
+    Compile a bot's conditions into a mask over LiveColumns. Raises
+    InvalidBotConditions like compile_bot_conditions.
+    """
+    predicate = compile_bot_conditions(conditions)
+
+    def scalar(columns: LiveColumns) -> np.ndarray:
+        return np.fromiter((predicate(*row) for row in columns.rows), dtype=bool, count=columns.size)
+
+    selected_team = None
+    team_condition = conditions.get("team")
+    if team_condition:
+        _, team_name = next(iter(team_condition.items()))
+        if isinstance(team_name, str) and team_name:
+            selected_team = team_name.lower()
+
+    masks = []
+    try:
+        for key, condition in conditions.items():
+            if not condition:
+                continue
+            operator, value = next(iter(condition.items()))
+            mask = compile_condition(key, operator, value, selected_team)
+            if mask is None:
+                continue
+            # Team, competition and country first: they rule out the most matches
+            if key in ("team", "competition", "country"):
+                masks.insert(0, mask)
+            else:
+                masks.append(mask)
+    except Unvectorisable:
+        return scalar
+
+    def evaluate(columns: LiveColumns) -> np.ndarray:
+        result = np.ones(columns.size, dtype=bool)
+        for mask in masks:
+            result &= mask(columns)
+            if not result.any():
+                break
+        return result
+
+    return evaluate
+
+
+def never(columns: LiveColumns) -> np.ndarray:
+    return np.zeros(columns.size, dtype=bool)
+
+
+# bot_id -> (updated_at, conditions, mask)
+_masks: dict[int, tuple[Any, Any, Mask]] = {}
+
+
+def get_bot_mask(bot: Bot) -> Mask:
+    """compile_bot_mask cached like get_bot_predicate; invalid conditions never match."""
+    cached = _masks.get(bot.bot_id)
+    if cached and cached[0] == bot.updated_at and cached[1] == bot.conditions:
+        return cached[2]
+    try:
+        mask = compile_bot_mask(bot.conditions)
+    except InvalidBotConditions as e:
+        logger.warning(f"Bot {bot.bot_id} ({bot.name}) has invalid conditions and will not bet: {e}")
+        mask = never
+    _masks[bot.bot_id] = (bot.updated_at, bot.conditions, mask)
+    return mask
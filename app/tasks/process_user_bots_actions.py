@@ -1,24 +1,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
-from app.models import InitialOdd, LatestOdd, Match, Bet, BetEvent, User, Bot
+from app.ledger import entry, record
+from app.models import InitialOdd, LatestOdd, Match, Bet, BetEvent, Bot
 from sqlalchemy import select, insert, update
 
 import logging
 logger = logging.getLogger(__name__)
 
-async def process_bot_action(session: AsyncSession, bot: Bot, match: Match, initial_odd: InitialOdd, latest_odd: LatestOdd):
+
+def plan_bot_bet(bot: Bot, match: Match, initial_odd: InitialOdd, latest_odd: LatestOdd) -> dict | None:
     """
-    Processes a bot's action and places a bet accordingly.
+    Decides the bet a bot's action places on a match, without writing it.
 
     Args:
-        session (AsyncSession): SQLAlchemy async session.
-        bot: , 
-        match: , 
-        initial_odd: , 
-        latest_odd: 
+        bot: the bot whose conditions matched,
+        match: the live match,
+        initial_odd: its initial odds,
+        latest_odd: its latest odds
 
     Returns:
-        dict: Details about the placed bet.
+        dict | None: The bet and bet_event rows to insert (bet_id left to
+        place_bot_bets) and the details reported for it, or None when the
+        action has no valid side or odds.
     """
 
     action = bot.action
@@ -148,7 +151,7 @@ async def process_bot_action(session: AsyncSession, bot: Bot, match: Match, init
 
         odds_to_use = current_odds_home if team_to_bet_on == "home" else current_odds_away
     # print("------------ ", team_to_bet_on, odds_to_use, team_to_bet_on and odds_to_use)
-    # --- Place the bet if valid ---
+    # --- Plan the bet if valid ---
     if team_to_bet_on and odds_to_use:
         # Place the bet with a fixed stake amount
         stake_amount = bot.bet_amount
@@ -164,36 +167,92 @@ async def process_bot_action(session: AsyncSession, bot: Bot, match: Match, init
             "bot_task": bot.name,
             "bot_id": bot.bot_id,
         }
-        stmt_bet = insert(Bet).values(**bet_payload).returning(Bet.bet_id)
-        inserted_bet_id = (await session.execute(stmt_bet)).scalar_one()
-
-        # Insert the bet event using the latest odds (for odd_id)
+        # The bet event uses the latest odds (for odd_id)
         bet_event_payload = {
-            "bet_id": inserted_bet_id,
             "match_id": match.match_id,
             "bet_type": team_to_bet_on,
             "odd_id": latest_odd.odds_id,  # Use latest odds id
             "outcome": "pending"
         }
-        await session.execute(insert(BetEvent).values(**bet_event_payload))
+        return {
+            "bet": bet_payload,
+            "event": bet_event_payload,
+            "result": {
+                "status": "success",
+                "team": team_to_bet_on,
+                "odds": odds_to_use,
+                "amount": stake_amount,
+                "action": action
+            },
+        }
 
-        # Now update the user's balance: subtract the stake amount
-        stmt_update_user = (
-            update(User)
-            .where(User.user_id == bot.user_id)
-            .values(balance = User.balance - stake_amount)
-        )
-        await session.execute(stmt_update_user)
+    return None
 
-        logger.info(f"\n ----- [{bot.name}] Placed bot bet on match {match.match_id} at odd {odds_to_use} -----")
-        await session.commit()
 
-        return {
-            "status": "success",
-            "team": team_to_bet_on,
-            "odds": odds_to_use,
-            "amount": stake_amount,
-            "action": action
-        }
+async def insert_bot_bets(session: AsyncSession, planned: list[dict]):
+    """Insert planned bets, their events and stake debits as multi-row INSERTs."""
+    # With RETURNING, executemany batches the rows into multi-row INSERTs, and
+    # sort_by_parameter_order returns the bet_ids in the order of the bets
+    bet_ids = (await session.execute(
+        insert(Bet).returning(Bet.bet_id, sort_by_parameter_order=True),
+        [bet["bet"] for bet in planned],
+    )).scalars().all()
+    await session.execute(
+        insert(BetEvent).returning(BetEvent.bet_event_id),
+        [{**bet["event"], "bet_id": bet_id} for bet_id, bet in zip(bet_ids, planned)],
+    )
+    # Debit the stakes through the balance ledger
+    await record(session, [
+        entry(bet["bet"]["user_id"], -bet["bet"]["amount"], "bet_debit", bet_id) for bet_id, bet in zip(bet_ids, planned)
+    ])
+
+
+async def insert_isolated(session: AsyncSession, planned: list[dict]) -> list[dict]:
+    """
+    Insert planned bets in a savepoint; if that fails, insert each half the
+    same way, so a bad bet only loses itself. Returns the bets inserted.
+    """
+    try:
+        async with session.begin_nested():
+            await insert_bot_bets(session, planned)
+        return planned
+    except Exception as e:
+        if len(planned) == 1:
+            bet = planned[0]
+            logger.error(f"[{bet['bet']['bot_task']}] Could not place bot bet on match {bet['event']['match_id']}: {e}")
+            return []
+    middle = len(planned) // 2
+    return await insert_isolated(session, planned[:middle]) + await insert_isolated(session, planned[middle:])
+
+
+async def place_bot_bets(session: AsyncSession, planned: list[dict]) -> list[dict]:
+    """
+    Writes the bets planned in a bot cycle in one transaction and commits.
+
+    Returns:
+        list[dict]: The planned bets that were placed.
+    """
+    if not planned:
+        return []
+    placed = await insert_isolated(session, planned)
+    await session.commit()
+
+    for bet in placed:
+        logger.info(f"\n ----- [{bet['bet']['bot_task']}] Placed bot bet on match {bet['event']['match_id']} at odd {bet['result']['odds']} -----")
+    return placed
+
 
-    return {"status": "skipped", "reason": "Invalid action or missing odds"}
+async def process_bot_action(session: AsyncSession, bot: Bot, match: Match, initial_odd: InitialOdd, latest_odd: LatestOdd):
+    """
+    Processes a bot's action and places a bet accordingly, in its own commit.
+    Bot cycles plan their bets with plan_bot_bet and place them together.
+
+    Returns:
+        dict: Details about the placed bet.
+    """
+    bet = plan_bot_bet(bot, match, initial_odd, latest_odd)
+    if bet is None:
+        return {"status": "skipped", "reason": "Invalid action or missing odds"}
+    if not await place_bot_bets(session, [bet]):
+        return {"status": "failed", "reason": "Could not place the bet"}
+    return bet["result"]
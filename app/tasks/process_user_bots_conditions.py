@@ -1,6 +1,7 @@
 # app/tasks/process_user_bots_conditions.py
 from typing import Dict, Any
 from app.models import InitialOdd, LatestOdd, Match
+from app.utils import match_time_to_seconds
 
 
 def compare_value(operator: str, target_value, condition_value) -> bool:
@@ -135,11 +136,10 @@ async def process_bot_conditions(
                 return False
 
         elif key == "match_time":
-            try:
-                minutes, seconds = map(int, match.match_time.split(":"))
-                match_time_value = minutes + seconds / 60
-            except Exception:
-                match_time_value = 0
+            elapsed_seconds = match.elapsed_seconds
+            if elapsed_seconds is None:
+                elapsed_seconds = match_time_to_seconds(match.match_time) or 0
+            match_time_value = elapsed_seconds / 60
             if not compare_value(operator, match_time_value, value):
                 return False
 
@@ -0,0 +1,139 @@
+# app/tasks/route_user_bots.py
+"""
+Routing of bots to the live matches they can match.
+
+Most bots pin a team, competition or country. BotRoutes indexes the active
+bots by that value (the most selective one a bot has: team, then competition,
+then country), with the bots pinning none in a residual list. In a bot cycle a
+routed bot is checked only against the live matches carrying its value, and
+not at all when none does; residual bots are checked against every match. The
+cost of a cycle so follows the bots relevant to each match rather than all
+bots. get_bot_routes rebuilds the index when the active bots change.
+
+These conditions compare for equality whatever their operator, as in the
+interpreter, so a bot is never routed away from a match it could match.
+"""
+from bisect import bisect_left
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+from app.models import Bot
+from app.tasks.compile_user_bots_conditions import get_bot_predicate
+from app.tasks.mask_user_bots_conditions import LiveColumns, get_bot_mask
+
+# Match-level keys a bot can be routed by, most selective first
+ROUTING_KEYS = ("team", "competition", "country")
+
+# Up to this many routed matches a bot's scalar predicate is cheaper than its mask
+SCALAR_MAX_ROWS = 32
+
+
+def routing_value(conditions) -> Optional[tuple[str, Any]]:
+    """The (key, value) a bot is routed by, or None if it goes in the residual list."""
+    if not isinstance(conditions, dict):
+        return None
+    for key in ROUTING_KEYS:
+        condition = conditions.get(key)
+        if not condition or not isinstance(condition, dict):
+            continue
+        _, value = next(iter(condition.items()))
+        try:
+            hash(value)
+        except TypeError:
+            continue
+        return key, value
+    return None
+
+
+def minute_thresholds(conditions) -> list[float]:
+    """The minutes at which a bot's match_time condition can change its result."""
+    if not isinstance(conditions, dict):
+        return []
+    condition = conditions.get("match_time")
+    if not condition or not isinstance(condition, dict):
+        return []
+    _, value = next(iter(condition.items()))
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [float(v) for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+
+def rows_by_value(columns: LiveColumns) -> dict[str, dict[Any, list[int]]]:
+    """Per routing key, the rows of the live matches carrying each value."""
+    grouped = {key: {} for key in ROUTING_KEYS}
+    teams, competitions, countries = grouped["team"], grouped["competition"], grouped["country"]
+    for row, (match, _, _) in enumerate(columns.rows):
+        teams.setdefault(match.home_team, []).append(row)
+        if match.away_team != match.home_team:
+            teams.setdefault(match.away_team, []).append(row)
+        competitions.setdefault(match.competition_name, []).append(row)
+        countries.setdefault(match.country, []).append(row)
+    return grouped
+
+
+class BotRoutes:
+    """Positions of a list of bots, by the value each is routed by."""
+
+    def __init__(self, bots: list[Bot]):
+        self.signature = [(bot.bot_id, bot.updated_at, bot.conditions) for bot in bots]
+        self.routed: dict[str, dict[Any, list[int]]] = {key: {} for key in ROUTING_KEYS}
+        self.residual: list[int] = []
+        # Sorted minutes used by any bot's match_time condition
+        self.minute_thresholds = sorted({m for bot in bots for m in minute_thresholds(bot.conditions)})
+        for position, bot in enumerate(bots):
+            routing = routing_value(bot.conditions)
+            if routing is None:
+                self.residual.append(position)
+            else:
+                key, value = routing
+                self.routed[key].setdefault(value, []).append(position)
+
+    def matches(self, bots: list[Bot]) -> bool:
+        return self.signature == [(bot.bot_id, bot.updated_at, bot.conditions) for bot in bots]
+
+    def crosses_minute_threshold(self, before: float, after: float) -> bool:
+        """Whether a match clock moving from before to after (minutes) passes a bot's threshold."""
+        low, high = min(before, after), max(before, after)
+        i = bisect_left(self.minute_thresholds, low)
+        return i < len(self.minute_thresholds) and self.minute_thresholds[i] <= high
+
+    def candidates(self, bots: list[Bot], columns: LiveColumns) -> Iterator[tuple[Bot, Optional[list[int]]]]:
+        """
+        (bot, rows) for the bots that can match a live match, in their original
+        order: rows are those carrying the bot's value, None for residual bots.
+        """
+        routed = {position: None for position in self.residual}
+        for key, live in rows_by_value(columns).items():
+            by_value = self.routed[key]
+            for value, rows in live.items():
+                for position in by_value.get(value, ()):
+                    routed[position] = rows
+        for position in sorted(routed):
+            yield bots[position], routed[position]
+
+
+def matching_rows(bot: Bot, rows: Optional[list[int]], columns: LiveColumns) -> list[int]:
+    """The rows (among rows, or all) whose match meets the bot's conditions and has live odds."""
+    if rows is not None and len(rows) <= SCALAR_MAX_ROWS:
+        predicate = get_bot_predicate(bot)
+        return [row for row in rows if columns.rows[row][2] and predicate(*columns.rows[row])]
+    selected = get_bot_mask(bot)(columns) & columns.has_latest
+    if rows is None:
+        return np.flatnonzero(selected).tolist()
+    return [row for row in rows if selected[row]]
+
+
+_routes: Optional[BotRoutes] = None
+
+
+def get_bot_routes(bots: list[Bot]) -> BotRoutes:
+    """The routing index of the active bots, rebuilt when one is added, removed or edited."""
+    global _routes
+    if _routes is None or not _routes.matches(bots):
+        _routes = BotRoutes(bots)
+    return _routes
+
+
+def current_bot_routes() -> Optional[BotRoutes]:
+    """The index built by the last bot cycle, None before the first."""
+    return _routes
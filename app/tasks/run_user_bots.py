@@ -1,64 +1,92 @@
 # app/tasks/run_bots.py
 import asyncio
-from sqlalchemy import select, and_, exists
+from sqlalchemy import select, func
+from app.config import BOTS
 from app.database import async_session
-from app.models import Match, InitialOdd, LatestOdd, Bet, BetEvent, User, Bot
-from app.tasks.process_user_bots_conditions import process_bot_conditions
-from app.tasks.process_user_bots_actions import process_bot_action
+from app.models import Match, MatchOddsSummary, Bet, BetEvent, User, Bot
+from app.tasks.mask_user_bots_conditions import LiveColumns
+from app.tasks.route_user_bots import get_bot_routes, matching_rows
+from app.tasks.process_user_bots_actions import plan_bot_bet, place_bot_bets
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import logging
 logger = logging.getLogger(__name__)
 
-async def run_all_bots_once(session: AsyncSession):
-    bots = (await session.execute(select(Bot).where(Bot.active == True))).scalars().all()
-    # logger.info(f'\n\n************************ {len(bots)} user bots currently active ************************\n')
-    for bot in bots:
-        stmt = select(Match).where(Match.live == True)
-        result = await session.execute(stmt)
-        live_matches = result.scalars().all()
-        # logger.info(f"Found {len(live_matches)} live matches for late-game betting.")
+# One bot cycle at a time (sweeps and change-driven runs), so two can't both
+# place a bet on the same (bot, match)
+cycle_lock = asyncio.Lock()
+
+async def load_cycle_snapshot(session: AsyncSession, match_ids=None):
+    """
+    Everything one bot cycle reads, in two queries: the live matches (all, or
+    those in match_ids) with their odds (initial_odd, latest_odd) and the
+    (lower(bot_task), match_id) pairs already bet by a bot on one of them.
+    """
+    query = (
+        select(Match, MatchOddsSummary)
+        .outerjoin(MatchOddsSummary, MatchOddsSummary.match_id == Match.match_id)
+        .where(Match.live == True)
+    )
+    if match_ids is not None:
+        query = query.where(Match.match_id.in_(list(match_ids)))
+    result = await session.execute(query)
+    # Latest and initial odds share one summary row per match
+    live_matches = [(match, summary.initial if summary else None, summary) for match, summary in result.all()]
+
+    already_bet = set()
+    if live_matches:
+        result = await session.execute(
+            select(func.lower(Bet.bot_task), BetEvent.match_id)
+            .join(Bet, BetEvent.bet_id == Bet.bet_id)
+            .where(Bet.bot == True, BetEvent.match_id.in_([match.match_id for match, _, _ in live_matches]))
+            .distinct()
+        )
+        already_bet = set(result.all())
+    return live_matches, already_bet
 
-        for match in live_matches:
-            # print(f'bot{bot.bot_id}, match{match.match_id}', bot.conditions)
 
+async def run_all_bots_once(session: AsyncSession, match_ids=None):
+    """Run the active bots against the live matches, or only those in match_ids."""
+    bots = (await session.execute(select(Bot).where(Bot.active == True).order_by(Bot.bot_id))).scalars().all()
+    if not bots:
+        return
+    live_matches, already_bet = await load_cycle_snapshot(session, match_ids)
+    columns = LiveColumns(live_matches)
+    # logger.info(f'\n\n************************ {len(bots)} user bots currently active ************************\n')
+    # Bets are collected over the whole cycle and placed in one transaction
+    planned = []
+    # Each bot is checked only against the live matches with its team, competition or country
+    for bot, rows in get_bot_routes(bots).candidates(bots, columns):
+        bot_task = bot.name.lower()
+
+        for index in matching_rows(bot, rows, columns):
+            match, initial_odd, latest_odd = live_matches[index]
             # Check if a bot bet already exists for this match
-            subq = select(BetEvent.match_id).join(Bet, BetEvent.bet_id == Bet.bet_id).where(
-                and_(
-                    Bet.bot == True,
-                    Bet.bot_task.ilike(bot.name),
-                    BetEvent.match_id == match.match_id
-                )
-            )
-            exists_bet = await session.execute(select(exists(subq)))
-            if exists_bet.scalar():
-                # logger.info(f"Bot bet already placed for match {match.match_id}, skipping.")
+            if (bot_task, match.match_id) in already_bet:
                 continue
 
-            result = await session.execute(select(InitialOdd).where(InitialOdd.match_id == match.match_id))
-            initial_odd = result.scalar_one_or_none()
-
-            result = await session.execute(select(LatestOdd).where(LatestOdd.match_id == match.match_id))
-            latest_odd = result.scalar_one_or_none()
-            
-            result = await process_bot_conditions(session, bot.conditions or [], match, initial_odd, latest_odd)
-            
-            if result:
-                # ✅ Conditions met → perform bot action (place bet, etc.)
-                # logger.info(f"\n---------- Bot {bot.name} triggered for match {match.match_id}\n\t--- bot_conditions: {bot.conditions}")
-                await process_bot_action(session, bot, match, initial_odd, latest_odd)
-            # else:
-            #     print('-----------not meet reqs\n\n')
+            # ✅ Conditions met → perform bot action (place bet, etc.)
+            # logger.info(f"\n---------- Bot {bot.name} triggered for match {match.match_id}\n\t--- bot_conditions: {bot.conditions}")
+            try:
+                bet = plan_bot_bet(bot, match, initial_odd, latest_odd)
+            except Exception as e:
+                logger.error(f"[{bot.name}] Could not plan a bet on match {match.match_id}: {e}")
+                continue
+            if bet is not None:
+                planned.append(bet)
+                already_bet.add((bot_task, match.match_id))
+    await place_bot_bets(session, planned)
     # logger.info(f'\n************* {len(bots)} user bots finished checking {len(live_matches)} live matches **********\n\n')
     
 
 async def periodic_run_all_bots():
+    # Full sweep; changes are picked up sooner by periodic_run_bots_on_changes
     while True:
         # logger.info("Running automated bet placement task.")
-        async with async_session() as session:
+        async with cycle_lock, async_session() as session:
             try:
                 await run_all_bots_once(session)
             except Exception as e:
                 logger.error(f"Error in automated bet placement: {e}")
                 await session.rollback()
-        await asyncio.sleep(60)  # Run every 10 minutes
\ No newline at end of file
+        await asyncio.sleep(BOTS["sweep_interval_seconds"])
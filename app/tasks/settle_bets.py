@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import SETTLEMENT
+from app.database import async_session
+
+logger = logging.getLogger(__name__)
+
+# SofaScore statuses whose score is final (AET/AP rows carry the score after
+# extra time, so those matches keep settling from the odds feed)
+FINISHED_STATUSES = ("finished",)
+FINISHED = bindparam("finished", expanding=True)
+
+# Linked matches SofaScore reports as finished are ended straight away instead of
+# waiting for the 90:00 heuristic or the three-hour cleanup of pending matches
+FINALISE_MATCHES_SQL = """
+UPDATE "match" m
+SET event_status = 'ended', live = false
+FROM sofascore_ft f
+WHERE f.match_id = m.match_id
+  AND f.event_status IN :finished
+  AND f.home_score IS NOT NULL AND f.away_score IS NOT NULL
+  AND lower(m.event_status) IS DISTINCT FROM 'ended'
+RETURNING m.match_id
+"""
+
+# Ended matches (live table, already archived, or finished on SofaScore) that
+# still have unsettled legs and a final score. The verified SofaScore score wins
+# over the last one seen in the odds feed. The leg scan uses
+# ix_bet_event_pending_match_id.
+ENDED_MATCHES_SQL = """
+SELECT s.match_id,
+       CASE WHEN coalesce(f.home_score, s.home_score) > coalesce(f.away_score, s.away_score) THEN 'home'
+            WHEN coalesce(f.home_score, s.home_score) < coalesce(f.away_score, s.away_score) THEN 'away'
+            ELSE 'draw' END AS winning_bet_type
+FROM match_odds_summary s
+LEFT JOIN LATERAL (
+    SELECT home_score, away_score
+    FROM sofascore_ft
+    WHERE match_id = s.match_id AND event_status IN :finished
+      AND home_score IS NOT NULL AND away_score IS NOT NULL
+    ORDER BY sofascore_id DESC
+    LIMIT 1
+) f ON true
+WHERE s.match_id IN (SELECT match_id FROM bet_event WHERE outcome IS NULL OR outcome = 'pending')
+  AND ((s.home_score IS NOT NULL AND s.away_score IS NOT NULL) OR f.home_score IS NOT NULL)
+  AND (f.home_score IS NOT NULL
+       OR EXISTS (SELECT 1 FROM "match" m WHERE m.match_id = s.match_id AND lower(m.event_status) = 'ended')
+       OR EXISTS (SELECT 1 FROM ended_match e WHERE e.match_id = s.match_id))
+ORDER BY s.match_id
+LIMIT :batch_size
+"""
+
+# Every unsettled leg of the batch in one UPDATE; each touched bet then moves
+# its counters by what settled (no rescan of bet_event): lost with its first
+# lost leg, won once no leg is pending, otherwise unchanged. The bet_ids and
+# transitions are counted from the rows actually updated.
+SETTLE_SQL = f"""
+WITH batch AS ({ENDED_MATCHES_SQL}),
+legs AS (
+    UPDATE bet_event be
+    SET outcome = CASE WHEN be.bet_type = b.winning_bet_type THEN 'won' ELSE 'lost' END
+    FROM batch b
+    WHERE be.match_id = b.match_id AND (be.outcome IS NULL OR be.outcome = 'pending')
+    RETURNING be.bet_id, be.outcome
+),
+settled AS (
+    SELECT bet_id, count(*) AS legs, count(*) FILTER (WHERE outcome = 'lost') AS lost
+    FROM legs
+    GROUP BY bet_id
+),
+bets AS (
+    UPDATE bet
+    SET pending_legs = bet.pending_legs - s.legs,
+        lost_legs = bet.lost_legs + s.lost,
+        outcome = CASE WHEN bet.lost_legs + s.lost > 0 THEN 'lost'
+                       WHEN bet.pending_legs - s.legs <= 0 THEN 'won'
+                       ELSE bet.outcome END,
+        updated_at = now()
+    FROM settled s
+    WHERE bet.bet_id = s.bet_id
+    RETURNING bet.outcome, bet.pending_legs, bet.lost_legs, s.lost
+)
+SELECT (SELECT count(*) FROM batch) AS matches,
+       (SELECT count(*) FILTER (WHERE outcome = 'won') FROM legs) AS legs_won,
+       (SELECT count(*) FILTER (WHERE outcome = 'lost') FROM legs) AS legs_lost,
+       (SELECT count(*) FROM bets WHERE lost_legs = 0 AND pending_legs <= 0) AS bets_won,
+       -- First lost leg of the bet in this batch
+       (SELECT count(*) FROM bets WHERE lost > 0 AND lost_legs = lost) AS bets_lost
+"""
+
+
+# Re-settlement of corrected matches. The result of each match is the score
+# given with the correction, else the verified SofaScore score, else the last
+# score in the odds feed. Only settled legs whose outcome changes are touched;
+# they are unstamped so the validator checks them again.
+RESETTLE_LEGS_SQL = """
+WITH corrections AS (
+    SELECT * FROM unnest(CAST(:match_ids AS text[]), CAST(:home_scores AS integer[]), CAST(:away_scores AS integer[]))
+        AS c(match_id, home_score, away_score)
+),
+results AS (
+    SELECT c.match_id, r.home_score, r.away_score,
+           CASE WHEN r.home_score > r.away_score THEN 'home'
+                WHEN r.home_score < r.away_score THEN 'away'
+                ELSE 'draw' END AS winning_bet_type
+    FROM corrections c
+    LEFT JOIN LATERAL (
+        SELECT home_score, away_score
+        FROM sofascore_ft
+        WHERE match_id = c.match_id AND event_status IN :finished
+          AND home_score IS NOT NULL AND away_score IS NOT NULL
+        ORDER BY sofascore_id DESC
+        LIMIT 1
+    ) f ON true
+    LEFT JOIN match_odds_summary s ON s.match_id = c.match_id
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN c.home_score IS NOT NULL AND c.away_score IS NOT NULL THEN c.home_score
+                    WHEN f.home_score IS NOT NULL THEN f.home_score ELSE s.home_score END AS home_score,
+               CASE WHEN c.home_score IS NOT NULL AND c.away_score IS NOT NULL THEN c.away_score
+                    WHEN f.home_score IS NOT NULL THEN f.away_score ELSE s.away_score END AS away_score
+    ) r
+    WHERE r.home_score IS NOT NULL AND r.away_score IS NOT NULL
+),
+changed AS (
+    UPDATE bet_event be
+    SET outcome = CASE WHEN be.bet_type = r.winning_bet_type THEN 'won' ELSE 'lost' END,
+        validated = NULL, validated_at = NULL
+    FROM results r
+    WHERE be.match_id = r.match_id AND be.outcome IN ('won', 'lost')
+      AND be.outcome <> CASE WHEN be.bet_type = r.winning_bet_type THEN 'won' ELSE 'lost' END
+    RETURNING be.bet_event_id, be.bet_id, be.match_id, be.outcome, r.home_score, r.away_score
+),
+audited AS (
+    INSERT INTO settlement_audit (correction_id, match_id, bet_id, bet_event_id, old_outcome, new_outcome,
+                                  home_score, away_score, reason)
+    SELECT :correction_id, match_id, bet_id, bet_event_id,
+           CASE WHEN outcome = 'won' THEN 'lost' ELSE 'won' END, outcome, home_score, away_score, :reason
+    FROM changed
+)
+SELECT (SELECT array_agg(match_id) FROM results) AS matches,
+       count(*) AS legs_changed,
+       array_agg(bet_id) AS bet_ids,
+       -- +1 for a leg that became lost, -1 for one that became won
+       array_agg(CASE WHEN outcome = 'lost' THEN 1 ELSE -1 END) AS lost_deltas
+FROM changed
+"""
+
+# Move the counters of the affected bets by the leg changes and recompute the
+# outcome from them; bet_win_trigger credits or reverses the win in the ledger
+RESETTLE_BETS_SQL = """
+WITH deltas AS (
+    SELECT bet_id, sum(lost_delta) AS lost_delta
+    FROM unnest(CAST(:bet_ids AS integer[]), CAST(:lost_deltas AS integer[])) AS d(bet_id, lost_delta)
+    GROUP BY bet_id
+),
+previous AS (
+    SELECT bet.bet_id, bet.outcome FROM bet JOIN deltas d ON d.bet_id = bet.bet_id FOR UPDATE OF bet
+),
+updated AS (
+    UPDATE bet
+    SET lost_legs = bet.lost_legs + d.lost_delta,
+        outcome = CASE WHEN bet.lost_legs + d.lost_delta > 0 THEN 'lost'
+                       WHEN bet.pending_legs > 0 THEN 'pending'
+                       ELSE 'won' END,
+        validated = NULL, validated_at = NULL, updated_at = now()
+    FROM deltas d
+    WHERE bet.bet_id = d.bet_id
+    RETURNING bet.bet_id, bet.outcome
+),
+audited AS (
+    INSERT INTO settlement_audit (correction_id, bet_id, old_outcome, new_outcome, reason)
+    SELECT :correction_id, u.bet_id, p.outcome, u.outcome, :reason
+    FROM updated u
+    JOIN previous p ON p.bet_id = u.bet_id
+    WHERE p.outcome IS DISTINCT FROM u.outcome
+    RETURNING old_outcome, new_outcome
+)
+SELECT count(*) AS bets_changed,
+       count(*) FILTER (WHERE new_outcome = 'won') AS wins_credited,
+       count(*) FILTER (WHERE old_outcome = 'won') AS wins_reversed
+FROM audited
+"""
+
+
+async def resettle_matches(session: AsyncSession, corrections: list[dict], reason: str = None) -> dict:
+    """
+    Re-settle already settled matches after a score correction, in one transaction.
+    corrections are dicts with match_id and optionally home_score/away_score.
+    Only legs and bets whose outcome changes are updated; each change is written
+    to settlement_audit under the returned correction_id.
+    """
+    correction_id = uuid.uuid4().hex
+    counts = {"correction_id": correction_id, "matches": [], "legs_changed": 0,
+              "bets_changed": 0, "wins_credited": 0, "wins_reversed": 0}
+    # Waits for a running settlement batch rather than interleaving with it
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('settle_bets'))"))
+    legs = (await session.execute(
+        text(RESETTLE_LEGS_SQL).bindparams(FINISHED),
+        {
+            "match_ids": [c["match_id"] for c in corrections],
+            "home_scores": [c.get("home_score") for c in corrections],
+            "away_scores": [c.get("away_score") for c in corrections],
+            "finished": FINISHED_STATUSES,
+            "correction_id": correction_id,
+            "reason": reason,
+        },
+    )).one()
+    counts.update(matches=legs.matches or [], legs_changed=legs.legs_changed)
+    if legs.bet_ids:
+        bets = (await session.execute(
+            text(RESETTLE_BETS_SQL),
+            {"bet_ids": legs.bet_ids, "lost_deltas": legs.lost_deltas, "correction_id": correction_id, "reason": reason},
+        )).one()
+        counts.update(bets._mapping)
+    await session.commit()
+    return counts
+
+
+async def finalise_from_sofascore(session: AsyncSession) -> int:
+    """
+    Mark linked matches that SofaScore reports as finished as ended, and return
+    how many. Unlinked matches keep ending through the odds feed and cleanup.
+    """
+    try:
+        result = await session.execute(text(FINALISE_MATCHES_SQL).bindparams(FINISHED), {"finished": FINISHED_STATUSES})
+        finalised = len(result.fetchall())
+        await session.commit()
+    except Exception as e:
+        logger.error(f"finalise_from_sofascore() failed: {e}")
+        await session.rollback()
+        return 0
+    return finalised
+
+
+async def settle_ended_matches(session: AsyncSession, batch_size: int) -> dict:
+    """
+    Settle the legs and bets of up to batch_size ended matches in one set-based
+    statement, and return the counts. Idempotent: settled legs are never picked
+    again, so a rerun (or a concurrent run, which skips) changes nothing.
+    """
+    counts = {"matches": 0, "legs_won": 0, "legs_lost": 0, "bets_won": 0, "bets_lost": 0}
+    try:
+        # One settlement run at a time across processes
+        locked = await session.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext('settle_bets'))"))
+        if not locked:
+            await session.rollback()
+            return counts
+
+        settled = (await session.execute(text(SETTLE_SQL).bindparams(FINISHED),
+                                         {"batch_size": batch_size, "finished": FINISHED_STATUSES})).one()
+        counts.update(settled._mapping)
+        await session.commit()
+    except Exception as e:
+        logger.error(f"settle_ended_matches() failed: {e}")
+        await session.rollback()
+        return {key: 0 for key in counts}
+    return counts
+
+
+async def periodic_settle_bets():
+    # Runs in both settlement modes: in "trigger" mode ending a match fires
+    # match_end_trigger, which settles its bets, so only the batch is skipped
+    while True:
+        try:
+            async with async_session() as session:
+                finalised = await finalise_from_sofascore(session)
+            if finalised:
+                logger.info(f"Ended {finalised} matches finished on SofaScore")
+            while SETTLEMENT["mode"] == "batch":
+                async with async_session() as session:
+                    counts = await settle_ended_matches(session, SETTLEMENT["batch_size"])
+                if counts["matches"]:
+                    logger.info(
+                        f"Settled {counts['matches']} matches: legs {counts['legs_won']} won / {counts['legs_lost']} lost, "
+                        f"bets {counts['bets_won']} won / {counts['bets_lost']} lost"
+                    )
+                if counts["matches"] < SETTLEMENT["batch_size"]:
+                    break
+        except Exception as e:
+            logger.error(f"Error in periodic_settle_bets: {e}")
+        await asyncio.sleep(SETTLEMENT["interval_seconds"])
@@ -0,0 +1,115 @@
+# app/tasks/trigger_user_bots.py
+"""
+Bot runs driven by match and odds changes.
+
+periodic_run_bots_on_changes subscribes to the live_changes notifications
+(app/notifications.py) and re-runs the bots against the matches they name,
+so a bot reacts within about a second of an odds move instead of at the next
+sweep. Notifications arriving within BOTS["event_debounce_seconds"] of the
+first one are batched into one run. A match is re-evaluated when:
+
+- its odds, score or status changed, or it is new or went live;
+- only its clock moved, but across a minute some bot's match_time condition
+  uses (the thresholds come from the routing index of the last cycle).
+
+Within a run, routing limits the bots to those relevant to the changed
+matches. Notifications are lost while the listener reconnects or when this
+subscriber falls behind, so periodic_run_all_bots keeps a slower full sweep.
+At the same interval, the clocks kept for matches that stopped being live
+without a notification (e.g. removed by cleanup) are forgotten.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import BOTS
+from app.database import async_session
+from app.models import Match
+from app.notifications import subscribe, unsubscribe
+from app.tasks.route_user_bots import BotRoutes, current_bot_routes
+from app.tasks.run_user_bots import cycle_lock, run_all_bots_once
+
+logger = logging.getLogger(__name__)
+
+# Odds and match changes ("c" keys) that can change a bot's result
+RELEVANT_CHANGES = {"new", "s", "l", "hs", "as", "h", "d", "a"}
+
+# match_id -> match clock (minutes) in its last odds notification
+_minutes: dict[str, Optional[float]] = {}
+
+
+def changed_matches(notification: dict, routes: Optional[BotRoutes]) -> set[str]:
+    """The match ids of a notification whose change can make a bot match."""
+    changed = set()
+    for item in notification.get("changes", ()):
+        match_id = item.get("m")
+        if notification.get("type") == "match":
+            if not item.get("l"):
+                # Bots only bet on live matches
+                _minutes.pop(match_id, None)
+            elif RELEVANT_CHANGES.intersection(item.get("c", ())):
+                changed.add(match_id)
+            continue
+
+        elapsed_seconds = item.get("t")
+        minutes = elapsed_seconds / 60 if elapsed_seconds is not None else None
+        before = _minutes.get(match_id)
+        _minutes[match_id] = minutes
+        if RELEVANT_CHANGES.intersection(item.get("c", ())):
+            changed.add(match_id)
+        elif "t" in item.get("c", ()):
+            if routes is None or minutes is None or before is None or routes.crosses_minute_threshold(before, minutes):
+                changed.add(match_id)
+    return changed
+
+
+async def collect_changes(queue: asyncio.Queue) -> set[str]:
+    """Wait for a relevant change, then gather those notified within the debounce window."""
+    loop = asyncio.get_running_loop()
+    changed = set()
+    while not changed:
+        changed = changed_matches(await queue.get(), current_bot_routes())
+    deadline = loop.time() + BOTS["event_debounce_seconds"]
+    while (remaining := deadline - loop.time()) > 0:
+        try:
+            notification = await asyncio.wait_for(queue.get(), remaining)
+        except asyncio.TimeoutError:
+            break
+        changed |= changed_matches(notification, current_bot_routes())
+    return changed
+
+
+async def prune_minutes(session: AsyncSession):
+    """Forget the clocks of matches that are no longer live, so _minutes stays bounded."""
+    result = await session.execute(select(Match.match_id).where(Match.live == True))
+    live = set(result.scalars().all())
+    for match_id in _minutes.keys() - live:
+        del _minutes[match_id]
+
+
+async def periodic_run_bots_on_changes():
+    loop = asyncio.get_running_loop()
+    queue = subscribe()
+    pruned_at = loop.time()
+    try:
+        while True:
+            try:
+                changed = await collect_changes(queue)
+                async with cycle_lock, async_session() as session:
+                    try:
+                        await run_all_bots_once(session, changed)
+                    except Exception as e:
+                        logger.error(f"Error in bet placement for {len(changed)} changed matches: {e}")
+                        await session.rollback()
+                if loop.time() - pruned_at >= BOTS["sweep_interval_seconds"]:
+                    async with async_session() as session:
+                        await prune_minutes(session)
+                    pruned_at = loop.time()
+            except Exception as e:
+                logger.error(f"Error in periodic_run_bots_on_changes: {e}")
+                await asyncio.sleep(1)
+    finally:
+        unsubscribe(queue)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import VALIDATION
+from app.database import async_session
+from app.tasks.settle_bets import FINISHED, FINISHED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Normal-time result of the leg's match from its latest verified SofaScore row
+# (ix_sofascore_ft_match_id), looked up per leg
+VERIFIED_RESULT_SQL = """
+SELECT CASE WHEN home_score > away_score THEN 'home'
+            WHEN home_score < away_score THEN 'away'
+            ELSE 'draw' END AS winning_bet_type
+FROM sofascore_ft
+WHERE match_id = be.match_id AND event_status IN :finished
+  AND home_score IS NOT NULL AND away_score IS NOT NULL
+ORDER BY sofascore_id DESC
+LIMIT 1
+"""
+
+# Settled legs not validated yet whose match has a verified result: confirmed
+# (validated = true) or flagged (false). The scan is driven by
+# ix_bet_event_unvalidated, so only the pending legs' matches are looked up.
+VALIDATE_LEGS_SQL = f"""
+WITH batch AS (
+    SELECT be.bet_event_id,
+           CASE WHEN be.bet_type = v.winning_bet_type THEN 'won' ELSE 'lost' END AS expected
+    FROM bet_event be
+    CROSS JOIN LATERAL ({VERIFIED_RESULT_SQL}) v
+    WHERE be.validated IS NULL AND be.outcome IN ('won', 'lost')
+    LIMIT :batch_size
+),
+legs AS (
+    UPDATE bet_event be
+    SET validated = (be.outcome = b.expected), validated_at = now()
+    FROM batch b
+    WHERE be.bet_event_id = b.bet_event_id
+    RETURNING be.bet_id, be.validated
+)
+SELECT count(*) FILTER (WHERE validated) AS legs_confirmed,
+       count(*) FILTER (WHERE NOT validated) AS legs_flagged,
+       array_agg(DISTINCT bet_id) AS bet_ids
+FROM legs
+"""
+
+# A bet is validated once all of its legs are: confirmed only if every leg was
+VALIDATE_BETS_SQL = """
+WITH checked AS (
+    SELECT bet_id, bool_and(validated) AS validated
+    FROM bet_event
+    WHERE bet_id = ANY(:bet_ids)
+    GROUP BY bet_id
+    HAVING bool_and(validated IS NOT NULL)
+),
+stamped AS (
+    UPDATE bet
+    SET validated = c.validated, validated_at = now()
+    FROM checked c
+    WHERE bet.bet_id = c.bet_id
+    RETURNING bet.validated
+)
+SELECT count(*) FILTER (WHERE validated) AS bets_confirmed,
+       count(*) FILTER (WHERE NOT validated) AS bets_flagged
+FROM stamped
+"""
+
+
+async def validate_settled_bets(session: AsyncSession, batch_size: int) -> dict:
+    """
+    Check up to batch_size settled legs against verified SofaScore results, stamp
+    them and the bets they complete, and return the counts.
+    """
+    counts = {"legs_confirmed": 0, "legs_flagged": 0, "bets_confirmed": 0, "bets_flagged": 0}
+    try:
+        legs = (await session.execute(text(VALIDATE_LEGS_SQL).bindparams(FINISHED),
+                                      {"batch_size": batch_size, "finished": FINISHED_STATUSES})).one()
+        counts.update(legs_confirmed=legs.legs_confirmed, legs_flagged=legs.legs_flagged)
+        if legs.bet_ids:
+            bets = (await session.execute(text(VALIDATE_BETS_SQL), {"bet_ids": legs.bet_ids})).one()
+            counts.update(bets_confirmed=bets.bets_confirmed, bets_flagged=bets.bets_flagged)
+        await session.commit()
+    except Exception as e:
+        logger.error(f"validate_settled_bets() failed: {e}")
+        await session.rollback()
+        return {key: 0 for key in counts}
+    return counts
+
+
+async def periodic_validate_bets():
+    while True:
+        try:
+            while True:
+                async with async_session() as session:
+                    counts = await validate_settled_bets(session, VALIDATION["batch_size"])
+                checked = counts["legs_confirmed"] + counts["legs_flagged"]
+                if checked:
+                    logger.info(
+                        f"Validated {checked} legs ({counts['legs_flagged']} flagged), "
+                        f"bets {counts['bets_confirmed']} confirmed / {counts['bets_flagged']} flagged"
+                    )
+                if counts["legs_flagged"]:
+                    logger.warning(f"{counts['legs_flagged']} settled legs disagree with SofaScore, see GET /bets/discrepancies")
+                if checked < VALIDATION["batch_size"]:
+                    break
+        except Exception as e:
+            logger.error(f"Error in periodic_validate_bets: {e}")
+        await asyncio.sleep(VALIDATION["interval_seconds"])
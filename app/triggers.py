@@ -2,84 +2,174 @@ import logging
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncConnection  # For type hinting
 
+from app.config import SETTLEMENT, SETTLEMENT_MODES
+
 logger = logging.getLogger(__name__)
 
+# Daily bet totals kept by the rollup triggers (see app/rollups.py)
+ROLLUP_COLUMNS = ("bets", "stake", "settled_stake", "returns", "won", "lost", "pending", "odds_sum")
+
+# Totals of a set of bet rows, in ROLLUP_COLUMNS order
+ROLLUP_TOTALS_SQL = """
+count(*) AS bets,
+coalesce(sum(amount), 0) AS stake,
+coalesce(sum(amount) FILTER (WHERE outcome IN ('won', 'lost')), 0) AS settled_stake,
+coalesce(sum(expected_win) FILTER (WHERE outcome = 'won'), 0) AS returns,
+count(*) FILTER (WHERE outcome = 'won') AS won,
+count(*) FILTER (WHERE outcome = 'lost') AS lost,
+count(*) FILTER (WHERE outcome IS NULL OR outcome = 'pending') AS pending,
+coalesce(sum(expected_win / amount) FILTER (WHERE amount > 0), 0) AS odds_sum
+"""
+
+# The same over rows r that each count as +1 or -1 (r.sign)
+ROLLUP_SIGNED_TOTALS_SQL = """
+sum(r.sign),
+coalesce(sum(r.sign * r.amount), 0),
+coalesce(sum(r.sign * r.amount) FILTER (WHERE r.outcome IN ('won', 'lost')), 0),
+coalesce(sum(r.sign * r.expected_win) FILTER (WHERE r.outcome = 'won'), 0),
+coalesce(sum(r.sign) FILTER (WHERE r.outcome = 'won'), 0),
+coalesce(sum(r.sign) FILTER (WHERE r.outcome = 'lost'), 0),
+coalesce(sum(r.sign) FILTER (WHERE r.outcome IS NULL OR r.outcome = 'pending'), 0),
+coalesce(sum(r.sign * r.expected_win / r.amount) FILTER (WHERE r.amount > 0), 0)
+"""
+
 async def create_trigger_functions(conn: AsyncConnection):
     # --- Existing trigger function for odds summary ---
     trigger_function_sql = """
     CREATE OR REPLACE FUNCTION update_odd_summary() RETURNS trigger AS $$
+    DECLARE
+      notified INTEGER;
     BEGIN
-      -- Update Latest Odd
-      INSERT INTO latest_odd (match_id, odds_id, event_status, match_time, home_score, away_score, home_win, draw, away_win, fetched_at)
-      VALUES (NEW.match_id, NEW.odds_id, NEW.event_status, NEW.match_time, NEW.home_score, NEW.away_score, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at)
-      ON CONFLICT (match_id) DO UPDATE SET
-        odds_id = EXCLUDED.odds_id,
-        event_status = EXCLUDED.event_status,
-        match_time = EXCLUDED.match_time,
-        home_score = EXCLUDED.home_score,
-        away_score = EXCLUDED.away_score,
-        home_win = EXCLUDED.home_win,
-        draw = EXCLUDED.draw,
-        away_win = EXCLUDED.away_win,
-        fetched_at = EXCLUDED.fetched_at;
-
-      -- Update Initial Odd
-      INSERT INTO initial_odd (match_id, odds_id, event_status, match_time, home_score, away_score, home_win, draw, away_win, fetched_at)
-      VALUES (NEW.match_id, NEW.odds_id, NEW.event_status, NEW.match_time, NEW.home_score, NEW.away_score, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at)
-      ON CONFLICT (match_id) DO NOTHING;
-
-      -- Max Home Odds
-      IF NEW.home_win IS NOT NULL THEN
-        INSERT INTO max_odds_home (match_id, odds_id, event_status, match_time, home_score, away_score, home_win, draw, away_win, fetched_at)
-        VALUES (NEW.match_id, NEW.odds_id, NEW.event_status, NEW.match_time, NEW.home_score, NEW.away_score, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at)
+      -- Statement-level: new_rows holds every odds_compact row of the INSERT,
+      -- decoded below into the shape of the odds view
+      WITH decoded AS (
+        SELECT n.odds_id, n.match_id, s.event_status,
+               CASE WHEN n.elapsed_seconds IS NOT NULL
+                    THEN lpad((n.elapsed_seconds / 60)::text, 2, '0') || ':' || lpad((n.elapsed_seconds % 60)::text, 2, '0')
+               END AS match_time,
+               n.elapsed_seconds::integer AS elapsed_seconds,
+               n.home_score::integer AS home_score, n.away_score::integer AS away_score,
+               n.home_win_milli::double precision / 1000 AS home_win,
+               n.draw_milli::double precision / 1000 AS draw,
+               n.away_win_milli::double precision / 1000 AS away_win,
+               n.fetched_at
+        FROM new_rows n
+        LEFT JOIN odds_status s ON s.status_code = n.status_code
+      ),
+      latest AS (
+        SELECT DISTINCT ON (match_id) * FROM decoded ORDER BY match_id, fetched_at DESC, odds_id DESC
+      ),
+      initial AS (
+        SELECT DISTINCT ON (match_id) * FROM decoded ORDER BY match_id, fetched_at, odds_id
+      ),
+      max_home AS (
+        SELECT DISTINCT ON (match_id) match_id, odds_id, home_win, fetched_at
+        FROM decoded WHERE home_win IS NOT NULL ORDER BY match_id, home_win DESC, fetched_at, odds_id
+      ),
+      max_draw AS (
+        SELECT DISTINCT ON (match_id) match_id, odds_id, draw, fetched_at
+        FROM decoded WHERE draw IS NOT NULL ORDER BY match_id, draw DESC, fetched_at, odds_id
+      ),
+      max_away AS (
+        SELECT DISTINCT ON (match_id) match_id, odds_id, away_win, fetched_at
+        FROM decoded WHERE away_win IS NOT NULL ORDER BY match_id, away_win DESC, fetched_at, odds_id
+      ),
+      batch AS (
+        SELECT
+          l.match_id, l.odds_id, l.event_status, l.match_time, l.elapsed_seconds, l.home_score, l.away_score, l.home_win, l.draw, l.away_win, l.fetched_at,
+          i.odds_id AS initial_odds_id, i.home_win AS initial_home_win, i.draw AS initial_draw, i.away_win AS initial_away_win, i.fetched_at AS initial_fetched_at,
+          mh.odds_id AS max_home_odds_id, mh.home_win AS max_home_win, mh.fetched_at AS max_home_fetched_at,
+          md.odds_id AS max_draw_odds_id, md.draw AS max_draw, md.fetched_at AS max_draw_fetched_at,
+          ma.odds_id AS max_away_odds_id, ma.away_win AS max_away_win, ma.fetched_at AS max_away_fetched_at
+        FROM latest l
+        JOIN initial i USING (match_id)
+        LEFT JOIN max_home mh USING (match_id)
+        LEFT JOIN max_draw md USING (match_id)
+        LEFT JOIN max_away ma USING (match_id)
+      ),
+      -- Latest, initial and max-per-outcome odds live in one row per match
+      upserted AS (
+        INSERT INTO match_odds_summary (
+          match_id, odds_id, event_status, match_time, elapsed_seconds, home_score, away_score, home_win, draw, away_win, fetched_at,
+          initial_odds_id, initial_home_win, initial_draw, initial_away_win, initial_fetched_at,
+          max_home_odds_id, max_home_win, max_home_fetched_at,
+          max_draw_odds_id, max_draw, max_draw_fetched_at,
+          max_away_odds_id, max_away_win, max_away_fetched_at)
+        SELECT
+          match_id, odds_id, event_status, match_time, elapsed_seconds, home_score, away_score, home_win, draw, away_win, fetched_at,
+          initial_odds_id, initial_home_win, initial_draw, initial_away_win, initial_fetched_at,
+          max_home_odds_id, max_home_win, max_home_fetched_at,
+          max_draw_odds_id, max_draw, max_draw_fetched_at,
+          max_away_odds_id, max_away_win, max_away_fetched_at
+        FROM batch
         ON CONFLICT (match_id) DO UPDATE SET
-            odds_id = EXCLUDED.odds_id,
-            event_status = EXCLUDED.event_status,
-            match_time = EXCLUDED.match_time,
-            home_score = EXCLUDED.home_score,
-            away_score = EXCLUDED.away_score,
-            home_win = EXCLUDED.home_win,
-            draw = EXCLUDED.draw,
-            away_win = EXCLUDED.away_win,
-            fetched_at = EXCLUDED.fetched_at
-        WHERE EXCLUDED.home_win > max_odds_home.home_win;
-      END IF;
+          -- Latest Odd
+          odds_id = EXCLUDED.odds_id,
+          event_status = EXCLUDED.event_status,
+          match_time = EXCLUDED.match_time,
+          elapsed_seconds = EXCLUDED.elapsed_seconds,
+          home_score = EXCLUDED.home_score,
+          away_score = EXCLUDED.away_score,
+          home_win = EXCLUDED.home_win,
+          draw = EXCLUDED.draw,
+          away_win = EXCLUDED.away_win,
+          fetched_at = EXCLUDED.fetched_at,
+          -- Initial Odd is never overwritten
 
-      -- Max Draw Odds
-      IF NEW.draw IS NOT NULL THEN
-        INSERT INTO max_odds_draw (match_id, odds_id, event_status, match_time, home_score, away_score, home_win, draw, away_win, fetched_at)
-        VALUES (NEW.match_id, NEW.odds_id, NEW.event_status, NEW.match_time, NEW.home_score, NEW.away_score, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at)
-        ON CONFLICT (match_id) DO UPDATE SET
-            odds_id = EXCLUDED.odds_id,
-            event_status = EXCLUDED.event_status,
-            match_time = EXCLUDED.match_time,
-            home_score = EXCLUDED.home_score,
-            away_score = EXCLUDED.away_score,
-            home_win = EXCLUDED.home_win,
-            draw = EXCLUDED.draw,
-            away_win = EXCLUDED.away_win,
-            fetched_at = EXCLUDED.fetched_at
-        WHERE EXCLUDED.draw > max_odds_draw.draw;
-      END IF;
+          -- Max Home Odds
+          max_home_odds_id = CASE WHEN EXCLUDED.max_home_win > COALESCE(match_odds_summary.max_home_win, '-infinity')
+                                  THEN EXCLUDED.max_home_odds_id ELSE match_odds_summary.max_home_odds_id END,
+          max_home_fetched_at = CASE WHEN EXCLUDED.max_home_win > COALESCE(match_odds_summary.max_home_win, '-infinity')
+                                     THEN EXCLUDED.max_home_fetched_at ELSE match_odds_summary.max_home_fetched_at END,
+          max_home_win = GREATEST(match_odds_summary.max_home_win, EXCLUDED.max_home_win),
 
-      -- Max Away Odds
-      IF NEW.away_win IS NOT NULL THEN
-        INSERT INTO max_odds_away (match_id, odds_id, event_status, match_time, home_score, away_score, home_win, draw, away_win, fetched_at)
-        VALUES (NEW.match_id, NEW.odds_id, NEW.event_status, NEW.match_time, NEW.home_score, NEW.away_score, NEW.home_win, NEW.draw, NEW.away_win, NEW.fetched_at)
-        ON CONFLICT (match_id) DO UPDATE SET
-            odds_id = EXCLUDED.odds_id,
-            event_status = EXCLUDED.event_status,
-            match_time = EXCLUDED.match_time,
-            home_score = EXCLUDED.home_score,
-            away_score = EXCLUDED.away_score,
-            home_win = EXCLUDED.home_win,
-            draw = EXCLUDED.draw,
-            away_win = EXCLUDED.away_win,
-            fetched_at = EXCLUDED.fetched_at
-        WHERE EXCLUDED.away_win > max_odds_away.away_win;
-      END IF;
+          -- Max Draw Odds
+          max_draw_odds_id = CASE WHEN EXCLUDED.max_draw > COALESCE(match_odds_summary.max_draw, '-infinity')
+                                  THEN EXCLUDED.max_draw_odds_id ELSE match_odds_summary.max_draw_odds_id END,
+          max_draw_fetched_at = CASE WHEN EXCLUDED.max_draw > COALESCE(match_odds_summary.max_draw, '-infinity')
+                                     THEN EXCLUDED.max_draw_fetched_at ELSE match_odds_summary.max_draw_fetched_at END,
+          max_draw = GREATEST(match_odds_summary.max_draw, EXCLUDED.max_draw),
 
-      RETURN NEW;
+          -- Max Away Odds
+          max_away_odds_id = CASE WHEN EXCLUDED.max_away_win > COALESCE(match_odds_summary.max_away_win, '-infinity')
+                                  THEN EXCLUDED.max_away_odds_id ELSE match_odds_summary.max_away_odds_id END,
+          max_away_fetched_at = CASE WHEN EXCLUDED.max_away_win > COALESCE(match_odds_summary.max_away_win, '-infinity')
+                                     THEN EXCLUDED.max_away_fetched_at ELSE match_odds_summary.max_away_fetched_at END,
+          max_away_win = GREATEST(match_odds_summary.max_away_win, EXCLUDED.max_away_win)
+      )
+      -- One notification item per changed match: the fields that differ from the
+      -- previous latest odd (compared before the upsert, same snapshot) and the new
+      -- values. NOTIFY payloads are capped at 8000 bytes, so items go out in chunks.
+      SELECT count(*) INTO notified
+      FROM (
+        SELECT pg_notify('live_changes', json_build_object('type', 'odds', 'changes', json_agg(item ORDER BY match_id))::text)
+        FROM (
+          SELECT match_id, item, sum(length(item::text)) OVER (ORDER BY match_id) / 7000 AS chunk
+          FROM (
+            SELECT b.match_id, json_build_object(
+              'm', b.match_id, 'id', b.odds_id,
+              'c', array_remove(ARRAY[
+                     CASE WHEN p.match_id IS NULL THEN 'new' END,
+                     CASE WHEN b.event_status IS DISTINCT FROM p.event_status THEN 's' END,
+                     CASE WHEN b.elapsed_seconds IS DISTINCT FROM p.elapsed_seconds THEN 't' END,
+                     CASE WHEN b.home_score IS DISTINCT FROM p.home_score THEN 'hs' END,
+                     CASE WHEN b.away_score IS DISTINCT FROM p.away_score THEN 'as' END,
+                     CASE WHEN b.home_win IS DISTINCT FROM p.home_win THEN 'h' END,
+                     CASE WHEN b.draw IS DISTINCT FROM p.draw THEN 'd' END,
+                     CASE WHEN b.away_win IS DISTINCT FROM p.away_win THEN 'a' END], NULL),
+              's', b.event_status, 't', b.elapsed_seconds, 'hs', b.home_score, 'as', b.away_score,
+              'h', b.home_win, 'd', b.draw, 'a', b.away_win) AS item
+            FROM batch b
+            LEFT JOIN match_odds_summary p ON p.match_id = b.match_id
+            WHERE p.match_id IS NULL
+               OR (b.event_status, b.elapsed_seconds, b.home_score, b.away_score, b.home_win, b.draw, b.away_win)
+                  IS DISTINCT FROM (p.event_status, p.elapsed_seconds, p.home_score, p.away_score, p.home_win, p.draw, p.away_win)
+          ) changed
+        ) items
+        GROUP BY chunk
+      ) sent;
+
+      RETURN NULL;
     END;
     $$ LANGUAGE plpgsql;
     """
@@ -87,17 +177,127 @@ async def create_trigger_functions(conn: AsyncConnection):
     # logger.info("Creating/Replacing 'update_odd_summary' trigger function...")
     await conn.execute(text(trigger_function_sql))
 
-    await conn.execute(text('DROP TRIGGER IF EXISTS odd_summary_trigger ON odds;'))
+    await conn.execute(text('DROP TRIGGER IF EXISTS odd_summary_trigger ON odds_compact;'))
 
+    # Once per INSERT statement; the ingesters write a whole fetch in one statement
     const_create_trigger_sql = """
     CREATE TRIGGER odd_summary_trigger
-    AFTER INSERT OR UPDATE ON odds
-    FOR EACH ROW
+    AFTER INSERT ON odds_compact
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
     EXECUTE FUNCTION update_odd_summary();
     """
     await conn.execute(text(const_create_trigger_sql))
+
+    # --- Inserts into the odds view are encoded into odds_compact ---
+    insert_odds_function_sql = """
+    CREATE OR REPLACE FUNCTION insert_odds() RETURNS trigger AS $$
+    DECLARE
+      code SMALLINT;
+    BEGIN
+      IF NEW.event_status IS NOT NULL THEN
+        SELECT status_code INTO code FROM odds_status WHERE event_status = NEW.event_status;
+        IF code IS NULL THEN
+          INSERT INTO odds_status (event_status) VALUES (NEW.event_status)
+          ON CONFLICT (event_status) DO NOTHING;
+          SELECT status_code INTO code FROM odds_status WHERE event_status = NEW.event_status;
+        END IF;
+      END IF;
+
+      -- Prices are stored in thousandths, the clock as seconds
+      INSERT INTO odds_compact (
+        fetched_at, odds_id, match_id, home_win_milli, draw_milli, away_win_milli,
+        status_code, elapsed_seconds, home_score, away_score)
+      VALUES (
+        NEW.fetched_at, NEW.odds_id, NEW.match_id,
+        round(NEW.home_win * 1000), round(NEW.draw * 1000), round(NEW.away_win * 1000),
+        code,
+        COALESCE(NEW.elapsed_seconds,
+                 CASE WHEN NEW.match_time ~ '^[0-9]+:[0-9]+$'
+                      THEN split_part(NEW.match_time, ':', 1)::integer * 60 + split_part(NEW.match_time, ':', 2)::integer
+                 END),
+        NEW.home_score, NEW.away_score);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+    await conn.execute(text(insert_odds_function_sql))
+
+    await conn.execute(text('DROP TRIGGER IF EXISTS odds_insert_trigger ON odds;'))
+
+    const_create_insert_trigger_sql = """
+    CREATE TRIGGER odds_insert_trigger
+    INSTEAD OF INSERT ON odds
+    FOR EACH ROW
+    EXECUTE FUNCTION insert_odds();
+    """
+    await conn.execute(text(const_create_insert_trigger_sql))
     # logger.info("Trigger for odds summary created.")
 
+    # --- odds_id order: ids become visible in the order they are allocated ---
+    # Inserts serialize on an advisory lock held until commit, taken before any
+    # row (and so any odds_id default) is formed. Every odds_id drawn by an open
+    # transaction is then larger than all committed ones, so readers paging by
+    # odds_id (GET /odds/changes) never skip a row that commits later.
+    lock_odds_ids_function_sql = """
+    CREATE OR REPLACE FUNCTION lock_odds_ids() RETURNS trigger AS $$
+    BEGIN
+      PERFORM pg_advisory_xact_lock(hashtext('odds_id_order'));
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+    await conn.execute(text(lock_odds_ids_function_sql))
+
+    for relation in ("odds_compact", "odds"):
+        await conn.execute(text(f'DROP TRIGGER IF EXISTS odds_id_order_trigger ON {relation};'))
+        await conn.execute(text(f"""
+        CREATE TRIGGER odds_id_order_trigger
+        BEFORE INSERT ON {relation}
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION lock_odds_ids();
+        """))
+
+    await create_settlement_triggers(conn)
+    await create_bet_rollup_triggers(conn)
+    await create_match_notify_triggers(conn)
+
+
+async def create_settlement_triggers(conn: AsyncConnection, mode: str = None):
+    """Leg counters, settlement on match end ("trigger" mode only) and win credits."""
+    mode = mode or SETTLEMENT["mode"]
+    if mode not in SETTLEMENT_MODES:
+        # Either mode settles bets; anything else would silently settle none
+        raise ValueError(f"Unknown settlement mode {mode!r}, expected one of {', '.join(SETTLEMENT_MODES)}")
+
+    # --- Leg counters of a bet follow the legs inserted for it ---
+    await conn.execute(text("""
+    CREATE OR REPLACE FUNCTION count_bet_legs() RETURNS trigger AS $$
+    BEGIN
+      UPDATE bet
+      SET pending_legs = bet.pending_legs + n.pending_legs,
+          lost_legs = bet.lost_legs + n.lost_legs
+      FROM (
+        SELECT bet_id,
+               count(*) FILTER (WHERE outcome IS NULL OR outcome = 'pending') AS pending_legs,
+               count(*) FILTER (WHERE outcome = 'lost') AS lost_legs
+        FROM new_rows
+        GROUP BY bet_id
+      ) n
+      WHERE bet.bet_id = n.bet_id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """))
+    await conn.execute(text('DROP TRIGGER IF EXISTS bet_event_count_trigger ON bet_event;'))
+    await conn.execute(text("""
+    CREATE TRIGGER bet_event_count_trigger
+    AFTER INSERT ON bet_event
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION count_bet_legs();
+    """))
+
     # --- Trigger for updating bet outcome when match ends ---
     trigger_function_match_sql = """
     CREATE OR REPLACE FUNCTION update_bet_on_match_end() RETURNS trigger AS $$
@@ -107,11 +307,20 @@ async def create_trigger_functions(conn: AsyncConnection):
       winning_bet_type TEXT;
     BEGIN
       IF NEW.event_status = 'ended' AND (OLD.event_status IS DISTINCT FROM NEW.event_status) THEN
+        -- A verified SofaScore result wins over the last score seen in the odds feed
         SELECT home_score, away_score INTO final_home_score, final_away_score
-        FROM latest_odd
-        WHERE match_id = NEW.match_id
+        FROM sofascore_ft
+        WHERE match_id = NEW.match_id AND event_status = 'finished'
+          AND home_score IS NOT NULL AND away_score IS NOT NULL
+        ORDER BY sofascore_id DESC
         LIMIT 1;
 
+        IF NOT FOUND THEN
+          SELECT home_score, away_score INTO final_home_score, final_away_score
+          FROM match_odds_summary
+          WHERE match_id = NEW.match_id;
+        END IF;
+
         IF final_home_score IS NULL OR final_away_score IS NULL THEN
           RAISE NOTICE 'Final score not available for match %', NEW.match_id;
           RETURN NEW;
@@ -125,33 +334,31 @@ async def create_trigger_functions(conn: AsyncConnection):
           winning_bet_type := 'draw';
         END IF;
 
-        UPDATE bet_event
-        SET outcome = CASE
-                        WHEN bet_type = winning_bet_type THEN 'won'
-                        ELSE 'lost'
-                      END
-        WHERE match_id = NEW.match_id AND (outcome IS NULL OR outcome = 'pending');
-
-        UPDATE bet
-        SET outcome = (
-          SELECT CASE
-                   WHEN EXISTS (
-                     SELECT 1 FROM bet_event
-                     WHERE bet_id = bet.bet_id AND outcome = 'lost'
-                   ) THEN 'lost'
-                   WHEN NOT EXISTS (
-                     SELECT 1 FROM bet_event
-                     WHERE bet_id = bet.bet_id AND (outcome IS NULL OR outcome = 'pending')
-                   ) THEN 'won'
-                   ELSE outcome
-                 END
-          FROM bet_event
-          WHERE bet_event.bet_id = bet.bet_id
-          LIMIT 1
+        -- Settle the legs, then move each bet's counters by what settled; a bet
+        -- is lost with its first lost leg and won when no leg is left pending
+        WITH legs AS (
+          UPDATE bet_event
+          SET outcome = CASE
+                          WHEN bet_type = winning_bet_type THEN 'won'
+                          ELSE 'lost'
+                        END
+          WHERE match_id = NEW.match_id AND (outcome IS NULL OR outcome = 'pending')
+          RETURNING bet_id, outcome
+        ),
+        settled AS (
+          SELECT bet_id, count(*) AS legs, count(*) FILTER (WHERE outcome = 'lost') AS lost
+          FROM legs
+          GROUP BY bet_id
         )
-        WHERE bet_id IN (
-          SELECT DISTINCT bet_id FROM bet_event WHERE match_id = NEW.match_id
-        );
+        UPDATE bet
+        SET pending_legs = bet.pending_legs - s.legs,
+            lost_legs = bet.lost_legs + s.lost,
+            outcome = CASE WHEN bet.lost_legs + s.lost > 0 THEN 'lost'
+                           WHEN bet.pending_legs - s.legs <= 0 THEN 'won'
+                           ELSE bet.outcome END,
+            updated_at = now()
+        FROM settled s
+        WHERE bet.bet_id = s.bet_id;
       END IF;
       RETURN NEW;
     END;
@@ -163,24 +370,31 @@ async def create_trigger_functions(conn: AsyncConnection):
 
     await conn.execute(text('DROP TRIGGER IF EXISTS match_end_trigger ON "match";'))
 
-    const_create_match_trigger_sql = """
-    CREATE TRIGGER match_end_trigger
-    AFTER UPDATE ON "match"
-    FOR EACH ROW
-    WHEN (NEW.event_status = 'ended')
-    EXECUTE FUNCTION update_bet_on_match_end();
-    """
-    await conn.execute(text(const_create_match_trigger_sql))
+    # In "batch" mode app/tasks/settle_bets.py settles ended matches instead
+    if mode == "trigger":
+        const_create_match_trigger_sql = """
+        CREATE TRIGGER match_end_trigger
+        AFTER UPDATE ON "match"
+        FOR EACH ROW
+        WHEN (NEW.event_status = 'ended')
+        EXECUTE FUNCTION update_bet_on_match_end();
+        """
+        await conn.execute(text(const_create_match_trigger_sql))
     # logger.info("Trigger for match end events created.")
 
-    # --- New Trigger: update user balance when a bet is won ---
+    # --- New Trigger: credit the user when a bet is won ---
+    # The credit is appended to balance_ledger (folded into user.balance by
+    # app/ledger.py), so settling many bets of one user doesn't queue on its row
     trigger_function_bet_win_sql = """
     CREATE OR REPLACE FUNCTION update_user_balance_on_bet_win() RETURNS trigger AS $$
     BEGIN
       IF NEW.outcome = 'won' AND (OLD.outcome IS DISTINCT FROM 'won') THEN
-        UPDATE "user"
-        SET balance = balance + NEW.expected_win
-        WHERE user_id = NEW.user_id;
+        INSERT INTO balance_ledger (user_id, amount, kind, bet_id)
+        VALUES (NEW.user_id, NEW.expected_win, 'win_credit', NEW.bet_id);
+      -- A re-settled bet that is no longer won gives its credit back
+      ELSIF OLD.outcome = 'won' AND NEW.outcome IS DISTINCT FROM 'won' THEN
+        INSERT INTO balance_ledger (user_id, amount, kind, bet_id)
+        VALUES (OLD.user_id, -OLD.expected_win, 'win_reversal', OLD.bet_id);
       END IF;
       RETURN NEW;
     END;
@@ -196,8 +410,142 @@ async def create_trigger_functions(conn: AsyncConnection):
     CREATE TRIGGER bet_win_trigger
     AFTER UPDATE ON "bet"
     FOR EACH ROW
-    WHEN (NEW.outcome = 'won')
+    WHEN (NEW.outcome = 'won' OR OLD.outcome = 'won')
     EXECUTE FUNCTION update_user_balance_on_bet_win();
     """
     await conn.execute(text(const_create_bet_win_trigger_sql))
     # logger.info("Trigger for bet win user balance update created.")
+
+
+async def create_bet_rollup_triggers(conn: AsyncConnection):
+    """Placements and settlements append their change of the daily totals to bet_rollup_delta."""
+    columns = ", ".join(ROLLUP_COLUMNS)
+    await conn.execute(text(f"""
+    CREATE OR REPLACE FUNCTION record_bet_rollup_deltas() RETURNS trigger AS $$
+    BEGIN
+      -- Statement-level; transition tables can't be shared between events, so
+      -- INSERT and UPDATE have their own trigger
+      IF TG_OP = 'INSERT' THEN
+        INSERT INTO bet_rollup_delta (day, user_id, bot_id, {columns})
+        SELECT created_at::date, user_id, bot_id, {ROLLUP_TOTALS_SQL}
+        FROM new_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2, 3;
+      ELSE
+        -- Each changed bet is taken out of its old totals and added to its new
+        -- ones; rows whose totals can't change (e.g. leg counters) are skipped.
+        -- EXECUTE plans the join for this statement's row counts; a cached plan
+        -- made for a one-bet update would be quadratic on a bulk settlement.
+        EXECUTE $sql$
+        INSERT INTO bet_rollup_delta (day, user_id, bot_id, {columns})
+        SELECT r.created_at::date, r.user_id, r.bot_id, {ROLLUP_SIGNED_TOTALS_SQL}
+        FROM new_rows n
+        JOIN old_rows o ON o.bet_id = n.bet_id
+        CROSS JOIN LATERAL (VALUES (1, n.created_at, n.user_id, n.bot_id, n.amount, n.expected_win, n.outcome),
+                                   (-1, o.created_at, o.user_id, o.bot_id, o.amount, o.expected_win, o.outcome)
+        ) r(sign, created_at, user_id, bot_id, amount, expected_win, outcome)
+        WHERE (o.created_at, o.user_id, o.bot_id, o.amount, o.expected_win, o.outcome)
+              IS DISTINCT FROM (n.created_at, n.user_id, n.bot_id, n.amount, n.expected_win, n.outcome)
+          AND r.created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+        HAVING ({ROLLUP_SIGNED_TOTALS_SQL}) IS DISTINCT FROM ({", ".join("0" for _ in ROLLUP_COLUMNS)})
+        $sql$;
+      END IF;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """))
+
+    await conn.execute(text('DROP TRIGGER IF EXISTS bet_rollup_insert_trigger ON "bet";'))
+    await conn.execute(text('DROP TRIGGER IF EXISTS bet_rollup_update_trigger ON "bet";'))
+    for sql in (
+        """
+        CREATE TRIGGER bet_rollup_insert_trigger
+        AFTER INSERT ON "bet"
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION record_bet_rollup_deltas();
+        """,
+        """
+        CREATE TRIGGER bet_rollup_update_trigger
+        AFTER UPDATE ON "bet"
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION record_bet_rollup_deltas();
+        """,
+    ):
+        await conn.execute(text(sql))
+
+
+async def create_match_notify_triggers(conn: AsyncConnection):
+    # --- Status changes of matches are published on the live_changes channel ---
+    trigger_function_match_notify_sql = """
+    CREATE OR REPLACE FUNCTION notify_match_changes() RETURNS trigger AS $$
+    DECLARE
+      notified INTEGER;
+    BEGIN
+      -- Statement-level; transition tables can't be shared between events, so
+      -- INSERT and UPDATE have their own trigger
+      IF TG_OP = 'INSERT' THEN
+        SELECT count(*) INTO notified
+        FROM (
+          SELECT pg_notify('live_changes', json_build_object('type', 'match', 'changes', json_agg(item ORDER BY match_id))::text)
+          FROM (
+            SELECT match_id, item, sum(length(item::text)) OVER (ORDER BY match_id) / 7000 AS chunk
+            FROM (
+              SELECT n.match_id, json_build_object(
+                'm', n.match_id, 'c', ARRAY['new'], 's', n.event_status, 'l', n.live, 't', n.elapsed_seconds) AS item
+              FROM new_rows n
+            ) changed
+          ) items
+          GROUP BY chunk
+        ) sent;
+      ELSE
+        SELECT count(*) INTO notified
+        FROM (
+          SELECT pg_notify('live_changes', json_build_object('type', 'match', 'changes', json_agg(item ORDER BY match_id))::text)
+          FROM (
+            SELECT match_id, item, sum(length(item::text)) OVER (ORDER BY match_id) / 7000 AS chunk
+            FROM (
+              SELECT n.match_id, json_build_object(
+                'm', n.match_id,
+                'c', array_remove(ARRAY[
+                       CASE WHEN n.event_status IS DISTINCT FROM o.event_status THEN 's' END,
+                       CASE WHEN n.live IS DISTINCT FROM o.live THEN 'l' END], NULL),
+                's', n.event_status, 'l', n.live, 't', n.elapsed_seconds) AS item
+              FROM new_rows n
+              JOIN old_rows o ON o.match_id = n.match_id
+              -- The clock is published with the odds; only status changes here
+              WHERE (n.event_status, n.live) IS DISTINCT FROM (o.event_status, o.live)
+            ) changed
+          ) items
+          GROUP BY chunk
+        ) sent;
+      END IF;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+    await conn.execute(text(trigger_function_match_notify_sql))
+
+    await conn.execute(text('DROP TRIGGER IF EXISTS match_insert_notify_trigger ON "match";'))
+    await conn.execute(text('DROP TRIGGER IF EXISTS match_update_notify_trigger ON "match";'))
+
+    const_create_match_notify_triggers_sql = [
+        """
+        CREATE TRIGGER match_insert_notify_trigger
+        AFTER INSERT ON "match"
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION notify_match_changes();
+        """,
+        """
+        CREATE TRIGGER match_update_notify_trigger
+        AFTER UPDATE ON "match"
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION notify_match_changes();
+        """,
+    ]
+    for sql in const_create_match_notify_triggers_sql:
+        await conn.execute(text(sql))
@@ -19,6 +19,17 @@ def get_match_time(event_status: str, fetched_match_time: str) -> str:
     else:
         return fetched_match_time
 
+def match_time_to_seconds(match_time: str | None) -> int | None:
+    """
+    Convert a match_time formatted as "mm:ss" into elapsed seconds.
+    Returns None when match_time isn't in that format.
+    """
+    try:
+        minutes, seconds = map(int, match_time.split(":"))
+        return minutes * 60 + seconds
+    except Exception:
+        return None
+
 def parse_score(score_str: str):
     if score_str == "-:-":
         return 0, 0
@@ -88,6 +99,7 @@ async def prepare_odds_data(matches: list, fetch_event_status: str) -> list:
             "match_id": str(match_id),
             "event_status": event_status,
             "match_time": match_time,
+            "elapsed_seconds": match_time_to_seconds(match_time),
             "home_score": home_score,
             "away_score": away_score,
             "home_win": home_win,
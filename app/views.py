@@ -0,0 +1,128 @@
+# app/views.py
+"""
+Views the models map onto (marked with info["is_view"] in app/models.py).
+
+Base.metadata.create_all must not create them as tables, so startup passes it
+stored_tables() instead. On a migrated database the views come from alembic;
+on a fresh one create_views builds them over the tables create_all has just
+made. A database where one of them is still a plain table predates those
+migrations and is refused until `alembic upgrade head` has run.
+"""
+from sqlalchemy import Table, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models import Base
+
+# Old-shape odds rows over odds_compact, plus the retired odds_wide table when a
+# migrated database still has it (same definition as migration 63467f833edb)
+ODDS_VIEW_SQL = """
+CREATE VIEW odds AS
+SELECT c.odds_id,
+       c.match_id,
+       (SELECT s.event_status FROM odds_status s WHERE s.status_code = c.status_code) AS event_status,
+       CASE WHEN c.elapsed_seconds IS NOT NULL
+            THEN lpad((c.elapsed_seconds / 60)::text, 2, '0') || ':' || lpad((c.elapsed_seconds % 60)::text, 2, '0')
+       END AS match_time,
+       c.home_score::integer AS home_score,
+       c.away_score::integer AS away_score,
+       c.home_win_milli::double precision / 1000 AS home_win,
+       c.draw_milli::double precision / 1000 AS draw,
+       c.away_win_milli::double precision / 1000 AS away_win,
+       c.fetched_at,
+       c.elapsed_seconds::integer AS elapsed_seconds
+FROM odds_compact c
+"""
+
+ODDS_WIDE_BRANCH_SQL = """
+UNION ALL
+SELECT odds_id, match_id, event_status, match_time, home_score, away_score,
+       home_win, draw, away_win, fetched_at, elapsed_seconds
+FROM odds_wide
+"""
+
+# Read-only views over match_odds_summary, in dependency order after odds
+SUMMARY_VIEWS_SQL = {
+    "latest_odd": """
+    CREATE VIEW latest_odd AS
+    SELECT match_id, odds_id, event_status, match_time, home_score, away_score,
+           home_win, draw, away_win, fetched_at, elapsed_seconds
+    FROM match_odds_summary
+    """,
+    "initial_odd": """
+    CREATE VIEW initial_odd AS
+    SELECT s.match_id, s.initial_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.initial_home_win AS home_win,
+           s.initial_draw AS draw, s.initial_away_win AS away_win,
+           s.initial_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.initial_odds_id AND o.fetched_at = s.initial_fetched_at
+    """,
+    "max_odds_home": """
+    CREATE VIEW max_odds_home AS
+    SELECT s.match_id, s.max_home_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, s.max_home_win AS home_win, o.draw, o.away_win,
+           s.max_home_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_home_odds_id AND o.fetched_at = s.max_home_fetched_at
+    WHERE s.max_home_odds_id IS NOT NULL
+    """,
+    "max_odds_draw": """
+    CREATE VIEW max_odds_draw AS
+    SELECT s.match_id, s.max_draw_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, s.max_draw AS draw, o.away_win,
+           s.max_draw_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_draw_odds_id AND o.fetched_at = s.max_draw_fetched_at
+    WHERE s.max_draw_odds_id IS NOT NULL
+    """,
+    "max_odds_away": """
+    CREATE VIEW max_odds_away AS
+    SELECT s.match_id, s.max_away_odds_id AS odds_id, o.event_status, o.match_time,
+           o.home_score, o.away_score, o.home_win, o.draw, s.max_away_win AS away_win,
+           s.max_away_fetched_at AS fetched_at
+    FROM match_odds_summary s
+    LEFT JOIN odds o ON o.odds_id = s.max_away_odds_id AND o.fetched_at = s.max_away_fetched_at
+    WHERE s.max_away_odds_id IS NOT NULL
+    """,
+}
+
+RELKIND_SQL = """
+SELECT c.relname, c.relkind::text
+FROM pg_class c
+WHERE c.relnamespace = 'public'::regnamespace AND c.relname = ANY(:names)
+"""
+
+
+def stored_tables() -> list[Table]:
+    """The tables create_all may create: every model except those mapped onto views."""
+    return [table for table in Base.metadata.sorted_tables if not table.info.get("is_view")]
+
+
+async def _relkinds(conn: AsyncConnection, names: list[str]) -> dict[str, str]:
+    result = await conn.execute(text(RELKIND_SQL), {"names": names})
+    return {name: relkind for name, relkind in result.all()}
+
+
+async def check_views(conn: AsyncConnection):
+    """Refuse a database where a relation the models treat as a view is still a table."""
+    names = [table.name for table in Base.metadata.sorted_tables if table.info.get("is_view")]
+    tables = sorted(name for name, relkind in (await _relkinds(conn, names)).items() if relkind != "v")
+    if tables:
+        raise RuntimeError(
+            f"{', '.join(tables)} should be views but are tables: this database predates the "
+            f"odds storage migrations, run `alembic upgrade head` before starting the app"
+        )
+
+
+async def create_views(conn: AsyncConnection):
+    """Create the views missing from the database, e.g. right after create_all on a fresh one."""
+    existing = await _relkinds(conn, ["odds", "odds_wide", *SUMMARY_VIEWS_SQL])
+    if "odds" not in existing:
+        await conn.execute(text(ODDS_VIEW_SQL + (ODDS_WIDE_BRANCH_SQL if "odds_wide" in existing else "")))
+        # Rows inserted through the view draw their ids from odds_compact's sequence
+        sequence = await conn.scalar(text("SELECT pg_get_serial_sequence('odds_compact', 'odds_id')"))
+        await conn.execute(text(f"ALTER VIEW odds ALTER COLUMN odds_id SET DEFAULT nextval('{sequence}'::regclass)"))
+        await conn.execute(text("ALTER VIEW odds ALTER COLUMN fetched_at SET DEFAULT now()"))
+    for name, view_sql in SUMMARY_VIEWS_SQL.items():
+        if name not in existing:
+            await conn.execute(text(view_sql))
@@ -0,0 +1,110 @@
+"""
+Bot conditions as masks over the live columns, checked and timed.
+
+First a differential check: random bot conditions (from check_bot_conditions,
+malformed ones included) are evaluated over random batches of matches with
+compile_bot_mask and, row by row, with the compiled predicate. The mask must
+equal the predicate's results on every row. Batches share one LiveColumns, so
+the per-cycle cache of condition masks is exercised too.
+
+Then one bot cycle at scale (10k bots x 1k live matches by default): the
+scalar predicates called per (bot, match), against building the columns once
+and evaluating one mask per bot. Both must select the same (bot, match) pairs.
+No database is needed.
+
+    python -m benchmarks.bot_condition_masks [--batches 5000] [--bots 10000] [--matches 1000] [--seed 1]
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.tasks.compile_user_bots_conditions import InvalidBotConditions, compile_bot_conditions
+from app.tasks.mask_user_bots_conditions import LiveColumns, compile_bot_mask, never
+from benchmarks.check_bot_conditions import compile_or_never, random_conditions, random_match, random_odd
+
+
+def random_rows(rng, count: int) -> list:
+    return [(random_match(rng), random_odd(rng, False), random_odd(rng, True)) for _ in range(count)]
+
+
+def mask_or_never(conditions):
+    try:
+        return compile_bot_mask(conditions)
+    except InvalidBotConditions:
+        return never
+
+
+def differential(batches: int, rng) -> int:
+    mismatches = evaluated = 0
+    for _ in range(batches):
+        rows = random_rows(rng, rng.randint(1, 40))
+        columns = LiveColumns(rows)
+        for _ in range(rng.randint(1, 20)):
+            conditions = random_conditions(rng)
+            predicate = compile_or_never(conditions)
+            expected = np.array([predicate(*row) for row in rows], dtype=bool)
+            got = mask_or_never(conditions)(columns)
+            evaluated += len(rows)
+            if not np.array_equal(got, expected):
+                mismatches += 1
+                if mismatches <= 10:
+                    row = int(np.flatnonzero(got != expected)[0])
+                    match, initial_odd, latest_odd = rows[row]
+                    print(f"MISMATCH predicate={expected[row]} mask={got[row]}\n  conditions={conditions}\n"
+                          f"  match={vars(match)}\n  initial={initial_odd and vars(initial_odd)}\n"
+                          f"  latest={latest_odd and vars(latest_odd)}")
+    print(f"{batches} batches, {evaluated} (conditions, match) pairs: {mismatches} mismatching masks")
+    return mismatches
+
+
+def cycle(rng, bots: int, matches: int) -> int:
+    # Valid conditions only, as live bots have; repeated ones share cached masks
+    all_conditions = []
+    while len(all_conditions) < bots:
+        conditions = random_conditions(rng)
+        try:
+            compile_bot_conditions(conditions)
+        except InvalidBotConditions:
+            continue
+        all_conditions.append(conditions)
+    rows = random_rows(rng, matches)
+    predicates = [compile_bot_conditions(conditions) for conditions in all_conditions]
+    masks = [compile_bot_mask(conditions) for conditions in all_conditions]
+
+    started = time.perf_counter()
+    scalar = [[i for i, row in enumerate(rows) if predicate(*row)] for predicate in predicates]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = LiveColumns(rows)
+    columns_seconds = time.perf_counter() - started
+    vector = [np.flatnonzero(mask(columns)).tolist() for mask in masks]
+    vector_seconds = time.perf_counter() - started
+
+    differing = sum(a != b for a, b in zip(scalar, vector))
+    selected = sum(len(s) for s in scalar)
+    print(f"{bots} bots x {matches} matches, {selected} pairs selected: "
+          f"predicates {scalar_seconds:.2f}s, masks {vector_seconds:.2f}s "
+          f"(columns {columns_seconds * 1000:.0f}ms) ({scalar_seconds / vector_seconds:.1f}x); "
+          f"{differing} bots selecting differently")
+    return differing
+
+
+def main(batches: int, seed: int, bots: int, matches: int) -> int:
+    rng = random.Random(seed)
+    mismatches = differential(batches, rng)
+    differing = cycle(rng, bots, matches)
+    return 1 if mismatches or differing else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=5000, help="random match batches in the differential check")
+    parser.add_argument("--bots", type=int, default=10000, help="bots in the timed cycle")
+    parser.add_argument("--matches", type=int, default=1000, help="live matches in the timed cycle")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(main(args.batches, args.seed, args.bots, args.matches))
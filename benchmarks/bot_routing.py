@@ -0,0 +1,112 @@
+"""
+Bot routing by team, competition and country, checked and timed.
+
+Generates bots that mostly pin one of many teams, competitions or countries
+(the rest pin nothing), plus random odds and score conditions from
+check_bot_conditions, and live matches drawn from the same teams and
+competitions. One bot cycle's selection is computed twice: every bot's mask
+over the live columns, and each candidate BotRoutes gives checked against the
+matches routed to it. Both must select the same (bot, match) pairs; the routed
+one should cost in proportion to the bots relevant to each match. No database
+is needed.
+
+    python -m benchmarks.bot_routing [--bots 10000] [--matches 1000] [--teams 5000] [--seed 1]
+"""
+import argparse
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.tasks.compile_user_bots_conditions import InvalidBotConditions, compile_bot_conditions, get_bot_predicate
+from app.tasks.mask_user_bots_conditions import LiveColumns, get_bot_mask
+from app.tasks.route_user_bots import BotRoutes, matching_rows
+from benchmarks.check_bot_conditions import random_conditions, random_match, random_odd
+
+
+def universe(rng, teams: int):
+    countries = [f"Country {i}" for i in range(max(teams // 50, 1))]
+    competitions = {f"League {i}": rng.choice(countries) for i in range(max(teams // 20, 1))}
+    team_leagues = {f"Team {i}": rng.choice(list(competitions)) for i in range(teams)}
+    return countries, competitions, team_leagues
+
+
+def random_bot(rng, bot_id: int, countries, competitions, team_leagues):
+    while True:
+        conditions = random_conditions(rng)
+        if isinstance(conditions, dict):
+            conditions = {k: v for k, v in conditions.items() if k not in ("team", "competition", "country")}
+            if conditions:
+                break
+    roll = rng.random()
+    if roll < 0.5:
+        conditions = {"team": {"equals": rng.choice(list(team_leagues))}, **conditions}
+    elif roll < 0.75:
+        conditions = {"competition": {"equals": rng.choice(list(competitions))}, **conditions}
+    elif roll < 0.9:
+        conditions = {"country": {"equals": rng.choice(countries)}, **conditions}
+    return SimpleNamespace(bot_id=bot_id, name=f"Bot {bot_id}", updated_at=None, conditions=conditions)
+
+
+def live_match(rng, competitions, team_leagues, by_league):
+    league = rng.choice([league for league, teams in by_league.items() if len(teams) >= 2])
+    match = random_match(rng)
+    match.home_team, match.away_team = rng.sample(by_league[league], 2)
+    match.competition_name, match.country = league, competitions[league]
+    return match, random_odd(rng, False), random_odd(rng, True)
+
+
+def main(seed: int, bots: int, matches: int, teams: int) -> int:
+    rng = random.Random(seed)
+    countries, competitions, team_leagues = universe(rng, teams)
+    by_league = {}
+    for team, league in team_leagues.items():
+        by_league.setdefault(league, []).append(team)
+
+    all_bots = []
+    while len(all_bots) < bots:
+        bot = random_bot(rng, len(all_bots) + 1, countries, competitions, team_leagues)
+        try:
+            compile_bot_conditions(bot.conditions)
+        except InvalidBotConditions:
+            continue
+        all_bots.append(bot)
+    # Compiled once, as the cycles after a bot's first have them cached
+    for bot in all_bots:
+        get_bot_mask(bot), get_bot_predicate(bot)
+    live = [live_match(rng, competitions, team_leagues, by_league) for _ in range(matches)]
+
+    started = time.perf_counter()
+    columns = LiveColumns(live)
+    unrouted = {bot.bot_id: np.flatnonzero(get_bot_mask(bot)(columns) & columns.has_latest).tolist() for bot in all_bots}
+    unrouted_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    routes = BotRoutes(all_bots)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = LiveColumns(live)
+    routed = {bot.bot_id: matching_rows(bot, rows, columns) for bot, rows in routes.candidates(all_bots, columns)}
+    routed_seconds = time.perf_counter() - started
+
+    differing = sum(unrouted[bot_id] != routed.get(bot_id, []) for bot_id in unrouted)
+    selected = sum(len(s) for s in unrouted.values())
+    print(f"{bots} bots ({len(routes.residual)} unrouted) x {matches} matches over {teams} teams, "
+          f"{selected} pairs selected")
+    print(f"all bots {unrouted_seconds:.3f}s; routed {routed_seconds:.3f}s for {len(routed)} candidate bots "
+          f"({unrouted_seconds / routed_seconds:.1f}x), index built in {build_seconds * 1000:.0f}ms; "
+          f"{differing} bots selecting differently")
+    return 1 if differing else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", type=int, default=10000)
+    parser.add_argument("--matches", type=int, default=1000, help="live matches in the cycle")
+    parser.add_argument("--teams", type=int, default=5000, help="teams bots and matches are drawn from")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(main(args.seed, args.bots, args.matches, args.teams))
@@ -0,0 +1,240 @@
+"""
+Consistency check of the CDC caches in app/cdc.py against a live Postgres.
+
+Clones match, match_odds_summary, bot and bet into a scratch schema, publishes
+them on a scratch publication and streams them through LiveState on a
+temporary slot while a random workload (inserts, updates that settle bets or
+change keys, deletes, a truncate and one large transaction) runs against the
+clones. After each phase the caches are compared row by row with the tables.
+The consumer is then stopped, more changes are written, and a fresh consumer is
+started from the saved checkpoint and compared again.
+
+Prints the commit-to-cache lag of single-row updates. The database user needs
+the REPLICATION attribute and wal_level must be logical. Everything created is
+dropped at the end.
+
+    python -m benchmarks.cdc_cache_check [--rounds 200] [--seed 1]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import psycopg2
+
+from app.cdc import LiveState, LIVE_TABLES, connection_kwargs
+
+SCHEMA = "bench_cdc"
+PUBLICATION = "bench_cdc_pub"
+SLOT = "bench_cdc_slot"
+
+
+def setup(cur):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"DROP PUBLICATION IF EXISTS {PUBLICATION}")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    for table in LIVE_TABLES:
+        cur.execute(f'CREATE TABLE {SCHEMA}."{table}" (LIKE public."{table}" INCLUDING DEFAULTS INCLUDING INDEXES)')
+    tables = ", ".join(f'{SCHEMA}."{t}"' for t in LIVE_TABLES)
+    cur.execute(f"CREATE PUBLICATION {PUBLICATION} FOR TABLE {tables}")
+
+
+def teardown(cur):
+    cur.execute("SELECT pg_drop_replication_slot(slot_name) FROM pg_replication_slots WHERE slot_name = %s", (SLOT,))
+    cur.execute(f"DROP PUBLICATION IF EXISTS {PUBLICATION}")
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+def random_workload(cur, rng: random.Random, rounds: int, next_ids: dict):
+    """One transaction per round, a few statements each."""
+    statuses = ["pregame", "1st half", "Halftime", "2nd half", "ended"]
+    for _ in range(rounds):
+        for _ in range(rng.randint(1, 4)):
+            op = rng.random()
+            if op < 0.3:
+                next_ids["match"] += 1
+                m = next_ids["match"]
+                cur.execute(
+                    f'INSERT INTO {SCHEMA}."match" (match_id, competition_name, home_team, away_team, event_status, live, start_time) '
+                    "VALUES (%s, %s, %s, %s, %s, %s, now())",
+                    (str(m), f"League {m % 7}", f"Home {m}", f"Away {m}", rng.choice(statuses), rng.random() < 0.5),
+                )
+                cur.execute(
+                    f"INSERT INTO {SCHEMA}.match_odds_summary (match_id, odds_id, event_status, home_win, draw, away_win, fetched_at) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, now())",
+                    (str(m), m, "1st half", round(rng.uniform(1.1, 5), 2), round(rng.uniform(2, 4), 2), round(rng.uniform(1.1, 9), 2)),
+                )
+            elif op < 0.55:
+                cur.execute(
+                    f'UPDATE {SCHEMA}."match" SET event_status = %s, match_time = %s, elapsed_seconds = %s '
+                    f'WHERE match_id = (SELECT match_id FROM {SCHEMA}."match" ORDER BY random() LIMIT 1)',
+                    (rng.choice(statuses), "45:00", 2700),
+                )
+                cur.execute(
+                    f"UPDATE {SCHEMA}.match_odds_summary SET home_win = %s, fetched_at = now() "
+                    f"WHERE match_id = (SELECT match_id FROM {SCHEMA}.match_odds_summary ORDER BY random() LIMIT 1)",
+                    (round(rng.uniform(1.1, 5), 2),),
+                )
+            elif op < 0.75:
+                next_ids["bet"] += 1
+                cur.execute(
+                    f"INSERT INTO {SCHEMA}.bet (bet_id, user_id, type, amount, expected_win, outcome, created_at, bot, bot_task) "
+                    "VALUES (%s, %s, 'single', %s, %s, 'pending', now(), %s, %s)",
+                    (next_ids["bet"], rng.randint(1, 5), 10, 25, rng.random() < 0.5, f"Bot task {rng.randint(1, 4)}"),
+                )
+            elif op < 0.85:
+                # Settling a bet drops it from the cache
+                cur.execute(
+                    f"UPDATE {SCHEMA}.bet SET outcome = %s "
+                    f"WHERE bet_id = (SELECT bet_id FROM {SCHEMA}.bet ORDER BY random() LIMIT 1)",
+                    (rng.choice(["won", "lost", "pending"]),),
+                )
+            elif op < 0.92:
+                next_ids["bot"] += 1
+                cur.execute(
+                    f"INSERT INTO {SCHEMA}.bot (bot_id, name, user_id, conditions, action, active) "
+                    "VALUES (%s, %s, 1, %s, 'bet_home', true)",
+                    (next_ids["bot"], f"bot {next_ids['bot']}", '{"match_time": {"greater_than": "70:00"}}'),
+                )
+            elif op < 0.96:
+                # Key change
+                next_ids["bot"] += 1
+                cur.execute(
+                    f"UPDATE {SCHEMA}.bot SET bot_id = %s, active = NOT active "
+                    f"WHERE bot_id = (SELECT bot_id FROM {SCHEMA}.bot ORDER BY random() LIMIT 1)",
+                    (next_ids["bot"],),
+                )
+            else:
+                cur.execute(
+                    f'DELETE FROM {SCHEMA}."match" WHERE match_id = (SELECT match_id FROM {SCHEMA}."match" ORDER BY random() LIMIT 1)'
+                )
+        cur.connection.commit()
+
+
+def wait_until_current(cur, state: LiveState, timeout: float = 30.0):
+    cur.execute("SELECT pg_current_wal_lsn()::text")
+    high, low = cur.fetchone()[0].split("/")
+    target = (int(high, 16) << 32) + int(low, 16)
+    cur.connection.commit()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if state.ready.is_set() and state.lsn >= target:
+            return
+        time.sleep(0.05)
+    raise TimeoutError("CDC consumer did not catch up")
+
+
+def compare(cur, state: LiveState, phase: str) -> int:
+    mismatches = 0
+    for table, keep in LIVE_TABLES.items():
+        cur.execute(f'SELECT * FROM {SCHEMA}."{table}"')
+        columns = [d.name for d in cur.description]
+        expected = {}
+        for values in cur.fetchall():
+            row = dict(zip(columns, values))
+            if keep is None or keep(row):
+                expected[state.tables[table].key(row)] = row
+        cached = {state.tables[table].key(row): row for row in state.rows(table)}
+        bad = [k for k in expected.keys() | cached.keys() if expected.get(k) != cached.get(k)]
+        mismatches += len(bad)
+        status = "ok" if not bad else "FAIL"
+        print(f"{status:4}  {phase:22} {table:20} {len(expected):6} rows, {len(bad)} mismatched")
+        for key in bad[:3]:
+            print(f"        - {key}: table {expected.get(key)} cache {cached.get(key)}")
+    cur.connection.commit()
+    return mismatches
+
+
+def measure_lag(cur, state: LiveState, samples: int = 50) -> list[float]:
+    lags = []
+    cur.execute(f"SELECT match_id FROM {SCHEMA}.match_odds_summary LIMIT 1")
+    match_id = cur.fetchone()[0]
+    for i in range(samples):
+        price = 1 + i / 100
+        cur.execute(f"UPDATE {SCHEMA}.match_odds_summary SET home_win = %s WHERE match_id = %s", (price, match_id))
+        cur.connection.commit()
+        committed = time.perf_counter()
+        while (state.latest_odd(match_id) or {}).get("home_win") != price:
+            time.sleep(0.0005)
+        lags.append((time.perf_counter() - committed) * 1000)
+    return lags
+
+
+def start(state: LiveState):
+    stop = threading.Event()
+    thread = threading.Thread(target=state.consume, args=(stop,), daemon=True)
+    thread.start()
+    return stop, thread
+
+
+def main(rounds: int, seed: int) -> int:
+    rng = random.Random(seed)
+    conn = psycopg2.connect(**connection_kwargs())
+    cur = conn.cursor()
+    checkpoint_path = os.path.join(tempfile.mkdtemp(), "cdc_checkpoint.json")
+    failed = 0
+    setup(cur)
+    conn.commit()
+    try:
+        next_ids = {"match": 0, "bet": 0, "bot": 0}
+        # Some rows exist before the consumer starts and come from the snapshot
+        random_workload(cur, rng, rounds // 4, next_ids)
+
+        def new_state():
+            return LiveState(schema=SCHEMA, publication=PUBLICATION, slot=SLOT, checkpoint_path=checkpoint_path)
+
+        state = new_state()
+        stop, thread = start(state)
+        random_workload(cur, rng, rounds, next_ids)
+        wait_until_current(cur, state)
+        failed += compare(cur, state, "streamed")
+
+        # One large transaction, then a truncate followed by fresh rows
+        big_txn_rows = max(rounds * 5, 500)
+        for i in range(big_txn_rows):
+            next_ids["bet"] += 1
+            cur.execute(
+                f"INSERT INTO {SCHEMA}.bet (bet_id, user_id, type, amount, outcome, created_at) "
+                "VALUES (%s, 1, 'single', 5, 'pending', now())",
+                (next_ids["bet"],),
+            )
+        conn.commit()
+        cur.execute(f"TRUNCATE {SCHEMA}.bot")
+        conn.commit()
+        random_workload(cur, rng, rounds // 4, next_ids)
+        wait_until_current(cur, state)
+        failed += compare(cur, state, "large txn + truncate")
+
+        lags = measure_lag(cur, state)
+        print(f"\ncommit-to-cache lag over {len(lags)} updates: median {statistics.median(lags):.1f} ms, "
+              f"max {max(lags):.1f} ms\n")
+
+        # Restart from the checkpoint with changes written in between
+        stop.set()
+        thread.join()
+        random_workload(cur, rng, rounds // 2, next_ids)
+        state = new_state()
+        stop, thread = start(state)
+        wait_until_current(cur, state)
+        failed += compare(cur, state, "resumed from checkpoint")
+        stop.set()
+        thread.join()
+    finally:
+        conn.rollback()
+        teardown(cur)
+        conn.commit()
+        conn.close()
+    print(f"\n{failed} mismatched rows")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="transactions per workload phase")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(main(args.rounds, args.seed))
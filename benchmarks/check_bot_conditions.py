@@ -0,0 +1,197 @@
+"""
+Differential check of the compiled bot conditions against the interpreter.
+
+Generates random bot conditions (every key and operator, plus malformed ones)
+and random matches with initial and live odds (missing odds, ties, missing
+scores and times included), and evaluates each pair with process_bot_conditions
+and with the predicate from compile_bot_conditions. They must agree, except
+that where the interpreter raises the compiled predicate must not match.
+
+Then times both on one fixed set of bots and matches, the way a bot cycle uses
+them: conditions compiled once per bot, evaluated once per (bot, match).
+No database is needed.
+
+    python -m benchmarks.check_bot_conditions [--cases 200000] [--seed 1]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from app.tasks.compile_user_bots_conditions import InvalidBotConditions, compile_bot_conditions
+from app.tasks.process_user_bots_conditions import process_bot_conditions
+
+TEAMS = ["Arsenal", "arsenal", "Chelsea", "Real Madrid", "Inter", None]
+COUNTRIES = ["England", "Spain", "Italy", None]
+COMPETITIONS = ["Premier League", "LaLiga", "Serie A"]
+OPERATORS = ["equals", "not_equals", "greater_than", "less_than", "between"]
+ODDS_KINDS = ["any", "home", "draw", "away", "selected_team", "favourite", "outsider", "unknown"]
+NUMERIC_KEYS = ["match_time", "home_goals", "away_goals", "home_red_cards", "away_red_cards", "score_difference"]
+
+
+def random_odds_value(rng):
+    return rng.choice([None, 1.5, 2.0, 2.0, 3.4, round(rng.uniform(1.01, 15), 2)])
+
+
+def random_operand(rng, operator):
+    if operator == "between":
+        return rng.choice([
+            sorted([round(rng.uniform(0, 10), 1), round(rng.uniform(0, 10), 1)]),
+            [rng.randint(0, 90), rng.randint(0, 90)],
+            [1.5],            # malformed
+            "1-2",            # malformed
+        ])
+    return rng.choice([0, 1, 2, 2.0, 45, 80, round(rng.uniform(1, 10), 2), "2"])
+
+
+def random_conditions(rng):
+    if rng.random() < 0.02:
+        return rng.choice([None, {}, [], ["team"], "live_odds_home"])
+    conditions = {}
+    for _ in range(rng.randint(1, 5)):
+        roll = rng.random()
+        if roll < 0.1:
+            key, condition = "country", {rng.choice(OPERATORS): rng.choice(COUNTRIES)}
+        elif roll < 0.15:
+            key, condition = "competition", {"equals": rng.choice(COMPETITIONS)}
+        elif roll < 0.3:
+            key, condition = "team", {"equals": rng.choice(TEAMS[:-1] + [1])}
+        elif roll < 0.55:
+            key = rng.choice(NUMERIC_KEYS)
+            operator = rng.choice(OPERATORS)
+            condition = {operator: random_operand(rng, operator)}
+        elif roll < 0.95:
+            key = f"{rng.choice(['initial', 'live'])}_odds_{rng.choice(ODDS_KINDS)}"
+            operator = rng.choice(OPERATORS)
+            condition = {operator: random_operand(rng, operator)}
+        elif roll < 0.97:
+            key, condition = rng.choice(NUMERIC_KEYS), {rng.choice(["above", "contains"]): 1}
+        elif roll < 0.985:
+            key, condition = rng.choice(["match_time", "team", "unknown_key"]), rng.choice([{}, None])
+        else:
+            key, condition = rng.choice(["team", "live_odds_home"]), rng.choice(["Arsenal", [1, 2]])
+        conditions[key] = condition
+    return conditions
+
+
+def random_match(rng):
+    home, away = rng.sample(TEAMS[:-1], 2)
+    if rng.random() < 0.05:
+        home = None
+    elapsed = rng.choice([None, rng.randint(0, 95 * 60)])
+    return SimpleNamespace(
+        match_id=str(rng.randint(1, 10 ** 6)),
+        country=rng.choice(COUNTRIES),
+        competition_name=rng.choice(COMPETITIONS),
+        home_team=home,
+        away_team=away,
+        elapsed_seconds=elapsed,
+        match_time=rng.choice([None, "67:12", "HT", f"{rng.randint(0, 95)}:00"]),
+    )
+
+
+def random_odd(rng, live: bool):
+    if rng.random() < 0.1:
+        return None
+    odd = SimpleNamespace(home_win=random_odds_value(rng), draw=random_odds_value(rng), away_win=random_odds_value(rng))
+    if live:
+        odd.home_score = rng.choice([None, 0, 1, 2, 3])
+        odd.away_score = rng.choice([None, 0, 1, 2])
+    return odd
+
+
+async def interpret(conditions, match, initial_odd, latest_odd):
+    """process_bot_conditions as run_user_bots called it; None when it raises."""
+    try:
+        return bool(await process_bot_conditions(None, conditions or [], match, initial_odd, latest_odd))
+    except Exception:
+        return None
+
+
+def compile_or_never(conditions):
+    try:
+        return compile_bot_conditions(conditions)
+    except InvalidBotConditions:
+        return lambda match, initial_odd, latest_odd: False
+
+
+def compares_text(conditions) -> bool:
+    """Whether a numeric or odds condition compares against text (the interpreter prints an error)."""
+    return any(
+        isinstance(operand, str) or (isinstance(operand, list) and any(isinstance(v, str) for v in operand))
+        for key, condition in conditions.items()
+        if isinstance(condition, dict) and (key in NUMERIC_KEYS or "_odds_" in key)
+        for operand in condition.values()
+    )
+
+
+async def differential(cases: int, rng) -> int:
+    mismatches = raised = matched = 0
+    for _ in range(cases):
+        conditions = random_conditions(rng)
+        match, initial_odd, latest_odd = random_match(rng), random_odd(rng, False), random_odd(rng, True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = await interpret(conditions, match, initial_odd, latest_odd)
+        got = compile_or_never(conditions)(match, initial_odd, latest_odd)
+        raised += expected is None
+        matched += bool(got)
+        if got != bool(expected):
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH interpreter={expected} compiled={got}\n  conditions={conditions}\n"
+                      f"  match={vars(match)}\n  initial={initial_odd and vars(initial_odd)}\n"
+                      f"  latest={latest_odd and vars(latest_odd)}")
+    print(f"{cases} cases: {matched} matched, interpreter raised on {raised}, {mismatches} mismatches")
+    return mismatches
+
+
+async def timing(rng, bots: int, matches: int):
+    # Valid conditions only, as live bots have
+    all_conditions = []
+    while len(all_conditions) < bots:
+        conditions = random_conditions(rng)
+        try:
+            compile_bot_conditions(conditions)
+        except InvalidBotConditions:
+            continue
+        if not compares_text(conditions):
+            all_conditions.append(conditions)
+    rows = [(random_match(rng), random_odd(rng, False), random_odd(rng, True)) for _ in range(matches)]
+
+    started = time.perf_counter()
+    for conditions in all_conditions:
+        for match, initial_odd, latest_odd in rows:
+            await interpret(conditions, match, initial_odd, latest_odd)
+    interpreted = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for conditions in all_conditions:
+        predicate = compile_bot_conditions(conditions)
+        for match, initial_odd, latest_odd in rows:
+            predicate(match, initial_odd, latest_odd)
+    compiled = time.perf_counter() - started
+
+    evaluations = bots * matches
+    print(f"{bots} bots x {matches} matches: interpreter {interpreted * 1e6 / evaluations:.2f} us/eval, "
+          f"compiled {compiled * 1e6 / evaluations:.2f} us/eval ({interpreted / compiled:.1f}x)")
+
+
+async def main(cases: int, seed: int, bots: int, matches: int) -> int:
+    rng = random.Random(seed)
+    mismatches = await differential(cases, rng)
+    await timing(rng, bots, matches)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200000, help="random (conditions, match) pairs to compare")
+    parser.add_argument("--bots", type=int, default=200, help="bots in the timing run")
+    parser.add_argument("--matches", type=int, default=300, help="live matches in the timing run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.cases, args.seed, args.bots, args.matches)))
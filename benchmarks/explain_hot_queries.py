@@ -0,0 +1,280 @@
+"""
+EXPLAIN regression check for the queries that run every few seconds.
+
+Clones match, bet, bet_event and odds_compact (with their indexes) into a scratch schema,
+seeds them at production-like volumes, then runs each hot query under
+EXPLAIN ANALYZE and asserts that:
+
+  * every listed table is read through the expected index, never a Seq Scan
+  * the median execution time stays under the query's budget
+
+Uses the database configured by the usual DB_* environment variables; only the
+scratch schema is written to, and it is dropped afterwards.
+
+    python -m benchmarks.explain_hot_queries [--scale 1.0] [--runs 5] [--keep]
+
+Exits with status 1 if any query regressed.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, update, exists, and_, func, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import engine
+from app.models import Match, Bet, BetEvent, OddsCompact
+from app.tasks.fetch_live_odds import INACTIVE_STATUSES
+
+SCHEMA = "bench_hot_queries"
+TABLES = ("match", "bet", "bet_event", "odds_compact")
+
+# Row counts at --scale 1.0
+VOLUMES = {
+    "matches": 20_000,
+    "active_matches": 600,
+    "bets": 300_000,
+    "odds_per_match": 100,
+}
+
+# Plain SQL run through text(), so literal colons are escaped
+SEED_SQL = [
+    # Mostly pregame/ended matches, a few hundred live or pending ones per category
+    """
+    INSERT INTO match (match_id, competition_name, category, country, home_team, away_team,
+                       event_status, live, start_time, match_time)
+    SELECT g::text, 'League ' || (g % 300), CASE WHEN g % 10 = 0 THEN 'basketball' ELSE 'football' END,
+           'Country ' || (g % 60), 'Home ' || g, 'Away ' || g,
+           CASE WHEN g <= :active THEN (ARRAY['1st half', '2nd half', 'Halftime', 'pending'])[1 + g % 4]
+                WHEN g % 3 = 0 THEN 'ended' ELSE (ARRAY['pregame', 'Pregame'])[1 + g % 2] END,
+           g <= :active,
+           now() - make_interval(mins => (g % 500) - 250),
+           lpad((g % 90)::text, 2, '0') || '\\:00'
+    FROM generate_series(1, :matches) g
+    """,
+    # 40 bot tasks plus manual bets; one leg per single, three per parlay
+    """
+    INSERT INTO bet (bet_id, user_id, type, amount, expected_win, outcome, created_at, updated_at,
+                     bot, bot_task, bot_id)
+    SELECT g, 1 + g % 50, CASE WHEN g % 5 = 0 THEN 'parlay' ELSE 'single' END, 10, 25,
+           (ARRAY['pending', 'won', 'lost'])[1 + g % 3], now(), now(),
+           g % 4 <> 0, CASE WHEN g % 4 <> 0 THEN 'Bot task ' || (g % 40) END, g % 40
+    FROM generate_series(1, :bets) g
+    """,
+    """
+    INSERT INTO bet_event (bet_event_id, bet_id, match_id, bet_type, odd_id, outcome)
+    SELECT row_number() OVER (), b.bet_id, (1 + (b.bet_id * 7 + leg * 13) % :matches)::text,
+           (ARRAY['home', 'draw', 'away'])[1 + (b.bet_id + leg) % 3], b.bet_id, b.outcome
+    FROM bet b
+    CROSS JOIN LATERAL generate_series(1, CASE WHEN b.type = 'parlay' THEN 3 ELSE 1 END) leg
+    """,
+    """
+    INSERT INTO odds_compact (fetched_at, odds_id, home_win_milli, draw_milli, away_win_milli,
+                              status_code, elapsed_seconds, home_score, away_score, match_id)
+    SELECT now() - make_interval(secs => (:per_match - i) * 10), row_number() OVER (),
+           1500 + (random() * 1000)::integer, 3000 + (random() * 1000)::integer, 4000 + (random() * 1000)::integer,
+           2, (i % 90) * 60, i / 40, i / 60, m::text
+    FROM generate_series(1, :matches) m
+    CROSS JOIN generate_series(1, :per_match) i
+    WHERE m <= :active * 5
+    """,
+]
+
+
+@dataclass
+class HotQuery:
+    name: str
+    origin: str
+    statement: object
+    # table -> substrings of the index definitions it may be read through
+    expected: dict = field(default_factory=dict)
+    budget_ms: float = 5.0
+
+
+def hot_queries() -> list[HotQuery]:
+    """The statements below mirror the ones in the modules named in `origin`."""
+    live_match_id = "7"
+    return [
+        HotQuery(
+            "bot_dedup_check",
+            "app/tasks/run_user_bots.py",
+            select(exists(
+                select(BetEvent.match_id).join(Bet, BetEvent.bet_id == Bet.bet_id).where(
+                    and_(
+                        Bet.bot == True,
+                        func.lower(Bet.bot_task) == "bot task 7",
+                        BetEvent.match_id == live_match_id,
+                    )
+                )
+            )),
+            {"bet_event": ("(match_id, bet_id)",), "bet": ("(bet_id)", "lower(bot_task)")},
+        ),
+        HotQuery(
+            "bot_task_bets",
+            "app/tasks/bet_favourite_*.py",
+            select(func.count()).select_from(Bet).where(
+                and_(Bet.bot == True, func.lower(Bet.bot_task) == "bot task 7")
+            ),
+            {"bet": ("lower(bot_task)",)},
+            budget_ms=50.0,
+        ),
+        HotQuery(
+            "active_matches_by_category",
+            "app/tasks/fetch_live_odds.py",
+            select(Match.match_id, Match.live, Match.event_status, Match.match_time).where(
+                Match.category == "basketball",
+                func.lower(Match.event_status).notin_(INACTIVE_STATUSES),
+            ),
+            {"match": ("(category) WHERE",)},
+        ),
+        HotQuery(
+            "cleanup_pending_matches",
+            "app/tasks/cleanup.py",
+            update(Match)
+            .where(
+                and_(
+                    func.lower(Match.event_status) == "pending",
+                    Match.start_time != None,
+                    Match.start_time < func.now() - text("interval '3 hours'"),
+                )
+            )
+            .values(event_status="ended", live=False),
+            {"match": ("(lower(event_status), start_time)",)},
+        ),
+        HotQuery(
+            "archive_ended_matches",
+            "app/tasks/archive_ended_matches.py",
+            select(Match).where(func.lower(Match.event_status) == "ended"),
+            {"match": ("(lower(event_status), start_time)",)},
+            budget_ms=50.0,
+        ),
+        HotQuery(
+            "settlement_pending_legs",
+            "app/tasks/settle_bets.py",
+            select(BetEvent.bet_id, BetEvent.bet_type).where(
+                BetEvent.match_id == live_match_id,
+                (BetEvent.outcome == None) | (BetEvent.outcome == "pending"),
+            ),
+            {"bet_event": ("(match_id) WHERE",)},
+        ),
+        HotQuery(
+            "match_odds_window",
+            "app/routers/odds.py",
+            select(OddsCompact.fetched_at, OddsCompact.home_win_milli, OddsCompact.draw_milli, OddsCompact.away_win_milli)
+            .where(OddsCompact.match_id == live_match_id,
+                   OddsCompact.fetched_at >= func.now() - text("interval '10 minutes'"))
+            .order_by(OddsCompact.fetched_at),
+            {"odds_compact": ("(match_id, fetched_at)",)},
+        ),
+        HotQuery(
+            "odds_changes_page",
+            "app/routers/odds.py (GET /odds/changes)",
+            select(OddsCompact.odds_id, OddsCompact.match_id, OddsCompact.home_win_milli)
+            .where(OddsCompact.odds_id > 10_000)
+            .order_by(OddsCompact.odds_id)
+            .limit(500),
+            {"odds_compact": ("(odds_id, fetched_at)",)},
+        ),
+    ]
+
+
+def compile_sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def index_names(plan: dict) -> list[str]:
+    """Indexes used by a scan node (a Bitmap Heap Scan gets them from its children)."""
+    if "Index Name" in plan:
+        return [plan["Index Name"]]
+    return [name for child in plan.get("Plans", []) for name in index_names(child)]
+
+
+def scans(plan: dict):
+    """Yield every plan node that reads a relation."""
+    if "Relation Name" in plan and plan["Node Type"] != "ModifyTable":
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+async def seed(conn, scale: float):
+    await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    for table in TABLES:
+        await conn.execute(text(f'CREATE TABLE {SCHEMA}."{table}" (LIKE public."{table}" INCLUDING DEFAULTS INCLUDING INDEXES)'))
+    await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+    params = {
+        "matches": int(VOLUMES["matches"] * scale),
+        "active": int(VOLUMES["active_matches"] * scale),
+        "bets": int(VOLUMES["bets"] * scale),
+        "per_match": VOLUMES["odds_per_match"],
+    }
+    for sql in SEED_SQL:
+        await conn.execute(text(sql), params)
+    for table in TABLES:
+        await conn.execute(text(f'ANALYZE "{table}"'))
+
+
+async def check(conn, query: HotQuery, runs: int) -> list[str]:
+    sql = compile_sql(query.statement)
+    times, problems = [], []
+    for _ in range(runs):
+        # Statements that write are rolled back
+        savepoint = await conn.begin_nested()
+        result = await conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + sql))
+        explain = result.scalar()[0]
+        await savepoint.rollback()
+        times.append(explain["Execution Time"])
+
+    index_defs = dict((await conn.execute(
+        text("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = :schema"), {"schema": SCHEMA}
+    )).fetchall())
+    nodes = list(scans(explain["Plan"]))
+    for table, expected in query.expected.items():
+        table_nodes = [n for n in nodes if n["Relation Name"] == table]
+        if not table_nodes:
+            problems.append(f"{table} not read at all")
+        for node in table_nodes:
+            indexes = index_names(node)
+            if not indexes:
+                problems.append(f"{node['Node Type']} on {table}")
+            for index in indexes:
+                if not any(e in index_defs.get(index, "") for e in expected):
+                    problems.append(f"{table} read through {index}, expected an index on {' or '.join(expected)}")
+
+    median = statistics.median(times)
+    if median > query.budget_ms:
+        problems.append(f"median {median:.2f} ms over budget of {query.budget_ms} ms")
+    status = "FAIL" if problems else "ok"
+    print(f"{status:4}  {query.name:28} {median:8.2f} ms  (budget {query.budget_ms} ms, {query.origin})")
+    for problem in problems:
+        print(f"        - {problem}")
+    return problems
+
+
+async def main(scale: float, runs: int, keep: bool) -> int:
+    failed = 0
+    async with engine.connect() as conn:
+        await seed(conn, scale)
+        await conn.commit()
+        for query in hot_queries():
+            if await check(conn, query, runs):
+                failed += 1
+        await conn.rollback()
+        if not keep:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            await conn.commit()
+    await engine.dispose()
+    print(f"\n{failed} of {len(hot_queries())} hot queries regressed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the seeded row counts")
+    parser.add_argument("--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema for inspection")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.scale, args.runs, args.keep)))
@@ -0,0 +1,149 @@
+"""
+Table and index sizes of the wide and the compact odds layouts.
+
+Generates a synthetic month of live odds (one row per match every 10 seconds
+over a 100 minute match) into a scratch schema twice: once in the old wide
+shape with its btree indexes, and once in the odds_compact layout with scaled
+integer prices, status/clock codes and a BRIN index on fetched_at. Prints the
+heap and index sizes of both.
+
+Uses the database configured by the usual DB_* environment variables; everything
+runs in one transaction that is rolled back at the end.
+
+    python -m benchmarks.odds_storage_size [--days 30] [--matches-per-day 100]
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from app.database import engine
+
+SCHEMA = "bench_odds_storage"
+POINTS_PER_MATCH = 600
+
+LAYOUTS = {
+    "wide": [
+        """
+        CREATE TABLE odds_wide (
+            odds_id integer NOT NULL,
+            match_id text,
+            event_status text,
+            match_time text,
+            home_score integer,
+            away_score integer,
+            home_win double precision,
+            draw double precision,
+            away_win double precision,
+            fetched_at timestamp without time zone NOT NULL,
+            elapsed_seconds integer,
+            PRIMARY KEY (odds_id, fetched_at)
+        )
+        """,
+        "CREATE INDEX ON odds_wide (match_id, fetched_at)",
+        "CREATE INDEX ON odds_wide (fetched_at)",
+    ],
+    "compact": [
+        """
+        CREATE TABLE odds_compact (
+            fetched_at timestamp without time zone NOT NULL,
+            odds_id integer NOT NULL,
+            home_win_milli integer,
+            draw_milli integer,
+            away_win_milli integer,
+            status_code smallint,
+            elapsed_seconds smallint,
+            home_score smallint,
+            away_score smallint,
+            match_id text,
+            PRIMARY KEY (odds_id, fetched_at)
+        )
+        """,
+        "CREATE INDEX ON odds_compact (match_id, fetched_at)",
+        "CREATE INDEX ON odds_compact USING brin (fetched_at)",
+    ],
+}
+
+# Matches start throughout each day; prices drift around their opening values.
+# text() treats ":name" as a bind parameter, hence the escaped colons.
+GENERATE_WIDE_SQL = """
+INSERT INTO odds_wide
+SELECT row_number() OVER (ORDER BY fetched_at) AS odds_id, match_id,
+       CASE WHEN i < 270 THEN '1st half' WHEN i < 330 THEN 'Halftime' ELSE '2nd half' END,
+       lpad((i / 6)::text, 2, '0') || '\\:' || lpad((i % 6 * 10)::text, 2, '0'),
+       i / 200, i / 250,
+       round((1.5 + m % 7 * 0.1 + random() * 0.1)::numeric, 2),
+       round((3.2 + random() * 0.2)::numeric, 2),
+       round((4.5 + m % 5 * 0.3 + random() * 0.3)::numeric, 2),
+       fetched_at, i * 10
+FROM (
+    SELECT d * 100000 + m AS m, (d * 100000 + m)::text AS match_id, i,
+           timestamp '2026-01-01' + make_interval(days => d, mins => m * 1440 / :per_day, secs => i * 10) AS fetched_at
+    FROM generate_series(0, :days - 1) d
+    CROSS JOIN generate_series(1, :per_day) m
+    CROSS JOIN generate_series(0, :points - 1) i
+) g
+ORDER BY fetched_at
+"""
+
+ENCODE_SQL = """
+INSERT INTO odds_status (event_status) SELECT DISTINCT event_status FROM odds_wide;
+INSERT INTO odds_compact
+SELECT o.fetched_at, o.odds_id, round(o.home_win * 1000), round(o.draw * 1000), round(o.away_win * 1000),
+       s.status_code, o.elapsed_seconds, o.home_score, o.away_score, o.match_id
+FROM odds_wide o
+JOIN odds_status s ON s.event_status = o.event_status
+ORDER BY o.fetched_at
+"""
+
+SIZES_SQL = """
+SELECT pg_relation_size(c.oid) AS heap,
+       pg_indexes_size(c.oid) AS indexes,
+       c.reltuples::bigint AS row_estimate
+FROM pg_class c
+WHERE c.oid = to_regclass(:table)
+"""
+
+
+def mb(size: int) -> str:
+    return f"{size / 1024 / 1024:8.1f} MB"
+
+
+async def main(days: int, per_day: int):
+    async with engine.connect() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        await conn.execute(text(
+            "CREATE TABLE odds_status (status_code smallint GENERATED ALWAYS AS IDENTITY PRIMARY KEY, "
+            "event_status text NOT NULL UNIQUE)"
+        ))
+        for statements in LAYOUTS.values():
+            for sql in statements:
+                await conn.execute(text(sql))
+        await conn.execute(text(GENERATE_WIDE_SQL), {"days": days, "per_day": per_day, "points": POINTS_PER_MATCH})
+        for sql in ENCODE_SQL.split(";"):
+            await conn.execute(text(sql))
+        await conn.execute(text("ANALYZE odds_wide"))
+        await conn.execute(text("ANALYZE odds_compact"))
+
+        sizes = {}
+        for layout in LAYOUTS:
+            row = (await conn.execute(text(SIZES_SQL), {"table": f"{SCHEMA}.odds_{layout}"})).one()
+            sizes[layout] = row
+            print(f"{layout:8} rows {row.row_estimate:>10}  heap {mb(row.heap)}  indexes {mb(row.indexes)}  "
+                  f"total {mb(row.heap + row.indexes)}  ({row.heap / max(row.row_estimate, 1):.0f} B/row)")
+        wide, compact = sizes["wide"], sizes["compact"]
+        print(f"compact/wide: heap {compact.heap / wide.heap:.0%}, indexes {compact.indexes / wide.indexes:.0%}, "
+              f"total {(compact.heap + compact.indexes) / (wide.heap + wide.indexes):.0%}")
+
+        # Nothing was committed: rolling back removes the scratch schema
+        await conn.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--matches-per-day", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.matches_per_day))
@@ -0,0 +1,312 @@
+"""
+Settlement throughput and lock waits on synthetic data.
+
+Creates a throwaway database next to the configured one, builds the settlement
+tables from the models and seeds --matches matches with --bets-per-match bets
+each (a fifth of them three-leg parlays) for --users users. Matches are then
+ended in bursts of around --burst, as they are at full time, while --placers
+concurrent sessions keep placing bets for the same users. Each settlement path
+is run from the same starting state and reports:
+
+  * end: the UPDATE that marks a burst of matches ended
+  * settle: from the start of that UPDATE until every leg of the burst is settled
+  * matches/s settled, and the latency of the concurrent bet placements
+  * lock waits: backends waiting on a lock, sampled from pg_stat_activity
+
+The paths are "trigger" (match_end_trigger) and "batch" (app/tasks/settle_bets.py);
+another path is compared by adding it to PATHS. Outcomes and ledger totals of
+all paths are compared at the end. The database is dropped afterwards.
+
+    python -m benchmarks.settlement_throughput [--matches 2000] [--bets-per-match 50]
+        [--users 200] [--burst 100] [--placers 4] [--paths trigger,batch] [--keep]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.config import SETTLEMENT
+from app.database import engine, Base
+from app.ledger import debit_bet
+from app.models import (
+    Match, EndedMatch, MatchOddsSummary, Bet, BetEvent, User, BalanceLedger, SofascoreFt, SettlementAudit,
+    BetRollupDelta,
+)
+from app.tasks.settle_bets import settle_ended_matches
+from app.triggers import create_settlement_triggers, create_bet_rollup_triggers, create_match_notify_triggers
+
+DATABASE = "bench_settlement_throughput"
+TABLES = [
+    Match, EndedMatch, MatchOddsSummary, Bet, BetEvent, User, BalanceLedger, SofascoreFt, SettlementAudit,
+    BetRollupDelta,
+]
+
+SEED_SQL = [
+    """
+    INSERT INTO "user" (user_id, email, password, balance)
+    SELECT g, 'bench' || g || '@example.com', 'x', 0 FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO "match" (match_id, competition_name, category, country, home_team, away_team,
+                         event_status, live, start_time, match_time, elapsed_seconds)
+    SELECT g::text, 'League ' || (g % 50), 'football', 'Country ' || (g % 20), 'Home ' || g, 'Away ' || g,
+           '2nd half', true, now() - interval '100 minutes', '88\\:00', 5280
+    FROM generate_series(1, :matches) g
+    """,
+    """
+    INSERT INTO match_odds_summary (match_id, odds_id, event_status, home_score, away_score, home_win, draw, away_win)
+    SELECT g::text, g, '2nd half', (random() * 3)::int, (random() * 3)::int, 1.5 + random(), 3.2, 2 + random() * 3
+    FROM generate_series(1, :matches) g
+    """,
+    # Every bet has its first leg on match (bet_id % matches) + 1; parlays add two more
+    """
+    INSERT INTO bet (bet_id, user_id, type, amount, expected_win, outcome, created_at, updated_at, bot, bot_task)
+    SELECT g, 1 + g % :users, CASE WHEN g % 5 = 0 THEN 'parlay' ELSE 'single' END, 10,
+           CASE WHEN g % 5 = 0 THEN 250 ELSE 25 END, 'pending', now(), now(), true, 'Bench bot ' || (g % 40)
+    FROM generate_series(1, :bets) g
+    """,
+    """
+    INSERT INTO bet_event (bet_id, match_id, bet_type, odd_id, outcome)
+    SELECT b.bet_id, (1 + (b.bet_id + (leg - 1) * 7919) % :matches)::text,
+           (ARRAY['home', 'draw', 'away'])[1 + (b.bet_id + leg) % 3], 1, 'pending'
+    FROM bet b
+    CROSS JOIN LATERAL generate_series(1, CASE WHEN b.type = 'parlay' THEN 3 ELSE 1 END) leg
+    """,
+]
+
+RESET_SQL = [
+    "UPDATE bet_event SET outcome = 'pending' WHERE outcome IS DISTINCT FROM 'pending'",
+    """
+    UPDATE bet SET outcome = 'pending', lost_legs = 0,
+                   pending_legs = CASE WHEN type = 'parlay' THEN 3 ELSE 1 END
+    """,
+    # Bets placed by the concurrent load
+    "DELETE FROM bet_event WHERE bet_id > :seeded_bets",
+    "DELETE FROM bet WHERE bet_id > :seeded_bets",
+    "TRUNCATE balance_ledger",
+    "TRUNCATE bet_rollup_delta",
+    'UPDATE "user" SET balance = 0',
+    """UPDATE "match" SET event_status = '2nd half', live = true""",
+]
+
+OUTCOMES_SQL = """
+SELECT md5(string_agg(bet_id || ':' || outcome || ':' || pending_legs || ':' || lost_legs, ',' ORDER BY bet_id))
+FROM bet WHERE bet_id <= :seeded_bets
+"""
+CREDITS_SQL = """
+SELECT coalesce(sum(amount), 0) FROM balance_ledger WHERE kind = 'win_credit' AND bet_id <= :seeded_bets
+"""
+LOCK_WAITS_SQL = """
+SELECT count(*) FROM pg_stat_activity
+WHERE datname = current_database() AND wait_event_type = 'Lock'
+"""
+
+
+async def settle_batch(Session) -> None:
+    while True:
+        async with Session() as session:
+            counts = await settle_ended_matches(session, SETTLEMENT["batch_size"])
+        if counts["matches"] < SETTLEMENT["batch_size"]:
+            return
+
+
+@dataclass
+class SettlementPath:
+    name: str
+    # Passed to create_settlement_triggers
+    mode: str
+    # Run after each burst; None when ending the matches settles them
+    settle: Optional[Callable[[sessionmaker], Awaitable[None]]] = None
+
+
+PATHS = {
+    "trigger": SettlementPath("trigger", "trigger"),
+    "batch": SettlementPath("batch", "batch", settle_batch),
+}
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def bursts(matches: int, burst: int, rng: random.Random) -> list[list[str]]:
+    """Match ids in random order, split into bursts of burst/2 to 3*burst/2 matches."""
+    ids = [str(m) for m in range(1, matches + 1)]
+    rng.shuffle(ids)
+    groups = []
+    while ids:
+        size = rng.randint(max(1, burst // 2), max(1, burst * 3 // 2))
+        groups.append(ids[:size])
+        ids = ids[size:]
+    return groups
+
+
+async def create_database(bench_engine, args):
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE}"))
+        await conn.execute(text(f"CREATE DATABASE {DATABASE}"))
+    async with bench_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[model.__table__ for model in TABLES])
+        await create_match_notify_triggers(conn)
+        params = {"users": args.users, "matches": args.matches, "bets": args.matches * args.bets_per_match}
+        await create_settlement_triggers(conn, "batch")
+        await create_bet_rollup_triggers(conn)
+        for sql in SEED_SQL:
+            await conn.execute(text(sql), params)
+    async with bench_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+
+async def drop_database():
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE}"))
+
+
+async def place_bets(Session, args, stop: asyncio.Event, latencies: list[float], seed: int):
+    """Single-leg bets for random users on matches still in play, one transaction each."""
+    rng = random.Random(seed)
+    while not stop.is_set():
+        user_id = rng.randint(1, args.users)
+        match_id = str(rng.randint(1, args.matches))
+        started = time.perf_counter()
+        async with Session() as session:
+            bet_id = (await session.execute(text("""
+                INSERT INTO bet (user_id, type, amount, expected_win, outcome, created_at, updated_at, bot)
+                SELECT :user_id, 'single', 5, 12, 'pending', now(), now(), true
+                FROM "match" WHERE match_id = :match_id AND event_status <> 'ended'
+                RETURNING bet_id
+            """), {"user_id": user_id, "match_id": match_id})).scalar()
+            if bet_id is not None:
+                await session.execute(text(
+                    "INSERT INTO bet_event (bet_id, match_id, bet_type, odd_id, outcome) "
+                    "VALUES (:bet_id, :match_id, 'home', 1, 'pending')"
+                ), {"bet_id": bet_id, "match_id": match_id})
+                await debit_bet(session, user_id, bet_id, 5)
+            await session.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.002)
+
+
+async def sample_lock_waits(bench_engine, stop: asyncio.Event, samples: list[int]):
+    async with bench_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        while not stop.is_set():
+            samples.append((await conn.execute(text(LOCK_WAITS_SQL))).scalar())
+            await asyncio.sleep(0.005)
+
+
+async def run_path(path: SettlementPath, bench_engine, Session, args, seeded_bets: int) -> dict:
+    async with bench_engine.begin() as conn:
+        for sql in RESET_SQL:
+            await conn.execute(text(sql), {"seeded_bets": seeded_bets})
+        await conn.execute(text("SELECT setval(pg_get_serial_sequence('bet', 'bet_id'), :seeded_bets)"),
+                           {"seeded_bets": seeded_bets})
+        await create_settlement_triggers(conn, path.mode)
+
+    stop = asyncio.Event()
+    placements, lock_samples = [], []
+    background = [asyncio.create_task(place_bets(Session, args, stop, placements, seed)) for seed in range(args.placers)]
+    background.append(asyncio.create_task(sample_lock_waits(bench_engine, stop, lock_samples)))
+
+    end_ms, settle_ms = [], []
+    for burst in bursts(args.matches, args.burst, random.Random(args.seed)):
+        started = time.perf_counter()
+        async with bench_engine.begin() as conn:
+            await conn.execute(
+                text("""UPDATE "match" SET event_status = 'ended', live = false WHERE match_id = ANY(:ids)"""),
+                {"ids": burst},
+            )
+        end_ms.append((time.perf_counter() - started) * 1000)
+        if path.settle is not None:
+            await path.settle(Session)
+        settle_ms.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(args.gap)
+
+    stop.set()
+    await asyncio.gather(*background)
+    async with bench_engine.connect() as conn:
+        outcomes = (await conn.execute(text(OUTCOMES_SQL), {"seeded_bets": seeded_bets})).scalar()
+        credits = (await conn.execute(text(CREDITS_SQL), {"seeded_bets": seeded_bets})).scalar()
+        legs = (await conn.execute(
+            text("SELECT count(*) FROM bet_event WHERE outcome IN ('won', 'lost') AND bet_id <= :seeded_bets"),
+            {"seeded_bets": seeded_bets},
+        )).scalar()
+    return {
+        "path": path.name,
+        "bursts": len(end_ms),
+        "legs": legs,
+        "end_p50": statistics.median(end_ms),
+        "end_p95": percentile(end_ms, 95),
+        "settle_p50": statistics.median(settle_ms),
+        "settle_p95": percentile(settle_ms, 95),
+        "matches_per_s": args.matches / (sum(settle_ms) / 1000),
+        "placements": len(placements),
+        "place_p50": statistics.median(placements) if placements else 0.0,
+        "place_p99": percentile(placements, 99),
+        "lock_waits_max": max(lock_samples, default=0),
+        "lock_waits_share": sum(1 for s in lock_samples if s) / max(1, len(lock_samples)),
+        "outcomes": outcomes,
+        "credits": round(credits, 2),
+    }
+
+
+def report(results: list[dict]):
+    print(f"{'path':10} {'bursts':>6} {'legs':>8} {'end p50/p95 ms':>16} {'settle p50/p95 ms':>18} "
+          f"{'matches/s':>10} {'place p50/p99 ms':>17} {'lock waits max/share':>21}")
+    for r in results:
+        print(f"{r['path']:10} {r['bursts']:6} {r['legs']:8} {r['end_p50']:7.1f} / {r['end_p95']:6.1f} "
+              f"{r['settle_p50']:8.1f} / {r['settle_p95']:7.1f} {r['matches_per_s']:10.0f} "
+              f"{r['place_p50']:7.1f} / {r['place_p99']:7.1f} {r['lock_waits_max']:10} / {r['lock_waits_share']:7.1%}")
+    same = len({(r["outcomes"], r["credits"]) for r in results}) == 1
+    print(f"\noutcomes and win credits {'identical' if same else 'DIFFER'} across paths")
+    return same
+
+
+async def main(args) -> int:
+    bench_engine = create_async_engine(engine.url.set(database=DATABASE), pool_size=args.placers + 4)
+    Session = sessionmaker(bench_engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        await create_database(bench_engine, args)
+        seeded_bets = args.matches * args.bets_per_match
+        results = []
+        for name in args.paths.split(","):
+            results.append(await run_path(PATHS[name], bench_engine, Session, args, seeded_bets))
+        same = report(results)
+    finally:
+        await bench_engine.dispose()
+        if not args.keep:
+            await drop_database()
+        await engine.dispose()
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=2000)
+    parser.add_argument("--bets-per-match", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=100, help="average number of matches ending together")
+    parser.add_argument("--gap", type=float, default=0.2, help="seconds between bursts")
+    parser.add_argument("--placers", type=int, default=4, help="concurrent sessions placing bets")
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma-separated settlement paths to compare")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="keep the database for inspection")
+    args = parser.parse_args()
+    unknown = set(args.paths.split(",")) - PATHS.keys()
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(sorted(unknown))}")
+    sys.exit(asyncio.run(main(args)))